@@ -0,0 +1,288 @@
+import argparse
+import heapq
+import random
+import time
+import numpy as np
+from crystalquest.economy import GOODS
+from crystalquest.locations.market import MARKET_BID
+
+# Most stops a voyage makes after the town it starts from
+MAX_STOPS = 4
+# Longest voyage planned, in days
+MAX_DAYS = 40
+# Towns a voyage can call at, the nearest to the start
+MAX_TOWNS = 200
+# Next stops tried from each town, the most promising first
+BRANCHING = 8
+# Seconds the search may take before it settles for the best voyages found so far
+TIME_BUDGET = 0.05
+# Voyages suggested
+PLAN_COUNT = 3
+# Stops searched between looks at the clock
+CLOCK_INTERVAL = 256
+UNREACHABLE = 1 << 30
+
+class TradePlan:
+    """A voyage suggested by the route advisor"""
+
+    def __init__(self, stops, loads, sailing_days, profit):
+        self.stops = stops  # (island, town name) of the start and of every stop after it
+        self.loads = loads  # {good: barrels} to buy at each stop but the last, sold at the next
+        self.sailing_days = sailing_days  # Days from each stop to the next
+        self.days = sum(sailing_days)
+        self.profit = profit  # Gold gained over selling the goods on board at the start
+
+    @property
+    def profit_per_day(self):
+        return self.profit / max(self.days, 1)
+
+class RouteAdvisor:
+    """Searches the voyages a ship could make from a town for the most gold a day.
+
+    A voyage calls at up to MAX_STOPS towns. At every stop the ship sells
+    what it carries at the town's market and fills its hold again with the
+    goods that sell best at the next stop, as far as its gold and the
+    town's stock go, the goods with the biggest margin first. Goods on board
+    at the start count as bought at what the market would pay for them.
+    Plans use the prices of today, and a single sale or purchase doesn't
+    move them (see Market.visit), but markets move on while the ship sails.
+    As trading moves the prices of a town, a voyage calls at each town once,
+    though it may end where it started.
+
+    The search is a depth-first branch and bound over the MAX_TOWNS towns
+    nearest to the start. Before it starts, a table of the most any leg
+    between two towns can earn (a full hold of the good with the best
+    margin) gives, by dynamic programming, the most a voyage can still earn
+    from each town with so many stops left. Branches that can't beat the
+    plans found so far with that are cut, and the most promising next stops
+    are tried first. The search stops at its time budget with the best
+    plans it found.
+    """
+
+    def __init__(self, world, island, town_name, ship, max_stops=MAX_STOPS, max_days=MAX_DAYS,
+                 max_towns=MAX_TOWNS):
+        self.capacity = ship.cargo_capacity
+        self.speed = ship.speed
+        self.max_stops = max_stops
+        self.max_days = max_days
+        economy = world.economy
+
+        # Towns of the islands in reach, nearest first
+        reach = max_days * self.speed
+        distances = self._distances_from(world, island, reach)
+        islands = sorted((distance, i, other) for i, (other, distance) in enumerate(distances.items())
+                         if distance <= reach)
+        self.towns = []  # (island, town name)
+        rows = []
+        for _, _, other in islands:
+            if len(self.towns) >= max_towns:
+                break
+            for other_town, row in economy.towns[other].items():
+                self.towns.append((other, other_town))
+                rows.append(row)
+        self.start = self.towns.index((island, town_name))
+
+        # Prices and stock as the market sells and buys them
+        rows = np.array(rows, dtype=np.intp)
+        self.ask = np.maximum(1, np.rint(economy.price[rows])).astype(np.int64)
+        self.bid = np.maximum(1, np.floor(self.ask * MARKET_BID)).astype(np.int64)
+        self.stock = economy.stock[rows].astype(np.int64)
+
+        # Days of sailing between every two towns, towns of one island are no sail apart
+        town_islands = [other for other, _ in self.towns]
+        self.days = self._days_between(world, town_islands)
+
+        # The most a leg can earn, then the most a voyage can earn from each town with r legs left
+        margins = self.bid[None, :, :] - self.ask[:, None, :]
+        self.leg_bound = np.maximum(margins.max(axis=2), 0) * self.capacity
+        reachable = self.days <= max_days
+        np.fill_diagonal(reachable, False)
+        self.reachable = reachable
+        self.future = [np.zeros(len(self.towns), dtype=np.int64)]
+        for _ in range(max_stops):
+            onward = np.where(reachable, self.leg_bound + self.future[-1][None, :], 0)
+            self.future.append(np.maximum(self.future[-1], onward.max(axis=1, initial=0)))
+
+        self.orders = {}  # (town, legs left) -> next stops to try, best first
+        self.cargo = {}  # (town, next town) -> goods worth carrying, best margin first
+
+    def _distances_from(self, world, island, reach):
+        """Squares to sail from an island to every island with a market that may be within reach"""
+        routes = world.route_table()
+        islands = list(world.economy.towns)
+        distances = {}
+        if routes is not None and island in routes.index:
+            # A sea lane is never shorter than the straight way, islands further than reach are left out
+            x, y = island.coordinates
+            nearby = [other for other in islands if other in routes.index and
+                      max(abs(other.coordinates[0] - x), abs(other.coordinates[1] - y)) <= reach]
+            lanes = routes.distances([routes.index[island]] * len(nearby), [routes.index[other] for other in nearby])
+            for other, distance in zip(nearby, lanes.tolist()):
+                if distance >= 0:
+                    distances[other] = distance
+        else:
+            # No sea lanes (an endless ocean), ships sail straight
+            x, y = island.coordinates
+            for other in islands:
+                distances[other] = max(abs(other.coordinates[0] - x), abs(other.coordinates[1] - y))
+        return distances
+
+    def _days_between(self, world, town_islands):
+        routes = world.route_table()
+        unique = list(dict.fromkeys(town_islands))
+        position = {island: i for i, island in enumerate(unique)}
+        coordinates = np.array([island.coordinates for island in unique], dtype=np.int64).reshape(-1, 2)
+        distance = np.abs(coordinates[:, None, :] - coordinates[None, :, :]).max(axis=2)
+        if routes is not None and all(island in routes.index for island in unique):
+            # Only islands the straight way puts in reach can be in reach by sea, the lanes of the rest
+            # aren't planned for nothing
+            indexes = np.array([routes.index[island] for island in unique], dtype=np.intp)
+            a, b = np.nonzero(distance <= self.max_days * self.speed)
+            lanes = routes.distances(indexes[a], indexes[b]).astype(np.int64)
+            distance = np.full(distance.shape, -1, dtype=np.int64)
+            distance[a, b] = lanes
+        days = np.where(distance >= 0, -(-distance // self.speed), UNREACHABLE)
+        towns = np.array([position[island] for island in town_islands], dtype=np.intp)
+        return days[np.ix_(towns, towns)]
+
+    def _order(self, town, legs_left):
+        """The next stops to try from a town, those the most could be earned from first"""
+        key = (town, legs_left)
+        order = self.orders.get(key)
+        if order is None:
+            candidates = np.nonzero(self.reachable[town])[0]
+            promise = self.leg_bound[town, candidates] + self.future[legs_left - 1][candidates]
+            best = np.argsort(-promise, kind='stable')[:BRANCHING]
+            order = candidates[best].tolist()
+            self.orders[key] = order
+        return order
+
+    def _goods(self, town, next_town):
+        """(good, margin, price, stock) of the goods that sell for more at the next town"""
+        key = (town, next_town)
+        goods = self.cargo.get(key)
+        if goods is None:
+            margins = self.bid[next_town] - self.ask[town]
+            goods = [(good, int(margins[good]), int(self.ask[town, good]), int(self.stock[town, good]))
+                     for good in np.argsort(-margins, kind='stable').tolist() if margins[good] > 0]
+            self.cargo[key] = goods
+        return goods
+
+    def _fill(self, goods, gold):
+        """Fill the hold from goods, best margin first, returns (load, cost, profit)"""
+        room = self.capacity
+        load = {}
+        cost = profit = 0
+        for good, margin, price, stock in goods:
+            amount = min(room, stock, (gold - cost) // price)
+            if amount <= 0:
+                continue
+            load[GOODS[good]] = load.get(GOODS[good], 0) + amount
+            cost += amount * price
+            profit += amount * margin
+            room -= amount
+            if not room:
+                break
+        return load, cost, profit
+
+    def best_plans(self, gold, inventory, count=PLAN_COUNT, budget=TIME_BUDGET):
+        """Return the count voyages that earn the most gold a day, best first"""
+        start = self.start
+        # Goods on board are worth what the market here pays, carrying them on is buying them back
+        held = {GOODS.index(good): amount for good, amount in inventory.items() if good in GOODS and amount > 0}
+        gold += sum(int(self.bid[start, good]) * amount for good, amount in held.items())
+        self.best = []  # Heap of (gold a day, sequence, plan), the worst kept plan first
+        self.count = count
+        self.sequence = 0
+        self.deadline = time.perf_counter() + budget
+        self.out_of_time = False
+
+        for next_town in self._order(start, self.max_stops):
+            goods = self._goods(start, next_town)
+            margins = self.bid[next_town] - self.bid[start]
+            goods = sorted([(good, int(margins[good]), int(self.bid[start, good]), amount)
+                            for good, amount in held.items() if margins[good] > 0] + goods,
+                           key=lambda item: -item[1])
+            self._leg(start, next_town, goods, gold, 0, 0, [start], [], 1)
+            if self.out_of_time:
+                break
+        return [plan for _, _, plan in sorted(self.best, key=lambda item: (-item[0], item[1]))]
+
+    def _leg(self, town, next_town, goods, gold, days, profit, stops, loads, legs):
+        """Sail from town to next_town with a hold filled from goods, and search on from there"""
+        days += int(self.days[town, next_town])
+        if days > self.max_days:
+            return
+        load, cost, earned = self._fill(goods, gold)
+        self._search(next_town, gold + earned, days, profit + earned, stops + [next_town], loads + [load], legs)
+
+    def _search(self, town, gold, days, profit, stops, loads, legs):
+        self.sequence += 1
+        if self.sequence % CLOCK_INTERVAL == 0 and time.perf_counter() > self.deadline:
+            self.out_of_time = True
+        if self.out_of_time:
+            return
+        if profit > 0:
+            self._keep(TradePlan([self.towns[stop] for stop in stops], loads,
+                                 [int(self.days[a, b]) for a, b in zip(stops, stops[1:])], profit))
+        legs_left = self.max_stops - legs
+        if not legs_left or town == self.start:
+            return  # Back where it started, the voyage is over
+        # Even the most any voyage can earn from here can't make it into the plans kept
+        bound = (profit + int(self.future[legs_left][town])) / max(days, 1)
+        if len(self.best) == self.count and bound <= self.best[0][0]:
+            return
+        for next_town in self._order(town, legs_left):
+            if next_town in stops[1:]:
+                continue  # Trading there again would meet the prices the first call left behind
+            self._leg(town, next_town, self._goods(town, next_town), gold, days, profit, stops, loads, legs + 1)
+            if self.out_of_time:
+                return
+
+    def _keep(self, plan):
+        entry = (plan.profit_per_day, -self.sequence, plan)
+        if len(self.best) < self.count:
+            heapq.heappush(self.best, entry)
+        elif entry[:2] > self.best[0][:2]:
+            heapq.heapreplace(self.best, entry)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the trade route advisor on a generated world")
+    parser.add_argument('--islands', type=int, default=200, help="islands in the world")
+    parser.add_argument('--size', type=int, default=160, help="map width and height")
+    parser.add_argument('--seed', type=int, default=1, help="random seed")
+    parser.add_argument('--ship', default='Brigantine', help="ship type to plan for")
+    parser.add_argument('--gold', type=int, default=2000, help="gold to trade with")
+    parser.add_argument('--budget', type=float, default=TIME_BUDGET, help="seconds the search may take")
+    parser.add_argument('--repeat', type=int, default=5, help="plans to time")
+    args = parser.parse_args()
+
+    from crystalquest.game import World
+    from crystalquest.items import ship_types
+    from crystalquest.ships import Ship
+
+    random.seed(args.seed)
+    world = World(num_islands=args.islands, map_size=args.size)
+    world.quiet = True
+    world.simulate(30)
+    stats = ship_types[args.ship]
+    ship = Ship(args.ship, stats['price'], stats['crew_max'], stats['speed'])
+    world.route_table()  # Planned once for the whole game, not part of planning a voyage
+    island = next(iter(world.inhabited_islands.values()))
+    town_name = next(iter(island.towns))
+
+    times = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        advisor = RouteAdvisor(world, island, town_name, ship)
+        plans = advisor.best_plans(args.gold, {}, budget=args.budget)
+        times.append(time.perf_counter() - start)
+    print(f"Planned voyages from {town_name}, {island.name} over {len(advisor.towns)} towns "
+          f"in {min(times) * 1000:.1f}ms (best of {args.repeat}), {advisor.sequence} stops searched"
+          f"{', out of time' if advisor.out_of_time else ''}")
+    for plan in plans:
+        print(f"  {plan.profit_per_day:.0f} gold a day: {plan.profit} gold in {plan.days} days, "
+              f"{' -> '.join(town for _, town in plan.stops)}")
+
+if __name__ == "__main__":
+    main()
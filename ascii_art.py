@@ -1,15 +1,115 @@
-from ascii_magic import AsciiArt
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from crystalquest.colors import COLORS
+from crystalquest.autosave import write_atomic
 
-def load_ascii_art(image_path):
-    """Load and return ASCII art from an image file"""
+ART_CACHE_DIR = 'art_cache'
+# Widest art is rendered, narrower terminals get art as wide as they are
+ART_COLUMNS = 120
+# Rendered pictures kept in memory, the least recently shown is dropped first
+ART_MEMORY_SIZE = 16
+
+# (image path, mtime, columns, colors) -> rendered text, most recently used last
+_rendered = OrderedDict()
+
+def art_columns():
+    """Columns to render art at in the current terminal"""
+    return min(ART_COLUMNS, shutil.get_terminal_size().columns)
+
+def _cache_name(image_path, mtime, columns, colors):
+    # Images of the same name in different folders are told apart by a hash of their path
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    path_hash = hashlib.sha1(os.path.abspath(image_path).encode()).hexdigest()[:10]
+    return f"{stem}-{path_hash}-{mtime}-{columns}-{'color' if colors else 'mono'}.txt"
+
+def _read_cached(name, cache_dir):
     try:
+        with open(os.path.join(cache_dir, name), encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        return None
+
+def _write_cached(name, text, cache_dir):
+    """Store a rendering on disk, replacing the renderings of older versions of the image"""
+    path_hash, mtime = os.path.splitext(name)[0].rsplit('-', 4)[1:3]
+    try:
+        write_atomic(os.path.join(cache_dir, name), text.encode('utf-8'))
+        for other in os.listdir(cache_dir):
+            parts = os.path.splitext(other)[0].rsplit('-', 4)
+            if len(parts) == 5 and parts[1] == path_hash and parts[2] != mtime:
+                os.remove(os.path.join(cache_dir, other))
+    except OSError:
+        pass  # The cache is only a shortcut, the art was rendered all the same
+
+def render_ascii_art(image_path, columns=None, cache_dir=ART_CACHE_DIR):
+    """Return ASCII art of an image file as text ready to print, raises if the image can't be read.
+
+    Decoding an image and converting it to text is slow, so every rendering
+    is kept in memory and on disk, keyed by the image's path and modification
+    time, the width and the color mode. Showing the same picture again is a
+    dictionary lookup, and a new game reads the text a previous one rendered
+    without loading ascii_magic (and PIL) at all.
+    """
+    columns = columns or art_columns()
+    colors = COLORS.use_colors
+    mtime = os.stat(image_path).st_mtime_ns
+    key = (os.path.abspath(image_path), mtime, columns, colors)
+    text = _rendered.get(key)
+    if text is not None:
+        _rendered.move_to_end(key)
+        return text
+    name = _cache_name(image_path, mtime, columns, colors)
+    text = _read_cached(name, cache_dir)
+    if text is None:
+        from ascii_magic import AsciiArt  # Takes longer to import than the rest of the game
         art = AsciiArt.from_image(image_path)
-        return art
+        # to_terminal prints the text as well, to_file is the public way to get it colored without
+        with tempfile.TemporaryDirectory() as folder:
+            text = art.to_file(os.path.join(folder, 'art.txt'), columns=columns, monochrome=not colors)
+        _write_cached(name, text, cache_dir)
+    _rendered[key] = text
+    if len(_rendered) > ART_MEMORY_SIZE:
+        _rendered.popitem(last=False)
+    return text
+
+def load_ascii_art(image_path, columns=None, cache_dir=ART_CACHE_DIR):
+    """Load and return ASCII art from an image file, or None if it can't be read"""
+    try:
+        return render_ascii_art(image_path, columns, cache_dir)
     except Exception as e:
         print(f"Could not load ASCII art: {e}")
         return None
 
+class ArtLoader:
+    """Loads ASCII art on a background thread while the game gets on with something else"""
+
+    def __init__(self, image_path, columns=None, cache_dir=ART_CACHE_DIR):
+        self.art = None
+        self.error = None
+        self.thread = threading.Thread(target=self._load, args=(image_path, columns, cache_dir),
+                                       name='art', daemon=True)
+        self.thread.start()
+
+    def _load(self, image_path, columns, cache_dir):
+        try:
+            self.art = render_ascii_art(image_path, columns, cache_dir)
+        except Exception as e:
+            self.error = e
+
+    def result(self):
+        """Wait for the art and return it, or None if it couldn't be loaded"""
+        self.thread.join()
+        if self.error is not None:
+            # Reported here rather than in the middle of whatever was printed meanwhile
+            print(f"Could not load ASCII art: {self.error}")
+            self.error = None
+        return self.art
+
 def display_ascii_art(art):
     """Display ASCII art to terminal"""
     if art:
-        art.to_terminal() 
\ No newline at end of file
+        print(art)
@@ -0,0 +1,132 @@
+import atexit
+import os
+import threading
+from datetime import datetime
+
+SAVE_FOLDER = 'saves'
+# Autosaves kept on disk, the oldest is deleted when a new one is written
+AUTOSAVE_KEEP = 5
+# Microseconds keep saves made in the same second apart
+TIMESTAMP_FORMAT = '%Y%m%d_%H%M%S_%f'
+
+def new_save_path(prefix, extension, folder=SAVE_FOLDER):
+    """Return an unused path for a save, named after the current time"""
+    timestamp = datetime.now().strftime(TIMESTAMP_FORMAT)
+    path = os.path.join(folder, f"{prefix}_{timestamp}.{extension}")
+    count = 1
+    while os.path.exists(path):
+        count += 1
+        path = os.path.join(folder, f"{prefix}_{timestamp}_{count}.{extension}")
+    return path
+
+def save_time(filename):
+    """Return the time a save was made from its file name, or None for files that aren't saves"""
+    # prefix_YYYYmmdd_HHMMSS[_microseconds][_count].extension
+    parts = os.path.splitext(os.path.basename(filename))[0].split('_')
+    try:
+        when = datetime.strptime(f"{parts[1]}_{parts[2]}", '%Y%m%d_%H%M%S')
+    except (IndexError, ValueError):
+        return None
+    if len(parts) > 3 and len(parts[3]) == 6 and parts[3].isdigit():
+        when = when.replace(microsecond=int(parts[3]))
+    return when
+
+def write_atomic(path, data):
+    """Write a file so that it is either all there or not there at all.
+
+    The data goes to a temporary file next to it first, which is flushed to
+    disk and then renamed over the target, so a crash mid-write leaves the
+    old file (or none) instead of a truncated one.
+    """
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    temporary = f"{path}.tmp"
+    try:
+        with open(temporary, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, path)
+    except BaseException:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+        raise
+
+class Autosaver:
+    """Writes autosaves on a background thread so the day loop never waits on the disk.
+
+    The game thread hands over a snapshot of the game (cheap copies of its
+    state) and a function that turns it into the bytes of a save file. A
+    single worker thread serializes and writes it. If the game moves on
+    before the last autosave is written, the newer snapshot replaces the one
+    still waiting, so autosaves never pile up. Only the newest AUTOSAVE_KEEP
+    autosaves are kept. An index (see SaveIndex) is told about every
+    autosave written and deleted.
+    """
+
+    def __init__(self, folder=SAVE_FOLDER, keep=AUTOSAVE_KEEP, index=None):
+        self.folder = folder
+        self.keep = keep
+        self.index = index
+        self.pending = None  # (extension, serialize, summary) of the newest snapshot not written yet
+        self.closed = False
+        self.error = None  # Last error of the worker thread, reported to the game thread
+        self.written = 0
+        self.condition = threading.Condition()
+        self.thread = None
+
+    def save(self, extension, serialize, summary=None):
+        """Queue an autosave, serialize() returns the bytes of the file"""
+        with self.condition:
+            if self.closed:
+                return
+            self.pending = (extension, serialize, summary)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name='autosave', daemon=True)
+                self.thread.start()
+                atexit.register(self.close)  # Finish the last autosave however the game ends
+            self.condition.notify()
+
+    def take_error(self):
+        """Return and clear the last error the worker ran into"""
+        error, self.error = self.error, None
+        return error
+
+    def close(self):
+        """Write any pending autosave and stop the worker thread"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        if self.thread is not None:
+            self.thread.join()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None and not self.closed:
+                    self.condition.wait()
+                if self.pending is None:
+                    return
+                extension, serialize, summary = self.pending
+                self.pending = None
+            try:
+                path = new_save_path('autosave', extension, self.folder)
+                write_atomic(path, serialize())
+                self.written += 1
+                if self.index is not None:
+                    self.index.record(path, summary)
+                self._rotate()
+            except Exception as e:
+                self.error = e
+
+    def _rotate(self):
+        """Delete the oldest autosaves beyond the number kept"""
+        autosaves = sorted((name for name in os.listdir(self.folder)
+                            if name.startswith('autosave_') and not name.endswith('.tmp')),
+                           key=lambda name: (save_time(name) or datetime.min, name))
+        removed = autosaves[:max(0, len(autosaves) - self.keep)]
+        for name in removed:
+            os.remove(os.path.join(self.folder, name))
+        if removed and self.index is not None:
+            self.index.forget(removed)
@@ -23,39 +23,107 @@ class Colors:
     def __init__(self):
         self.use_colors = supports_color()
         
-        if self.use_colors:
-            self.BLUE = '\033[94m'      # Light blue for water
-            self.GREEN = '\033[92m'     # Green for inhabited islands
-            self.YELLOW = '\033[93m'    # Yellow for uninhabited islands
-            self.RED = '\033[91m'       # Red for ships
-            self.WHITE = '\033[97m'     # White for player
-            self.GRAY = '\033[90m'      # Gray for sea monster
-            self.RESET = '\033[0m'      # Reset color
-        else:
-            # Fallback ASCII symbols
-            self.BLUE = ''
-            self.GREEN = ''
-            self.YELLOW = ''
-            self.RED = ''
-            self.WHITE = ''
-            self.GRAY = ''
-            self.RESET = ''
-    
+        self.BLUE = '\033[94m'      # Light blue for water
+        self.GREEN = '\033[92m'     # Green for inhabited islands
+        self.YELLOW = '\033[93m'    # Yellow for uninhabited islands
+        self.RED = '\033[91m'       # Red for ships
+        self.WHITE = '\033[97m'     # White for player
+        self.GRAY = '\033[90m'      # Gray for sea monster
+        self.RESET = '\033[0m'      # Reset color
+
+        # Fallback symbols when colors aren't supported
+        self.symbols = {
+            self.BLUE: '~',    # water
+            self.GREEN: '#',   # inhabited islands
+            self.YELLOW: 'o',  # uninhabited islands
+            self.RED: 'S',     # ships
+            self.WHITE: '@',   # player
+            self.GRAY: '8',    # sea monster
+        }
+
+        # Glyph atlas: (symbol, color) -> finished string, filled on first use
+        self.atlas = {}
+
     def colorize(self, text, color):
         """Apply color to text with fallback symbols"""
         if self.use_colors:
             return f"{color}{text}{self.RESET}"
-        else:
-            # Fallback symbols when colors aren't supported
-            symbols = {
-                self.BLUE: '~',    # water
-                self.GREEN: '#',   # inhabited islands
-                self.YELLOW: 'o',  # uninhabited islands
-                self.RED: 'S',     # ships
-                self.WHITE: '@',   # player
-                self.GRAY: '8',    # sea monster
-            }
-            return symbols.get(color, text)
+        if len(text) == 1:
+            # Map squares get a symbol per color, longer text is left alone
+            return self.symbols.get(color, text)
+        return text
+
+    def glyph(self, symbol, color):
+        """Return a colorized map symbol from the glyph atlas"""
+        glyph = self.atlas.get((symbol, color))
+        if glyph is None:
+            glyph = self.atlas[(symbol, color)] = self.colorize(symbol, color)
+        return glyph
+
+# Create a global instance
+COLORS = Colors()
+
+class AnsiBackend:
+    """Writes frames to the terminal"""
+
+    def __init__(self, stream=None):
+        self.stream = stream
+        self.frames = 0
+        self.bytes = 0
+
+    def write_frame(self, text):
+        stream = self.stream or sys.stdout
+        stream.write(text)
+        stream.flush()
+        self.frames += 1
+        self.bytes += len(text)
+
+class NullBackend:
+    """Drops frames, for headless and benchmark runs, but still counts them"""
+
+    def __init__(self):
+        self.frames = 0
+        self.bytes = 0
+
+    def write_frame(self, text):
+        self.frames += 1
+        self.bytes += len(text)
+
+class RecordingBackend:
+    """Appends every frame to a file, optionally passing it on to another backend"""
+
+    def __init__(self, path, passthrough=None):
+        self.path = path
+        self.passthrough = passthrough
+        self.frames = 0
+        self.bytes = 0
+
+    def write_frame(self, text):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(f"=== Frame {self.frames + 1} ===\n{text}\n")
+        if self.passthrough:
+            self.passthrough.write_frame(text)
+        self.frames += 1
+        self.bytes += len(text)
+
+class FrameBuffer:
+    """Assembles a whole screen and hands it to the backend in a single write"""
+
+    def __init__(self, backend=None):
+        self.backend = backend or AnsiBackend()
+        self.parts = []
+
+    def set_backend(self, backend):
+        self.flush()
+        self.backend = backend
+
+    def write(self, text):
+        self.parts.append(text)
+
+    def flush(self):
+        if self.parts:
+            self.backend.write_frame("".join(self.parts))
+            self.parts = []
 
 # Create a global instance
-COLORS = Colors() 
\ No newline at end of file
+FRAMES = FrameBuffer()
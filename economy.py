@@ -0,0 +1,215 @@
+import argparse
+import random
+import time
+import numpy as np
+from crystalquest.items import trade_goods
+
+GOODS = list(trade_goods.keys())
+BASE_PRICES = np.array([trade_goods[good]['price'] for good in GOODS], dtype=np.float64)
+
+# Barrels of every good a thousand townsfolk use up a day
+CONSUMPTION = 5
+# Towns use up (or lose to spoilage) a share of 1 / COVER_DAYS of their stock a day, so a town
+# keeps that many days of consumption in stock when it produces as much as it uses
+COVER_DAYS = 20
+# What towns produce of every good, compared to what they use up
+SUPPLY = (0.4, 1.3)
+# Each town has a few goods it produces far more of than it needs
+SPECIALTIES = 2
+SPECIALTY_SUPPLY = (3.0, 5.0)
+# How strongly prices follow scarcity, and how far they can move from the base price
+ELASTICITY = 0.7
+MIN_PRICE = 0.3
+MAX_PRICE = 3.0
+
+class TownMarket:
+    """View of one town's goods in the economy"""
+
+    def __init__(self, economy, row):
+        self.economy = economy
+        self.row = row
+
+    def price(self, good):
+        """Price of a barrel of a good in gold"""
+        return max(1, int(round(self.economy.price[self.row, GOODS.index(good)])))
+
+    def stock(self, good):
+        """Whole barrels of a good the town has to sell"""
+        return int(self.economy.stock[self.row, GOODS.index(good)])
+
+    def trade(self, good, amount):
+        """Take barrels out of the town's stock, or put them in with a negative amount"""
+        self.economy.trade(self.row, GOODS.index(good), -amount)
+
+class Economy:
+    """Supply, demand and prices of every good in every town.
+
+    Each town is a row of a set of towns x goods NumPy arrays: what it has in
+    stock, produces a day and would like to keep in stock (COVER_DAYS of its
+    consumption), and the resulting prices. A day of the whole economy is a
+    handful of vectorized operations, whatever the number of towns. Stocks
+    grow with production, shrink with use, and move with what the player and
+    the trade ships buy and sell. Prices rise as a good gets scarce compared
+    to what the town wants of it, and fall when it piles up.
+
+    Towns are registered as inhabited islands join the world, like their
+    ports (see Registry). A town replaced by a new one keeps its row.
+    """
+
+    def __init__(self, capacity=64, rng=None):
+        # Seeded from the random module unless given a generator
+        self.rng = np.random.default_rng(random.getrandbits(64)) if rng is None else rng
+        self.towns = {}  # island -> {town name: row}
+        self.size = 0  # Rows handed out so far, free rows below this get reused
+        self.free_rows = []
+        self._allocate(capacity)
+
+    @classmethod
+    def from_tables(cls, rng, towns, stock, production, demand):
+        """Rebuild a saved economy, towns gives the row of every town in the towns x goods tables.
+
+        Draws nothing from the random module, loading a game doesn't change what happens next.
+        """
+        size = len(stock)
+        economy = cls(max(64, 1 << max(size - 1, 0).bit_length()), rng)
+        economy.towns = towns
+        economy.size = size
+        economy.stock[:size] = stock
+        economy.production[:size] = production
+        economy.demand[:size] = demand
+        economy._update_prices(slice(0, size))
+        return economy
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        shape = (capacity, len(GOODS))
+        self.stock = np.zeros(shape)
+        self.production = np.zeros(shape)
+        self.demand = np.zeros(shape)  # Stock a town wants to keep
+        self.price = np.zeros(shape)
+
+    def _grow(self):
+        old = {name: getattr(self, name) for name in ('stock', 'production', 'demand', 'price')}
+        self._allocate(self.capacity * 2)
+        for name, values in old.items():
+            getattr(self, name)[:len(values)] = values
+
+    def add_island(self, island):
+        """Register the towns of an inhabited island"""
+        for town_name, town in island.towns.items():
+            self.add_town(island, town_name, town.population)
+
+    def remove_island(self, island):
+        """Forget the towns of an island, their rows go to the next towns registered"""
+        for row in self.towns.pop(island, {}).values():
+            self.stock[row] = self.production[row] = self.demand[row] = 0
+            self.free_rows.append(row)
+
+    def add_town(self, island, town_name, population):
+        """Register a town and return its row, a town already registered keeps its market"""
+        row = self.towns.get(island, {}).get(town_name)
+        if row is not None:
+            return row
+        if self.free_rows:
+            row = self.free_rows.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            row = self.size
+            self.size += 1
+        goods = len(GOODS)
+        consumption = population / 1000 * CONSUMPTION * self.rng.uniform(0.5, 1.5, goods)
+        supply = self.rng.uniform(*SUPPLY, goods)
+        specialties = self.rng.choice(goods, SPECIALTIES, replace=False)
+        supply[specialties] = self.rng.uniform(*SPECIALTY_SUPPLY, SPECIALTIES)
+        self.demand[row] = COVER_DAYS * consumption
+        self.production[row] = supply * consumption
+        self.stock[row] = supply * self.demand[row]  # Where production and use balance out
+        self.towns.setdefault(island, {})[town_name] = row
+        self._update_prices(row)
+        return row
+
+    def market(self, island, town_name):
+        """Return the TownMarket of a town, or None if it isn't registered"""
+        row = self.towns.get(island, {}).get(town_name)
+        return None if row is None else TownMarket(self, row)
+
+    def _update_prices(self, rows=slice(None)):
+        scarcity = self.demand[rows] + 1
+        scarcity /= self.stock[rows] + 1
+        np.power(scarcity, ELASTICITY, out=scarcity)
+        np.clip(scarcity, MIN_PRICE, MAX_PRICE, out=scarcity)
+        scarcity *= BASE_PRICES
+        self.price[rows] = scarcity
+
+    def step(self, days=1):
+        """Advance every town's stock a number of days and price it.
+
+        A day uses up 1 / COVER_DAYS of the stock and adds production. That
+        is a linear map, so any number of days is worked out in closed form
+        at the cost of one.
+        """
+        n = self.size
+        if days <= 0 or not n:
+            return
+        keep = (1 - 1 / COVER_DAYS) ** days
+        stock = self.stock[:n]
+        stock *= keep
+        stock += self.production[:n] * ((1 - keep) * COVER_DAYS)
+        self._update_prices(slice(0, n))
+
+    def trade(self, row, good, amount):
+        """Add barrels of a good to a town's stock (or take them with a negative amount)"""
+        self.stock[row, good] = max(self.stock[row, good] + amount, 0)
+        self._update_prices(row)
+
+    def deliver(self, islands, goods, amounts):
+        """Add goods at islands (or take them with negative amounts), shared evenly between their towns"""
+        rows, columns, shares = [], [], []
+        for island, good, amount in zip(islands, goods, amounts):
+            towns = list(self.towns.get(island, {}).values())
+            if not towns:
+                continue  # Uninhabited now, or an island of an evicted chunk
+            rows.extend(towns)
+            columns.extend([good] * len(towns))
+            shares.extend([amount / len(towns)] * len(towns))
+        if not rows:
+            return
+        rows = np.array(rows, dtype=np.intp)
+        np.add.at(self.stock, (rows, np.array(columns, dtype=np.intp)), shares)
+        rows = np.unique(rows)
+        self.stock[rows] = np.maximum(self.stock[rows], 0)
+        self._update_prices(rows)
+
+def main():
+    parser = argparse.ArgumentParser(description="Time a day of the economy for many towns")
+    parser.add_argument('--towns', type=int, default=5000, help="towns in the economy")
+    parser.add_argument('--days', type=int, default=1000, help="days to step")
+    parser.add_argument('--deliveries', type=int, default=100, help="ship deliveries a day")
+    parser.add_argument('--seed', type=int, default=0, help="random seed")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    economy = Economy()
+    islands = [object() for _ in range(args.towns)]  # Stand-ins, the economy only uses them as keys
+    start = time.perf_counter()
+    for island in islands:
+        economy.add_town(island, 'Town', random.randint(100, 1000))
+    print(f"Registered {args.towns} towns in {time.perf_counter() - start:.2f}s")
+
+    rng = np.random.default_rng(args.seed)
+    start = time.perf_counter()
+    for _ in range(args.days):
+        economy.step()
+        targets = rng.integers(0, len(islands), args.deliveries)
+        economy.deliver([islands[i] for i in targets.tolist()], rng.integers(0, len(GOODS), args.deliveries),
+                        rng.integers(-20, 20, args.deliveries))
+    elapsed = time.perf_counter() - start
+    print(f"Stepped {args.days} days with {args.deliveries} deliveries each in {elapsed:.2f}s "
+          f"({elapsed / args.days * 1e6:.0f}us a day)")
+    prices = economy.price[:economy.size] / BASE_PRICES
+    print(f"Prices range from {prices.min():.2f} to {prices.max():.2f} times their base price "
+          f"(median {np.median(prices):.2f})")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+import random
+import numpy as np
+from crystalquest.items import ship_types, trade_goods
+
+SHIP_TYPES = list(ship_types.keys())
+GOODS = list(trade_goods.keys())
+
+# Number of nearby inhabited islands a trade ship picks its destination from
+TRADE_DESTINATION_CHOICES = 8
+# Days a trade ship stays at its destination before heading home
+DAYS_AT_DESTINATION = 3
+
+# Ship states
+FREE = -1       # Row not in use
+OUTBOUND = 0    # Sailing to (or waiting at) its destination
+RETURNING = 1   # Sailing back to its home island
+IDLE = 2        # No destination to sail to
+
+class Fleet:
+    """Struct-of-arrays store for every trade ship in the world.
+
+    Each ship is a row in a set of NumPy arrays (positions, targets, speeds,
+    states, arrival days and trade goods), so the daily move of the whole
+    fleet is a handful of vectorized operations. TradeShip objects are thin
+    views over a row. Ships that reach their destination schedule their
+    departure home with the world's scheduler, all of one day's arrivals in
+    one event. Arriving, ships unload the good they sell at their destination
+    and load the one they buy, and the other way round back home, through the
+    world's economy. Ships that find no destination to sail to go IDLE at home
+    and the world retires them.
+
+    Ships follow the sea lanes of the world's route table, one waypoint after
+    another: leg is the index of the waypoint a ship heads for and leg_end the
+    last one of its route. Ships with leg -1 sail straight to their target
+    (worlds without a route table, or routes planned for an older map).
+
+    Islands are referred to by a fleet island id. For each home island the
+    fleet caches the ids of its nearest inhabited islands, so ships coming
+    home pick their next destination without a spatial query each.
+    """
+
+    # Per-ship columns, copied over when the fleet grows
+    COLUMNS = ('position', 'last_position', 'home', 'destination', 'home_id',
+               'destination_id', 'leg', 'leg_end', 'speed', 'state', 'arrival_day', 'ids', 'type',
+               'crew', 'cargo', 'selling', 'buying', 'views')
+
+    def __init__(self, world, capacity=64, rng=None):
+        self.world = world
+        # Seeded from the random module unless given a generator
+        self.rng = np.random.default_rng(random.getrandbits(64)) if rng is None else rng
+        self.count = 0  # Ships in the fleet
+        self.size = 0  # Rows handed out so far, free rows below this get reused
+        self.free_rows = []
+        self.next_id = 0  # Ship ids are never reused, unlike rows
+        self._allocate(capacity)
+
+        # Islands ships sail between
+        self.islands = []  # Fleet island id -> island
+        self.island_ids = {}  # Island -> fleet island id
+        self.island_coords = np.zeros((16, 2), dtype=np.int32)
+        self.choices = np.full((16, TRADE_DESTINATION_CHOICES), -1, dtype=np.int32)
+        self.choice_counts = np.zeros(16, dtype=np.int32)
+        self.choice_versions = np.full(16, -1, dtype=np.int64)  # Inhabited index version of each row
+        self.routes = None  # Route table the legs refer to
+        self.route_nodes = np.full(16, -1, dtype=np.int32)  # Fleet island id -> route table index
+
+    @classmethod
+    def from_columns(cls, world, rng, size, next_id, free_rows, islands, choices, routes, rows, columns):
+        """Rebuild a saved fleet from its columns, without its TradeShip views.
+
+        islands are the fleet islands by fleet island id, and choices their
+        cached destination choices as (counts, current, ids): how many each
+        island has, whether they were looked up for the world's current
+        inhabited islands, and the fleet island ids of all of them one island
+        after another. columns holds the per-ship COLUMNS of the ships in rows,
+        their home and destination coordinates are looked up from the islands.
+        """
+        fleet = cls(world, max(64, 1 << max(size - 1, 0).bit_length()), rng)
+        fleet.size = size
+        fleet.next_id = next_id
+        fleet.free_rows = free_rows
+
+        count = len(islands)
+        capacity = max(16, 1 << max(count - 1, 0).bit_length())
+        fleet.islands = list(islands)
+        fleet.island_ids = {island: i for i, island in enumerate(islands)}
+        fleet.island_coords = np.zeros((capacity, 2), dtype=np.int32)
+        coordinates = np.array([island.coordinates for island in islands], dtype=np.int32).reshape(-1, 2)
+        fleet.island_coords[:count] = coordinates
+        counts, current, ids = choices
+        fleet.choice_counts = np.zeros(capacity, dtype=np.int32)
+        fleet.choice_counts[:count] = counts
+        fleet.choice_versions = np.full(capacity, -1, dtype=np.int64)
+        fleet.choice_versions[:count] = np.where(current, world.inhabited_index.version, -1)
+        fleet.choices = np.full((capacity, TRADE_DESTINATION_CHOICES), -1, dtype=np.int32)
+        starts = np.repeat(np.cumsum(counts) - counts, counts)
+        fleet.choices[np.repeat(np.arange(count), counts), np.arange(len(ids)) - starts] = ids
+        fleet.routes = routes
+        fleet.route_nodes = np.full(capacity, -1, dtype=np.int32)
+        if routes is not None:
+            fleet.route_nodes[:count] = [routes.index.get(island, -1) for island in islands]
+
+        for name, values in columns.items():
+            getattr(fleet, name)[rows] = values
+        fleet.home[rows] = fleet.island_coords[fleet.home_id[rows]]
+        sailing = rows[fleet.destination_id[rows] >= 0]
+        fleet.destination[sailing] = fleet.island_coords[fleet.destination_id[sailing]]
+        fleet.count = len(rows)
+        return fleet
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.position = np.zeros((capacity, 2), dtype=np.int32)
+        self.last_position = np.zeros((capacity, 2), dtype=np.int32)
+        self.home = np.zeros((capacity, 2), dtype=np.int32)
+        self.destination = np.zeros((capacity, 2), dtype=np.int32)
+        self.home_id = np.zeros(capacity, dtype=np.int32)
+        self.destination_id = np.full(capacity, -1, dtype=np.int32)
+        self.leg = np.full(capacity, -1, dtype=np.int32)
+        self.leg_end = np.full(capacity, -1, dtype=np.int32)
+        self.speed = np.zeros(capacity, dtype=np.int32)
+        self.state = np.full(capacity, FREE, dtype=np.int8)
+        self.arrival_day = np.full(capacity, -1, dtype=np.int32)  # Day the destination was reached
+        self.ids = np.full(capacity, -1, dtype=np.int64)  # Ship id of each row
+        self.type = np.zeros(capacity, dtype=np.int8)
+        self.crew = np.zeros(capacity, dtype=np.int16)
+        self.cargo = np.zeros(capacity, dtype=np.int16)
+        self.selling = np.zeros(capacity, dtype=np.int8)
+        self.buying = np.zeros(capacity, dtype=np.int8)
+        self.views = [None] * capacity
+
+    def _grow(self):
+        old = {name: getattr(self, name) for name in self.COLUMNS}
+        self._allocate(self.capacity * 2)
+        for name, column in old.items():
+            getattr(self, name)[:len(column)] = column
+
+    def island_id(self, island):
+        """Return the fleet island id of an island, registering it on first use"""
+        island_id = self.island_ids.get(island)
+        if island_id is None:
+            island_id = len(self.islands)
+            if island_id == len(self.island_coords):
+                grow = len(self.island_coords)
+                self.island_coords = np.concatenate([self.island_coords, np.zeros((grow, 2), dtype=np.int32)])
+                self.choices = np.concatenate([self.choices, np.full_like(self.choices, -1)])
+                self.choice_counts = np.concatenate([self.choice_counts, np.zeros(grow, dtype=np.int32)])
+                self.choice_versions = np.concatenate([self.choice_versions, np.full(grow, -1, dtype=np.int64)])
+                self.route_nodes = np.concatenate([self.route_nodes, np.full(grow, -1, dtype=np.int32)])
+            self.islands.append(island)
+            self.island_ids[island] = island_id
+            self.island_coords[island_id] = island.coordinates
+            if self.routes is not None:
+                self.route_nodes[island_id] = self.routes.index.get(island, -1)
+        return island_id
+
+    def add(self, view, home_island):
+        """Add a new trade ship at its home island and return its row"""
+        if self.free_rows:
+            row = self.free_rows.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow()
+            row = self.size
+            self.size += 1
+
+        # Ship type
+        ship_type = random.choice(SHIP_TYPES)
+        stats = ship_types[ship_type]
+        self.type[row] = SHIP_TYPES.index(ship_type)
+        self.crew[row] = random.randint(5, stats['crew_max'])
+        self.speed[row] = stats['speed']
+        self.cargo[row] = stats['cargo']
+
+        # Location and movement
+        self.home_id[row] = self.island_id(home_island)
+        self.home[row] = home_island.coordinates
+        self.position[row] = home_island.coordinates
+        self.last_position[row] = home_island.coordinates
+        self.destination_id[row] = -1
+        self.state[row] = IDLE
+        self.arrival_day[row] = -1
+
+        # Trade goods
+        selling = random.choice(GOODS)
+        self.selling[row] = GOODS.index(selling)
+        self.buying[row] = GOODS.index(random.choice([g for g in GOODS if g != selling]))
+
+        self.views[row] = view
+        view.id = self.next_id
+        self.ids[row] = self.next_id
+        self.next_id += 1
+        self.count += 1
+
+        # Set random destination (not home island)
+        self.set_new_destinations(np.array([row]))
+        return row
+
+    def remove(self, row):
+        """Take a ship out of the fleet (sunk or culled)"""
+        if self.state[row] == FREE:
+            return
+        self.state[row] = FREE
+        self.destination_id[row] = -1
+        self.views[row] = None
+        self.free_rows.append(row)
+        self.count -= 1
+
+    def _update_choices(self, island_ids):
+        """Refresh the cached destination choices of home islands whose neighbourhood changed"""
+        version = self.world.inhabited_index.version
+        stale = island_ids[self.choice_versions[island_ids] != version]
+        for island_id in np.unique(stale):
+            home_island = self.islands[island_id]
+            nearby = self.world.nearest_inhabited_islands(
+                home_island.coordinates, TRADE_DESTINATION_CHOICES, exclude=home_island)
+            # Registering can grow the tables, so look up all the ids first
+            nearby_ids = [self.island_id(island) for island in nearby]
+            self.choice_counts[island_id] = len(nearby_ids)
+            self.choices[island_id, :len(nearby_ids)] = nearby_ids
+            self.choice_versions[island_id] = version
+
+    def _update_routes(self):
+        """Pick up a newly planned route table"""
+        routes = self.world.route_table()
+        if routes is self.routes:
+            return
+        self.routes = routes
+        self.route_nodes[:] = -1
+        if routes is not None:
+            self.route_nodes[:len(self.islands)] = [routes.index.get(island, -1) for island in self.islands]
+        # Waypoints of the old table mean nothing now, ships at sea finish their trip in a straight line
+        self.leg[:] = -1
+        self.leg_end[:] = -1
+
+    def _set_legs(self, rows, from_ids, to_ids):
+        """Put ships on the sea lane between two islands"""
+        if self.routes is None:
+            self.leg[rows] = -1
+            return
+        a = self.route_nodes[from_ids]
+        b = self.route_nodes[to_ids]
+        known = (a >= 0) & (b >= 0)
+        self.leg[rows] = -1
+        self.leg_end[rows] = -1
+        if known.any():
+            self.leg[rows[known]], self.leg_end[rows[known]] = self.routes.legs(a[known], b[known])
+
+    def set_new_destinations(self, rows):
+        """Send ships to random inhabited islands near their homes"""
+        self._update_routes()
+        home_ids = self.home_id[rows]
+        self._update_choices(home_ids)
+        counts = self.choice_counts[home_ids]
+        found = counts > 0
+        # Ships without any choice stay docked at home with nowhere to go, the world retires them
+        stranded = rows[~found]
+        self.state[stranded] = IDLE
+        self.destination_id[stranded] = -1
+        self.arrival_day[stranded] = -1
+        self.leg[stranded] = -1
+        rows, home_ids, counts = rows[found], home_ids[found], counts[found]
+        picks = (self.rng.random(len(rows)) * counts).astype(np.intp)
+        destination_ids = self.choices[home_ids, picks]
+        self.destination_id[rows] = destination_ids
+        self.destination[rows] = self.island_coords[destination_ids]
+        self._set_legs(rows, home_ids, destination_ids)
+        self.state[rows] = OUTBOUND
+        self.arrival_day[rows] = -1
+
+    def send_home(self, day, rows, ids):
+        """Scheduled departure of ships that spent their days at a destination"""
+        # Ships sunk since, or rows that went to a new ship, are skipped
+        rows = rows[(self.ids[rows] == ids) & (self.state[rows] == OUTBOUND) & (self.arrival_day[rows] >= 0)]
+        self._update_routes()
+        self.state[rows] = RETURNING
+        self._set_legs(rows, self.destination_id[rows], self.home_id[rows])
+
+    def days_at_destination(self, row):
+        if self.state[row] != OUTBOUND or self.arrival_day[row] < 0:
+            return 0
+        return int(min(self.world.scheduler.day - self.arrival_day[row] + 1, DAYS_AT_DESTINATION))
+
+    def _sailing_rows(self):
+        """Rows of the ships under way: outbound and not arrived yet, or returning"""
+        state = self.state[:self.size]
+        return np.nonzero((state == RETURNING) | ((state == OUTBOUND) & (self.arrival_day[:self.size] < 0)))[0]
+
+    def _targets(self, rows):
+        """Return the square each ship heads for next: its waypoint, destination or home"""
+        target = np.where((self.state[rows] == RETURNING)[:, None], self.home[rows], self.destination[rows])
+        legs = self.leg[rows]
+        on_route = legs >= 0
+        if self.routes is not None and on_route.any():
+            target[on_route] = self.routes.waypoints[legs[on_route]]
+        return target
+
+    def _remaining(self, rows):
+        """Squares ships have left to sail to the end of their trip"""
+        remaining = np.abs(self._targets(rows) - self.position[rows]).max(axis=1, initial=0)
+        legs = self.leg[rows]
+        on_route = legs >= 0
+        if self.routes is not None and on_route.any():
+            remaining[on_route] += self.routes.tail[legs[on_route]]
+        return remaining
+
+    def days_to_arrival(self, row):
+        """Days until a ship ends its trip, at its destination or back home"""
+        self._update_routes()
+        if self.state[row] == OUTBOUND and self.arrival_day[row] >= 0:
+            # Waiting at its destination: it leaves when its days are up, then sails home
+            a = self.route_nodes[self.destination_id[row]]
+            b = self.route_nodes[self.home_id[row]]
+            distance = -1
+            if self.routes is not None and a >= 0 and b >= 0:
+                distance = self.routes.distances([a], [b])[0]
+            if distance < 0:
+                distance = np.abs(self.home[row] - self.destination[row]).max()
+            leaving = self.arrival_day[row] + DAYS_AT_DESTINATION - 1 - self.world.scheduler.day
+            return int(max(leaving, 0) + -(-distance // self.speed[row]))
+        rows = np.array([row])
+        return int(max(1, -(-self._remaining(rows)[0] // self.speed[row])))
+
+    def days_to_next_arrival(self):
+        """Days until the first ship under way reaches the end of its trip, or None"""
+        self._update_routes()
+        if (self.state[:self.size] == IDLE).any():
+            return 1
+        rows = self._sailing_rows()
+        if not len(rows):
+            return None
+        return int((-(-self._remaining(rows) // self.speed[rows])).min())
+
+    def _advance(self, rows, squares):
+        """Move ships a number of squares along their routes in one go"""
+        while len(rows):
+            target = self._targets(rows)
+            delta = target - self.position[rows]
+            distance = np.abs(delta).max(axis=1)
+            moved = np.minimum(squares, distance)
+            self.position[rows] += np.sign(delta) * np.minimum(np.abs(delta), moved[:, None])
+            squares = squares - moved
+            # Ships that reached a waypoint turn towards the next one with what they have left
+            legs = self.leg[rows]
+            turning = (moved == distance) & (legs >= 0) & (legs < self.leg_end[rows])
+            self.leg[rows[turning]] += 1
+            more = turning & (squares > 0)
+            rows, squares = rows[more], squares[more]
+
+    def sail(self, days):
+        """Move every ship under way a number of days ahead, as that many steps would.
+
+        Only for stretches in which no ship ends its trip (see
+        days_to_next_arrival): ships pass waypoints in closed form, but
+        arrivals are left to step.
+        """
+        self._update_routes()
+        rows = self._sailing_rows()
+        if not len(rows) or days <= 0:
+            return
+        home = self.home[rows]
+        at_home = (self.state[rows] == OUTBOUND) & (self.position[rows] == home).all(axis=1)
+        speed = self.speed[rows].astype(np.int64)
+        if days > 1:
+            self._advance(rows, speed * (days - 1))
+        self.last_position[rows] = self.position[rows]
+        self._advance(rows, speed)
+
+        # Let the home ports know which of their ships set sail
+        departed = at_home & (self.position[rows] != home).any(axis=1)
+        registry = self.world.registry
+        for row in rows[departed]:
+            registry.ship_departed(self.views[row])
+
+    def active_rows(self):
+        return np.nonzero(self.state[:self.size] != FREE)[0]
+
+    def ships(self):
+        """Return the TradeShip views of every ship in the fleet"""
+        return [self.views[row] for row in self.active_rows()]
+
+    def stranded_ships(self):
+        """Return the ships that found no destination to sail to"""
+        return [self.views[row] for row in np.nonzero(self.state[:self.size] == IDLE)[0]]
+
+    def _trade(self, rows, island_ids, unloading, loading):
+        """Ships unload a full cargo of one good at islands and load one of another"""
+        islands = [self.islands[island_id] for island_id in island_ids.tolist()]
+        cargo = self.cargo[rows].astype(np.float64)
+        self.world.economy.deliver(islands + islands, np.concatenate([unloading[rows], loading[rows]]),
+                                   np.concatenate([cargo, -cargo]))
+
+    def step(self, rows=None):
+        """Advance ships by one day, every ship in the fleet unless rows is given.
+
+        Ships move a square at a time, up to their speed, along both axes at
+        once (like the numpad moves), so integer positions always make progress
+        and ships never stall. Reaching a waypoint of their route, they turn
+        towards the next one.
+        """
+        n = self.size
+        self._update_routes()
+        state = self.state[:n]
+        if rows is None:
+            selected = state != FREE
+        else:
+            selected = np.zeros(n, dtype=bool)
+            selected[rows] = True
+        moving = selected & ((state == OUTBOUND) | (state == RETURNING))
+        returning = moving & (state == RETURNING)
+
+        # Ships without a destination try to find one instead of moving
+        idle = np.nonzero(selected & (state == IDLE))[0]
+        if len(idle):
+            self.set_new_destinations(idle)
+
+        position = self.position[:n]
+        home = self.home[:n]
+        at_home = moving & ~returning & (position[:, 0] == home[:, 0]) & (position[:, 1] == home[:, 1])
+        np.copyto(self.last_position[:n], position, where=moving[:, None])
+
+        # Head for the next waypoint, or straight for the destination (or home)
+        leg = self.leg[:n]
+        leg_end = self.leg_end[:n]
+        on_route = moving & (leg >= 0)
+        target = np.where(returning[:, None], home, self.destination[:n])
+        if self.routes is not None and on_route.any():
+            target[on_route] = self.routes.waypoints[leg[on_route]]
+
+        remaining = np.where(moving, self.speed[:n], 0)
+        arrived = np.zeros(n, dtype=bool)
+        for _ in range(int(remaining.max(initial=0))):
+            sailing = (remaining > 0) & ~arrived
+            position += np.sign(target - position) * sailing[:, None]
+            remaining -= sailing
+            reached = sailing & (position[:, 0] == target[:, 0]) & (position[:, 1] == target[:, 1])
+            turning = reached & on_route & (leg < leg_end)
+            if turning.any():
+                leg[turning] += 1
+                target[turning] = self.routes.waypoints[leg[turning]]
+            arrived |= reached & ~turning
+        # Only ships that sailed in have arrived, one that was there already (an old save) has nothing to trade
+        sailed_in = (position[:, 0] != self.last_position[:n, 0]) | (position[:, 1] != self.last_position[:n, 1])
+        departed = at_home & ((position[:, 0] != home[:, 0]) | (position[:, 1] != home[:, 1]))
+
+        # Ships reaching their destination stay a few days, the scheduler sends them home
+        at_destination = np.nonzero(arrived & ~returning & (self.arrival_day[:n] < 0))[0]
+        if len(at_destination):
+            scheduler = self.world.scheduler
+            self.arrival_day[at_destination] = scheduler.day
+            scheduler.schedule(scheduler.day + DAYS_AT_DESTINATION, self.send_home,
+                               at_destination, self.ids[at_destination])
+            traded = at_destination[sailed_in[at_destination]]
+            self._trade(traded, self.destination_id[traded], self.selling, self.buying)
+
+        # Ships back home dock and set off on their next trip right away
+        docked = np.nonzero(arrived & returning)[0]
+        if len(docked):
+            traded = docked[sailed_in[docked]]
+            self._trade(traded, self.home_id[traded], self.buying, self.selling)
+            self.set_new_destinations(docked)
+
+        # Let the home ports know which of their ships came and went
+        registry = self.world.registry
+        for row in np.nonzero(departed)[0]:
+            registry.ship_departed(self.views[row])
+        for row in docked:
+            registry.ship_arrived(self.views[row])
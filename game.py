@@ -1,16 +1,18 @@
 import random
 import pickle
 import os
-from datetime import datetime
+from functools import partial
+import numpy as np
 from crystalquest.items import (
-    sacred_artifact_abilities, 
+    roll_artifact,
     treasure_types, 
     weapons, 
     trade_goods, 
     ship_types
 )
 from crystalquest.colors import COLORS
-from crystalquest.ascii_art import load_ascii_art, display_ascii_art
+from crystalquest.render import RENDERER
+from crystalquest.ascii_art import ArtLoader, display_ascii_art
 from crystalquest.ships import Ship, TradeShip
 from crystalquest.locations.shipyard import Shipyard
 from crystalquest.locations.pub import Pub
@@ -19,6 +21,19 @@ from crystalquest.locations.smithy import Smithy
 from crystalquest.locations.home import Home
 from crystalquest.locations.port import Port
 from crystalquest.locations.ruins import Ruins
+from crystalquest.placement import PlacementEngine, ISLAND_SIDES
+from crystalquest.worldpool import WorldPool
+from crystalquest.spatial import IslandIndex, PositionIndex
+from crystalquest.fleet import Fleet
+from crystalquest.registry import Registry
+from crystalquest.economy import Economy
+from crystalquest.scheduler import Scheduler
+from crystalquest.routes import RouteTable
+from crystalquest.monsters import SeaMonsters
+from crystalquest.savefile import FORMAT_VERSION, snapshot_game, encode_snapshot, load_game_data
+from crystalquest.saveindex import SaveIndex
+from crystalquest.journal import JOURNAL, ask, encode_journal, JOURNAL_VERSION
+from crystalquest.autosave import Autosaver, SAVE_FOLDER, new_save_path, save_time, write_atomic
 
 # Lists for random generation
 climates = ["Tropical", "Temperate", "Mediterranean", "Arctic", "Subtropical"]
@@ -31,10 +46,14 @@ island_suffixes = ["Isle", "Island", "Haven", "Bay", "Cove", "Shores", "Point"]
 pirate_name_prefixes = ["Captain", "Black", "Red", "Mad", "Cruel", "Salty", "Iron", "Gold", "Silver", "Bloody"]
 pirate_name_suffixes = ["Cruelbeard", "Meathook", "Lumpeye", "Sabertooth", "Crookclaw", "Doublefang", "Shadowheart", "Dusthand", "Winterbones", "IceStorm"]
 
+# Map window size and the largest minimap side, in squares
+VIEW_SIZE = 25
+MINIMAP_SIZE = 40
+
 class Town:
-    def __init__(self, name, is_home_town=False):
+    def __init__(self, name, is_home_town=False, rng=random):
         self.name = name
-        self.population = random.randint(100, 1000)
+        self.population = rng.randint(100, 1000)
         self.locations = {
             'shipyard': Shipyard(),
             'pub': Pub(),
@@ -45,6 +64,18 @@ class Town:
         if is_home_town:
             self.locations['home'] = Home()
 
+    @classmethod
+    def from_saved(cls, name, population, port, home=False):
+        """Rebuild a saved town around its port"""
+        town = cls.__new__(cls)  # __init__ would draw a new population
+        town.name = name
+        town.population = population
+        town.locations = {'shipyard': Shipyard(), 'pub': Pub(), 'smithy': Smithy(), 'market': Market(),
+                          'port': port}
+        if home:
+            town.locations['home'] = Home()
+        return town
+
 class Nemesis:
     def __init__(self):
         self.species = random.choice(animal_species)
@@ -61,10 +92,17 @@ class Nemesis:
             "Psyche": random.randint(5, 10)
         }
 
+    @classmethod
+    def from_saved(cls, state):
+        """Rebuild a saved nemesis from its attributes"""
+        nemesis = cls.__new__(cls)  # __init__ would roll a new one
+        nemesis.__dict__.update(state)
+        return nemesis
+
 class Character:
     def __init__(self):
         self.species = random.choice(animal_species)
-        self.name = input("Enter your character's name: ")
+        self.name = ask("Enter your character's name: ")
         self.island = None
         self.gold = 1000
         self.ship = None
@@ -95,7 +133,7 @@ class Character:
         print(f"Last seen commanding a {self.nemesis.ship_type}.")
 
         # Give player a random sacred artifact at start
-        starting_artifact = random.choice(sacred_artifact_abilities)
+        starting_artifact = roll_artifact()
         print(f"\nYour family artifact is a {starting_artifact['name']}!")
         print(starting_artifact['description'])
         
@@ -118,6 +156,16 @@ class Character:
             }
             print(f"The {starting_artifact['name']} has {starting_artifact['damage']} damage as a {starting_artifact['weapon_type']} weapon!")
 
+    @classmethod
+    def from_saved(cls, state, inventory, nemesis, ship=None):
+        """Rebuild a saved character from its attributes, without asking for a name or rolling stats"""
+        character = cls.__new__(cls)
+        character.__dict__.update(state)
+        character.inventory = inventory
+        character.nemesis = nemesis
+        character.ship = ship
+        return character
+
     def display_info(self):
         print("\n=== Character Information ===")
         print(f"Name: {self.name}")
@@ -146,47 +194,69 @@ class Character:
                     print(f"    {weapon}: {count}")
 
 class Island:
-    def __init__(self, name=None):
+    def __init__(self, name=None, rng=random):
         if name is None:
-            self.name = f"{random.choice(island_prefixes)} {random.choice(island_suffixes)}"
+            self.name = f"{rng.choice(island_prefixes)} {rng.choice(island_suffixes)}"
         else:
             self.name = name
             
-        self.size = random.choice(["Small", "Medium", "Large"])
-        self.climate = random.choice(climates)
+        self.size = rng.choice(["Small", "Medium", "Large"])
+        self.climate = rng.choice(climates)
         self.coordinates = None  # Initialize coordinates attribute
         
         num_biotopes = {
-            "Small": random.randint(2, 3),
-            "Medium": random.randint(3, 5),
-            "Large": random.randint(5, 7)
+            "Small": rng.randint(2, 3),
+            "Medium": rng.randint(3, 5),
+            "Large": rng.randint(5, 7)
         }[self.size]
-        self.biotopes = random.sample(biotopes, num_biotopes)
+        self.biotopes = rng.sample(biotopes, num_biotopes)
         
-        self.is_inhabited = random.random() > 0.3
+        self.is_inhabited = rng.random() > 0.3
         
         # Update ruins initialization
-        self.has_ruins = random.random() < 0.4  # 40% chance of ruins
+        self.has_ruins = rng.random() < 0.4  # 40% chance of ruins
         if self.has_ruins:
             self.ruins = Ruins()  # No longer needs type parameter
         
-        if not self.is_inhabited:
-            self.towns = {}
-            self.population = 0
-        else:
-            self.towns = {}
-            num_towns = {
-                "Small": 1,
-                "Medium": 2,
-                "Large": 3
-            }[self.size]
-            
-            self.towns = {}
-            for _ in range(num_towns):
-                town_name = f"{random.choice(town_names_prefixes)} {random.choice(town_names_suffixes)}"
-                self.towns[town_name] = Town(town_name)
-            
-            self.population = sum(town.population for town in self.towns.values())
+        self.towns = {}
+        self.population = 0
+        if self.is_inhabited:
+            self.populate(rng)
+
+    @classmethod
+    def from_saved(cls, name, size, climate, coordinates, biotopes, is_inhabited, has_ruins, treasure_found,
+                   population):
+        """Rebuild a saved island, its towns are added to towns afterwards and its id set by its map"""
+        island = cls.__new__(cls)  # __init__ would roll a new island
+        island.name = name
+        island.size = size
+        island.climate = climate
+        island.coordinates = coordinates
+        island.biotopes = biotopes
+        island.is_inhabited = is_inhabited
+        island.has_ruins = has_ruins
+        if has_ruins:
+            island.ruins = Ruins()
+            island.ruins.treasure_found = treasure_found
+        island.towns = {}
+        island.population = population
+        return island
+
+    def populate(self, rng=random):
+        """Found towns on the island and mark it as inhabited"""
+        self.is_inhabited = True
+        num_towns = {
+            "Small": 1,
+            "Medium": 2,
+            "Large": 3
+        }[self.size]
+        
+        self.towns = {}
+        for _ in range(num_towns):
+            town_name = f"{rng.choice(town_names_prefixes)} {rng.choice(town_names_suffixes)}"
+            self.towns[town_name] = Town(town_name, rng=rng)
+        
+        self.population = sum(town.population for town in self.towns.values())
 
     def display_info(self):
         print(f"\n=== {self.name} ===")
@@ -204,276 +274,602 @@ class Island:
                 print(f"Ancient Ruins discovered! ({status})")
 
 class Map:
+    # Squares shown around the player, bigger maps scroll
+    view_width = VIEW_SIZE
+    view_height = VIEW_SIZE
+
     def __init__(self, size=20):
         self.size = size
-        self.grid = [[None for _ in range(size)] for _ in range(size)]
+        self.grid = np.zeros((size, size), dtype=np.int32)  # 0 for water, otherwise an island id
+        self.island_table = [None]  # Island id -> Island, id 0 is water
+        self.version = 0  # Bumped whenever the terrain changes
+        self._placement = PlacementEngine(size)
+
+    @classmethod
+    def from_saved(cls, size, version, islands):
+        """Rebuild a saved map from its islands in id order, raises ValueError if one doesn't fit"""
+        game_map = cls.__new__(cls)
+        game_map.size = size
+        game_map.grid = np.zeros((size, size), dtype=np.int32)
+        game_map.island_table = [None] + list(islands)
+        game_map.version = version
+        game_map._placement = None  # Rebuilt from the islands on first use
+        for island_id, island in enumerate(islands, 1):
+            island.id = island_id
+        if not islands:
+            return game_map
+        sides = np.array([ISLAND_SIDES[island.size] for island in islands])
+        xs, ys = np.array([island.coordinates for island in islands]).T
+        outside = (xs < 0) | (ys < 0) | (xs + sides > size) | (ys + sides > size)
+        if outside.any():
+            raise ValueError(f"Saved island {islands[outside.argmax()].name} does not fit on the map")
+        # The islands were placed once already, mark them on the grid without the placement checks
+        squares = sides * sides
+        owner = np.repeat(np.arange(len(islands)), squares)
+        square = np.arange(len(owner)) - np.repeat(np.cumsum(squares) - squares, squares)
+        game_map.grid[xs[owner] + square // sides[owner], ys[owner] + square % sides[owner]] = owner + 1
+        return game_map
+
+    def __getstate__(self):
+        # The placement bitmaps are rebuilt from the islands, so keep them out of saves
+        state = self.__dict__.copy()
+        state['_placement'] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if 'island_table' not in state:
+            # Older saves stored Island references in a list of lists
+            old_grid = self.grid
+            self.grid = np.zeros((self.size, self.size), dtype=np.int32)
+            self.island_table = [None]
+            for x, row in enumerate(old_grid):
+                for y, island in enumerate(row):
+                    if island is None:
+                        continue
+                    if getattr(island, 'id', None) is None:
+                        island.id = len(self.island_table)
+                        self.island_table.append(island)
+                    self.grid[x, y] = island.id
+            self._placement = None
+        if 'version' not in state:
+            self.version = 0
+
+    @property
+    def placement(self):
+        if self._placement is None:
+            self._placement = PlacementEngine(self.size)
+            for island in self.island_table[1:]:
+                self._placement.mark(island.size, *island.coordinates)
+        return self._placement
         
     def place_island(self, island, x, y):
-        # Get island size in grid squares
-        sizes = {
-            "Small": [(0,0)],  # 1 square
-            "Medium": [(0,0), (0,1), (1,0), (1,1)],  # 4 squares
-            "Large": [(i,j) for i in range(3) for j in range(3)]  # 9 squares
-        }
-        
-        island_squares = sizes[island.size]
-        
-        # Calculate the buffer zone (including island size and 2-square water gap)
-        buffer = {
-            "Small": [(i,j) for i in range(-2,2) for j in range(-2,2)],
-            "Medium": [(i,j) for i in range(-2,4) for j in range(-2,4)],
-            "Large": [(i,j) for i in range(-2,5) for j in range(-2,5)]
-        }
-        
-        # Check if we can place the island here (including buffer zone)
-        # First check the buffer zone for other islands
-        for dx, dy in buffer[island.size]:
-            check_x, check_y = x + dx, y + dy
-            if 0 <= check_x < self.size and 0 <= check_y < self.size:
-                if self.grid[check_x][check_y] is not None:
-                    return False
-        
-        # Then check if the island itself fits on the map
-        for dx, dy in island_squares:
-            new_x, new_y = x + dx, y + dy
-            if not (0 <= new_x < self.size and 0 <= new_y < self.size):
-                return False
+        # Check the island fits on the map and its buffer zone (2-square water gap) is clear
+        if not self.placement.can_place(island.size, x, y):
+            return False
         
         # Place the island and store its coordinates
         island.coordinates = (x, y)  # Set the island's coordinates
-        for dx, dy in island_squares:
-            self.grid[x + dx][y + dy] = island
+        island.id = len(self.island_table)
+        self.island_table.append(island)
+        side = ISLAND_SIDES[island.size]
+        self.grid[x:x + side, y:y + side] = island.id
+        self.placement.mark(island.size, x, y)
+        self.version += 1
         return True
-    
-    def display(self, player_pos=None, ships=None, sea_monster=None, day=None):
-        print("\n=== World Map ===")
-        print("   " + " ".join(f"{i:2}" for i in range(self.size)))
-        for i in range(self.size):
-            row = f"{i:2} "
-            for j in range(self.size):
-                # Check player position first
-                if player_pos and (i, j) == player_pos:
-                    row += " " + COLORS.colorize("@", COLORS.WHITE) + " "
-                    continue
-                
-                # Check for sea monster
-                if sea_monster and sea_monster.position == (i, j) and day is not None and day % 3 == 0:
-                    row += " " + COLORS.colorize("∞", COLORS.GRAY) + " "
-                    continue
-                
-                # Check for ships
-                ship_here = False
-                if ships:
-                    for ship_pos, ship_type, is_player_ship in ships:
-                        if ship_pos == (i, j):
-                            if is_player_ship:
-                                row += " " + COLORS.colorize("@", COLORS.WHITE) + " "
-                            else:
-                                row += " " + COLORS.colorize(ship_type[0], COLORS.RED) + " "
-                            ship_here = True
-                            break
-                
-                if not ship_here:
-                    if self.grid[i][j] is None:
-                        row += " " + COLORS.colorize("~", COLORS.BLUE) + " "  # Water
-                    else:
-                        if self.grid[i][j].is_inhabited:
-                            row += " " + COLORS.colorize("I", COLORS.GREEN) + " "  # Inhabited island
-                        else:
-                            row += " " + COLORS.colorize("o", COLORS.YELLOW) + " "  # Uninhabited island
-            print(row)
+
+    def place_island_randomly(self, island):
+        """Place an island on a random free spot, returns False only if no spot is left"""
+        anchor = self.placement.find_anchor(island.size)
+        if anchor is None:
+            return False
+        return self.place_island(island, *anchor)
+
+    def in_bounds(self, x, y):
+        return 0 <= x < self.size and 0 <= y < self.size
+
+    def island_at(self, x, y):
+        """Return the island covering a square, or None for water"""
+        return self.island_table[self.grid[x, y]]
+
+    def is_water(self, x, y):
+        return self.grid[x, y] == 0
+
+    def water_cells(self):
+        """Return an (n, 2) array with the coordinates of every water square"""
+        return np.argwhere(self.grid == 0)
+
+    def water_mask(self):
+        """Return a boolean grid of the water squares, rebuilt only when the terrain changes"""
+        if getattr(self, '_water_mask_version', None) != self.version:
+            self._water_mask = self.grid == 0
+            self._water_mask_version = self.version
+        return self._water_mask
+
+    def island_cells(self, island):
+        """Return an (n, 2) array with the coordinates of every square of an island"""
+        return np.argwhere(self.grid == island.id)
+
+    def random_water_position(self, rng=random):
+        """Return a random water square"""
+        cells = self.water_cells()
+        x, y = cells[rng.randrange(len(cells))]
+        return (int(x), int(y))
+
+    def kind_table(self):
+        """Return an array mapping island id to 0 for water, 1 for inhabited and 2 for uninhabited"""
+        if getattr(self, '_kind_table_version', None) != self.version:
+            self._kind_table = np.array(
+                [0] + [1 if island.is_inhabited else 2 for island in self.island_table[1:]],
+                dtype=np.int8)
+            self._kind_table_version = self.version
+        return self._kind_table
+
+    def cell_kinds(self, x0=0, y0=0, height=None, width=None):
+        """Return a grid of 0 for water, 1 for inhabited and 2 for uninhabited island squares"""
+        height = self.size if height is None else height
+        width = self.size if width is None else width
+        return self.kind_table()[self.grid[x0:x0 + height, y0:y0 + width]]
+
+    def set_viewport(self, width, height):
+        """Set how many squares display shows around the player"""
+        self.view_width = width
+        self.view_height = height
+
+    def view_window(self, center=None):
+        """Return the (x0, y0, height, width) part of the map shown by display, centered when possible"""
+        height = self.view_height if self.size is None else min(self.view_height, self.size)
+        width = self.view_width if self.size is None else min(self.view_width, self.size)
+        if center is None:
+            center = (0, 0) if self.size is None else (self.size // 2, self.size // 2)
+        x0 = center[0] - height // 2
+        y0 = center[1] - width // 2
+        if self.size is not None:
+            x0 = max(0, min(x0, self.size - height))
+            y0 = max(0, min(y0, self.size - width))
+        return x0, y0, height, width
+
+    def minimap_kinds(self, max_size=MINIMAP_SIZE):
+        """Summarize the map in square blocks, returns (kinds, block size).
+
+        A block shows as inhabited if any of its squares is, otherwise as an
+        uninhabited island if it holds any island square, otherwise as water.
+        """
+        key = (self.version, max_size)
+        if getattr(self, '_minimap_key', None) != key:
+            block = -(-self.size // max_size)  # Ceiling division
+            blocks = -(-self.size // block)
+            kinds = np.zeros((blocks * block, blocks * block), dtype=np.int8)
+            kinds[:self.size, :self.size] = self.cell_kinds()
+            kinds = kinds.reshape(blocks, block, blocks, block)
+            inhabited = (kinds == 1).any(axis=(1, 3))
+            island = (kinds > 0).any(axis=(1, 3))
+            self._minimap = (np.where(inhabited, 1, np.where(island, 2, 0)).astype(np.int8), block)
+            self._minimap_key = key
+        return self._minimap
+
+    def display_minimap(self, center=None, max_size=MINIMAP_SIZE):
+        if JOURNAL.replaying:
+            return
+        kinds, block = self.minimap_kinds(max_size)
+        print(RENDERER.render_minimap(kinds, block, center))
+
+    def entity_overlay(self, player_pos=None, ships=None, sea_monsters=None, day=None, player_ship=None):
+        """Return the glyphs drawn over the terrain, keyed by position.
+
+        ships is a PositionIndex of the trade ships for this tick.
+        """
+        overlay = {}
+        # Ships first, the sea monsters and the player are drawn on top of them
+        for ship_pos, ships_here in (ships.items() if ships else ()):
+            if player_ship in ships_here:
+                overlay[ship_pos] = COLORS.glyph("@", COLORS.WHITE)
+            else:
+                overlay[ship_pos] = COLORS.glyph(ships_here[0].type[0], COLORS.RED)
+        
+        # Sea monsters only surface every third day
+        if sea_monsters and day is not None and day % 3 == 0:
+            for position in sea_monsters.position_list():
+                overlay[position] = COLORS.glyph("∞", COLORS.GRAY)
         
-        print("\nLegend:")
-        print(COLORS.colorize("@", COLORS.WHITE) + " = You")
-        print(COLORS.colorize("I", COLORS.GREEN) + " = Inhabited Island")
-        print(COLORS.colorize("o", COLORS.YELLOW) + " = Uninhabited Island")
-        print(COLORS.colorize("~", COLORS.BLUE) + " = Water")
-        print(COLORS.colorize("S/B/G", COLORS.RED) + " = Sloop/Brigantine/Galleon")
-        print(COLORS.colorize("∞", COLORS.GRAY) + " = Sea Monster")
+        if player_pos:
+            overlay[player_pos] = COLORS.glyph("@", COLORS.WHITE)
+        return overlay
+    
+    def display(self, player_pos=None, ships=None, sea_monsters=None, day=None, player_ship=None):
+        if JOURNAL.replaying:
+            return  # Nobody sees the map while a journal is replayed
+        # Center the view on the player, or on the ship they're aboard
+        center = player_pos or (player_ship.get_position() if player_ship else None)
+        overlay = self.entity_overlay(player_pos, ships, sea_monsters, day, player_ship)
+        RENDERER.draw(self, overlay, self.view_window(center))
 
 class World:
-    def __init__(self, num_islands=5):
-        self.map = Map(20)
+    quiet = False  # Set to run the world without printing anything
+
+    def __init__(self, num_islands=5, map_size=20):
+        self.map = Map(map_size)
         self.islands = {}
+        self.inhabited_islands = {}
+        self.island_index = IslandIndex()  # Every island, for position lookups
+        self.inhabited_index = IslandIndex()  # Inhabited islands only
+        self.scheduler = Scheduler()  # Day-based events: port spawns, ship departures
+        self.fleet = Fleet(self)  # Every trade ship at sea
+        self.registry = Registry(self)  # Ports and the ships they own
+        self.economy = Economy()  # Stock and prices of every town's goods
+        self.routes = None  # Sea lanes between inhabited islands, planned on first use
+        name_counts = {}
         
         # Create islands
         for _ in range(num_islands):
             island = Island()
-            self.islands[island.name] = island
-            island.world = self  # Add reference to world
             
-            # Try to place the island on the map
-            placed = False
-            max_attempts = 100
-            attempts = 0
+            # Place the island on a free spot of the map
+            if not self.map.place_island_randomly(island):
+                print(f"Warning: Could not place {island.name} on the map")
+                continue
             
-            while not placed and attempts < max_attempts:
-                x = random.randint(0, self.map.size - 1)
-                y = random.randint(0, self.map.size - 1)
-                placed = self.map.place_island(island, x, y)
-                attempts += 1
+            # Island names repeat on big maps, so number the duplicates
+            name_counts[island.name] = name_counts.get(island.name, 0) + 1
+            if name_counts[island.name] > 1:
+                island.name = f"{island.name} {name_counts[island.name]}"
             
-            if not attempts < max_attempts:
-                print(f"Warning: Could not place {island.name} on the map")
+            self.add_island(island)
         
         # Ensure at least two inhabited islands
-        inhabited_count = sum(1 for island in self.islands.values() if island.is_inhabited)
+        inhabited_count = len(self.inhabited_islands)
         if inhabited_count < 2:
             # Get list of uninhabited islands
             uninhabited = [name for name, island in self.islands.items() 
                          if not island.is_inhabited]
             
             # Calculate how many more inhabited islands we need
-            needed = 2 - inhabited_count
+            needed = min(2 - inhabited_count, len(uninhabited))
             
-            # Convert that many uninhabited islands to inhabited
+            # Convert that many uninhabited islands to inhabited, keeping their place on the map
             for island_name in random.sample(uninhabited, needed):
-                self.islands[island_name] = Island(island_name)  # Create new inhabited island
-                self.islands[island_name].is_inhabited = True
-                self.islands[island_name].towns = {}
-                num_towns = {
-                    "Small": 1,
-                    "Medium": 2,
-                    "Large": 3
-                }[self.islands[island_name].size]
-                
-                for _ in range(num_towns):
-                    town_name = f"{random.choice(town_names_prefixes)} {random.choice(town_names_suffixes)}"
-                    self.islands[island_name].towns[town_name] = Town(town_name)
-                
-                self.islands[island_name].population = sum(
-                    town.population for town in self.islands[island_name].towns.values()
-                )
+                self.populate_island(self.islands[island_name])
 
         # Calculate max_trade_ships after islands are created
-        self.max_trade_ships = len([i for i in self.islands.values() if i.is_inhabited]) * 2  # 2 ships per inhabited island
+        self.max_trade_ships = len(self.inhabited_islands) * 2  # 2 ships per inhabited island
+        self.sea_monsters = SeaMonsters(self)
+
+    @classmethod
+    def from_saved(cls, game_map, inhabited, max_trade_ships):
+        """Rebuild a saved world around its map, inhabited are its inhabited islands in the order they were settled.
+
+        The scheduler, routes, fleet, registry, economy and sea monsters refer back
+        to the world, so they are rebuilt after it and set on it.
+        """
+        world = cls.__new__(cls)  # __init__ would generate a new world
+        world.map = game_map
+        islands = game_map.island_table[1:]
+        world.islands = {island.name: island for island in islands}
+        for island in islands:
+            island.world = world
+        world.island_index = IslandIndex()
+        world.island_index.extend(islands)
+        world.inhabited_islands = {island.name: island for island in inhabited}
+        world.inhabited_index = IslandIndex()
+        world.inhabited_index.extend(inhabited)
+        world.max_trade_ships = max_trade_ships
+        world.routes = None
+        return world
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        # Older saves lack the parts added since, they are set up before the islands get registered
+        if 'economy' not in state:
+            self.economy = Economy()
+        if 'fleet' not in state:
+            self.fleet = Fleet(self)
+        if 'scheduler' not in state:
+            # Ports used to poll for spawns every day, register them again to schedule them
+            self.scheduler = Scheduler()
+            self.registry = Registry(self)
+        if 'island_index' not in state:
+            # Older saves have no island indexes, rebuild them (registering ports and markets too)
+            islands = list(self.islands.values())
+            self.islands = {}
+            self.inhabited_islands = {}
+            self.island_index = IslandIndex()
+            self.inhabited_index = IslandIndex()
+            for island in islands:
+                self.add_island(island)
+        else:
+            for island in self.inhabited_islands.values():
+                if 'scheduler' not in state:
+                    self.registry.add_island(island)
+                if 'economy' not in state:
+                    self.economy.add_island(island)
+        if 'routes' not in state or (self.routes is not None and not hasattr(self.routes, 'pair_keys')):
+            self.routes = None  # Planned again on first use
+        if 'sea_monsters' not in state:
+            self.sea_monsters = SeaMonsters(self)
+
+    def add_island(self, island):
+        """Register a placed island with the world and its indexes"""
+        self.islands[island.name] = island
+        island.world = self  # Add reference to world
+        self.island_index.add(island)
+        if island.is_inhabited:
+            self.inhabited_islands[island.name] = island
+            self.inhabited_index.add(island)
+            self.registry.add_island(island)
+            self.economy.add_island(island)
+
+    def remove_island(self, island):
+        del self.islands[island.name]
+        self.island_index.remove(island)
+        if self.inhabited_islands.pop(island.name, None) is not None:
+            self.inhabited_index.remove(island)
+            self.registry.remove_island(island)
+            self.economy.remove_island(island)
+
+    def populate_island(self, island, rng=random):
+        """Found towns on an uninhabited island"""
+        island.populate(rng)
+        self.map.version += 1
+        if island.name not in self.inhabited_islands:
+            self.inhabited_islands[island.name] = island
+            self.inhabited_index.add(island)
+        self.registry.add_island(island)
+        self.economy.add_island(island)
+
+    def add_town(self, island, town):
+        """Put a town on an island, replacing any town of the same name"""
+        island.towns[town.name] = town
+        self.registry.add_town(island, town.name, town)
+        self.economy.add_town(island, town.name, town.population)
+
+    def nearest_inhabited_island(self, position, exclude=None):
+        return self.inhabited_index.nearest(position, exclude)
+
+    def nearest_inhabited_islands(self, position, k, exclude=None):
+        return self.inhabited_index.k_nearest(position, k, exclude)
+
+    def islands_within(self, position, radius):
+        return self.island_index.within_radius(position, radius)
+
+    def route_table(self, workers=None):
+        """Return the sea lanes between inhabited islands, planning them again if the map changed.
+
+        workers is the number of processes big maps are planned with, all cores by default.
+        """
+        if self.routes is None or self.routes.version != self.map.version:
+            self.routes = RouteTable(self.map, self.inhabited_islands.values(), workers)
+        return self.routes
+
+    def sailing_distance(self, start_island, end_island):
+        """Return the length of the sea lane between two islands, or None if there is none"""
+        routes = self.route_table()
+        return routes.sailing_distance(start_island, end_island) if routes else None
+
+    def update_chunks(self, positions, pinned_islands=()):
+        """Hook for worlds that generate the sea around what's moving, a fixed map has nothing to do"""
+        pass
+
+    def tick(self, day, player_position=None, pinned_islands=()):
+        """Advance the world by one day: sea monsters, the events due, the fleet and the markets.
+
+        Returns (attacked, destroyed ships). attacked is True when a sea monster
+        moved onto player_position, the rest of the day is then skipped.
+        """
+        self.update_chunks([player_position], pinned_islands)
+        self.sea_monsters.move(self)
+        if self.sea_monsters.at(player_position):
+            return True, []
+        destroyed = self.sea_monsters.check_collisions(self)
+        # Trade ship spawns and departures come up in the scheduler, no port is polled
+        self.scheduler.run_until(day)
+        # Move the whole fleet at once and remove any ships with nowhere to go
+        self.fleet.step()
+        for ship in self.fleet.stranded_ships():
+            self.registry.remove_ship(ship)
+        self.economy.step()
+        return False, destroyed
+
+    def fast_forward(self, day, until_day, player_position=None, pinned_islands=(), ship=None):
+        """Advance the world from day to until_day, playing out only the days where something happens.
+
+        Days with a scheduled event (a spawn check, a ship leaving port) or a
+        ship arriving somewhere are run with tick. The quiet days in between
+        are skipped in one go: the fleet sails through them and the markets
+        move on in closed form, and the sea monsters take their steps, but
+        monsters only sink ships (or find the player) on the days that are
+        played out. A player aboard ship moves with it. Returns (day reached, attacked, destroyed ships).
+        """
+        destroyed = []
+        while day < until_day:
+            next_day = until_day
+            arrival = self.fleet.days_to_next_arrival()
+            if arrival is not None:
+                next_day = min(next_day, day + max(arrival, 1))
+            due = self.scheduler.next_day()
+            if due is not None:
+                next_day = min(next_day, max(due, day + 1))
+            skipped = next_day - day - 1
+            if skipped > 0:
+                self.fleet.sail(skipped)
+                self.economy.step(skipped)
+                for _ in range(skipped):
+                    self.sea_monsters.move(self)
+                day += skipped
+                self.scheduler.run_until(day)  # Nothing is due, this only moves its clock on
+            day += 1
+            if ship is not None:
+                player_position = ship.get_position()
+            attacked, sunk = self.tick(day, player_position, pinned_islands)
+            destroyed.extend(sunk)
+            if attacked:
+                return day, True, destroyed
+        return day, False, destroyed
+
+    def simulate(self, days, start_day=1, pinned_islands=()):
+        """Run the world for a number of days without printing anything, returns the ships sunk"""
+        quiet = self.quiet
+        self.quiet = True
+        sunk = 0
+        try:
+            for day in range(start_day, start_day + days):
+                sunk += len(self.tick(day, None, pinned_islands)[1])
+        finally:
+            self.quiet = quiet
+        return sunk
 
     def get_inhabited_islands(self):
-        return {name: island for name, island in self.islands.items() if island.is_inhabited}
+        return self.inhabited_islands
 
     def display_islands(self, current_coordinates=None):
         self.map.display(current_coordinates)
+        if self.map.size is not None and self.map.size > max(self.map.view_width, self.map.view_height):
+            self.map.display_minimap(current_coordinates)
         print("\n=== Island Details ===")
         for island in self.islands.values():
             island.display_info()
             print()
 
-def save_game(player, world, current_island, current_town, day):
-    """Save the current game state to a file"""
-    save_data = {
+def save_summary(player, world, current_island, current_town, day, save_format):
+    """What the load menu shows about a save"""
+    return {
+        'day': day,
+        'player': player.name,
+        'island': current_island.name if current_island else None,
+        'town': current_town,
+        'gold': player.gold,
+        'islands': len(world.islands),
+        'map_size': world.map.size,
+        'format': save_format,
+    }
+
+def prepare_save(player, world, current_island, current_town, day):
+    """Capture the game for saving, returns (file extension, function returning the file's bytes, summary)"""
+    if JOURNAL.recording:
+        # A journaled game is saved as its journal, replayed on load
+        summary = save_summary(player, world, current_island, current_town, day, f"journal v{JOURNAL_VERSION}")
+        return 'jnl', partial(encode_journal, JOURNAL.snapshot(summary)), summary
+    if type(world) is World:
+        summary = save_summary(player, world, current_island, current_town, day, f"compact v{FORMAT_VERSION}")
+        snapshot = snapshot_game(player, world, current_island, current_town, day, summary)
+        return 'sav', partial(encode_snapshot, snapshot), summary
+    # Worlds the compact format doesn't cover (the endless ocean) are pickled whole
+    data = pickle.dumps({
         'player': player,
         'world': world,
         'current_island': current_island,
         'current_town': current_town,
         'day': day
-    }
-    
-    # Create saves directory if it doesn't exist
-    if not os.path.exists('saves'):
-        os.makedirs('saves')
-    
-    # Create filename with timestamp
-    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-    filename = f"saves/save_{timestamp}.dat"
-    
+    })
+    return 'dat', lambda: data, save_summary(player, world, current_island, current_town, day, 'pickle')
+
+def save_game(player, world, current_island, current_town, day):
+    """Save the current game state to a file"""
+    if JOURNAL.replaying:
+        return  # Saved already, when the journal was recorded
     try:
-        with open(filename, 'wb') as f:
-            pickle.dump(save_data, f)
+        extension, serialize, summary = prepare_save(player, world, current_island, current_town, day)
+        filename = new_save_path('save', extension)
+        write_atomic(filename, serialize())
+        SaveIndex().record(filename, summary)
         print(f"\nGame saved successfully as {filename}")
     except Exception as e:
         print(f"\nError saving game: {e}")
 
+def describe_save(name, summary):
+    """One line of the load menu"""
+    date = save_time(name).strftime('%Y-%m-%d %H:%M:%S')
+    kind = " (autosave)" if name.startswith('autosave_') else ""
+    size = f"{summary.get('bytes', 0) / 1024:.1f} KB"
+    if 'day' not in summary:
+        return f"{date}{kind} - {summary.get('format', 'unknown format')}, {size}"
+    place = summary['island'] or "at sea"
+    if summary['town']:
+        place = f"{summary['town']}, {place}"
+    return (f"{date}{kind} - Day {summary['day']}, {summary['player']} in {place}, {summary['gold']} gold, "
+            f"{summary['islands']} islands ({summary['map_size']}x{summary['map_size']}), "
+            f"{summary['format']}, {size}")
+
 def load_game():
     """Load a saved game state from a file"""
-    # Check if saves directory exists
-    if not os.path.exists('saves'):
-        print("\nNo saved games found!")
-        return None
-    
-    # Get list of save files
-    save_files = sorted([f for f in os.listdir('saves') if f.endswith('.dat')], reverse=True)
+    # The index describes every save, only the chosen one is read in full
+    saves = SaveIndex().entries()
     
-    if not save_files:
+    if not saves:
         print("\nNo saved games found!")
         return None
     
     print("\nAvailable saved games:")
-    for i, save_file in enumerate(save_files, 1):
-        # Convert filename timestamp to readable date
-        timestamp = save_file[5:-4]  # Remove 'save_' and '.dat'
-        date = datetime.strptime(timestamp, '%Y%m%d_%H%M%S').strftime('%Y-%m-%d %H:%M:%S')
-        print(f"{i}. {date}")
+    for i, (save_file, summary) in enumerate(saves, 1):
+        print(f"{i}. {describe_save(save_file, summary)}")
     
-    choice = input("\nWhich save would you like to load? (number or 'cancel'): ")
+    choice = ask("\nWhich save would you like to load? (number or 'cancel'): ")
     if choice.lower() == 'cancel':
         return None
     
     try:
-        save_file = save_files[int(choice) - 1]
-        with open(f"saves/{save_file}", 'rb') as f:
-            save_data = pickle.load(f)
+        save_file = saves[int(choice) - 1][0]
+        with open(os.path.join(SAVE_FOLDER, save_file), 'rb') as f:
+            data = f.read()
+        # .sav files are the compact save format, .jnl files journals, .dat files whole pickled games
+        if save_file.endswith('.jnl'):
+            checkpoint = JOURNAL.replay(data)
+            # Without a checkpoint the game is played again from its seed
+            save_data = load_game_data(checkpoint) if checkpoint else {'journal': JOURNAL.settings}
+        elif save_file.endswith('.sav'):
+            save_data = load_game_data(data)
+        else:
+            save_data = pickle.loads(data)
         print("\nGame loaded successfully!")
         return save_data
     except Exception as e:
+        JOURNAL.discard()
         print(f"\nError loading game: {e}")
         return None
 
-class SeaMonster:
-    def __init__(self, world):
-        self.speed = 1
-        self.symbol = '∞'
-        # Find a valid starting position (water only)
-        while True:
-            self.position = (random.randint(0, world.map.size-1), 
-                           random.randint(0, world.map.size-1))
-            if not self._is_island(self.position, world):
-                break
-    
-    def move(self, world):
-        # Try to move in a random direction
-        for _ in range(4):  # Try up to 4 times to find a valid move
-            dx = random.choice([-1, 0, 1])
-            dy = random.choice([-1, 0, 1])
-            new_pos = (self.position[0] + dx * self.speed, 
-                      self.position[1] + dy * self.speed)
-            
-            # Check if new position is valid (within bounds and not on island)
-            if (0 <= new_pos[0] < world.map.size and 
-                0 <= new_pos[1] < world.map.size and 
-                not self._is_island(new_pos, world)):
-                self.position = new_pos
-                break
-    
-    def _is_island(self, position, world):
-        return world.map.grid[position[0]][position[1]] is not None
-    
-    def check_collisions(self, trade_ships):
-        # Return list of ships that collided with monster
-        destroyed = []
-        for ship in trade_ships:
-            if ship.current_position == self.position:
-                # Load and display monster art when destroying a ship
-                monster_art = load_ascii_art('crystalquest/art/monster.jpeg')
-                if monster_art:
-                    display_ascii_art(monster_art)
-                destroyed.append(ship)
-        return destroyed
+def new_world(num_islands=5, map_size=20):
+    """Take a pre-generated world from the pool, or generate one if the pool is empty"""
+    world = WorldPool().take(num_islands, map_size)
+    if world is None:
+        world = World(num_islands=num_islands, map_size=map_size)
+    return world
+
+def start_game(world):
+    """Create the player in a random town of the world, returns (player, current island, current town, day)"""
+    player = Character()
+    inhabited_islands = world.get_inhabited_islands()
+    player.island = random.choice(list(inhabited_islands.keys()))
+    current_island = world.islands[player.island]
+    current_town = random.choice(list(current_island.towns.keys()))
+    world.add_town(current_island, Town(current_town, is_home_town=True))
+    return player, current_island, current_town, 1
+
+def ask_wait_days():
+    """Ask how many days to wait, one unless the player gives a number"""
+    try:
+        return max(1, int(ask("How many days? (1) ")))
+    except ValueError:
+        return 1
 
 def main():
     
-    # Load and display title art
-    title_art = load_ascii_art('crystalquest/art/title.jpeg')
-    if title_art:
-        display_ascii_art(title_art)
+    # The title art renders in the background while the menu is up and the world is generated
+    title_art = ArtLoader('crystalquest/art/title.jpeg')
     print("\n")
     print("Welcome to Crystal Quest! Adventure awaits!")
     print("1. New Game")
     print("2. Load Game")
-    choice = input("\nWhat would you like to do? ")
+    print("3. New Journaled Game")
+    print("4. New Game on an Endless Ocean")
+    choice = ask("\nWhat would you like to do? ")
     
     if choice == "2":
+        display_ascii_art(title_art.result())
         save_data = load_game()
-        if save_data:
+        if save_data and 'journal' in save_data:
+            # A journal replayed from its seed generates its world again
+            world = World(**save_data['journal'])
+            player, current_island, current_town, day = start_game(world)
+        elif save_data:
             player = save_data['player']
             world = save_data['world']
             current_island = save_data['current_island']
@@ -481,103 +877,132 @@ def main():
             day = save_data['day']
         else:
             print("\nStarting new game...")
-            world = World(num_islands=5)
+            world = new_world(num_islands=5)
             world.display_islands()
-            player = Character()
-            inhabited_islands = world.get_inhabited_islands()
-            player.island = random.choice(list(inhabited_islands.keys()))
-            current_island = world.islands[player.island]
-            current_town = random.choice(list(current_island.towns.keys()))
-            current_island.towns[current_town] = Town(current_town, is_home_town=True)
-            day = 1
+            player, current_island, current_town, day = start_game(world)
+    elif choice == "3":
+        # Pooled worlds don't come from a seed, a journaled game generates its own
+        print("Generating world...")
+        JOURNAL.start(num_islands=5, map_size=20)
+        world = World(**JOURNAL.settings)
+        display_ascii_art(title_art.result())
+        player, current_island, current_town, day = start_game(world)
+    elif choice == "4":
+        from crystalquest.ocean import ChunkedWorld  # ocean.py builds on this module
+        # The sea is generated chunk by chunk around the player as they go
+        print("Generating world...")
+        world = ChunkedWorld()
+        display_ascii_art(title_art.result())
+        player, current_island, current_town, day = start_game(world)
     else:
         # New game initialization
         print("Generating world...")
-        world = World(num_islands=5)
-        player = Character()
-        inhabited_islands = world.get_inhabited_islands()
-        player.island = random.choice(list(inhabited_islands.keys()))
-        current_island = world.islands[player.island]
-        current_town = random.choice(list(current_island.towns.keys()))
-        current_island.towns[current_town] = Town(current_town, is_home_town=True)
-        day = 1
+        world = new_world(num_islands=5)
+        display_ascii_art(title_art.result())
+        player, current_island, current_town, day = start_game(world)
     
-    trade_ships = []
-    sea_monster = SeaMonster(world)
+    sea_monsters = world.sea_monsters
     
     current_ship = None  # Add this variable to track if player is on a ship
+    skipped_days = 0  # Days waited before the current one, played out without the map
+    autosaver = Autosaver(index=SaveIndex())  # Writes a save of every new day in the background
+    last_autosave = None
     
     while True:
+        # A loaded journal is replayed without any output up to here, then the game goes on live
+        JOURNAL.turn(player, world, current_island, current_town, day,
+                     resumable=current_ship is None and not skipped_days)
+        world.quiet = JOURNAL.replaying
+        pinned_islands = {world.islands.get(player.island), current_island}
+        attacked, destroyed_ships = False, []
+        if skipped_days:
+            # Fast-forward through the days of a long wait, then show the last one
+            reached, attacked, destroyed_ships = world.fast_forward(
+                day - skipped_days - 1, day - 1,
+                None if current_ship else current_island.coordinates,
+                pinned_islands, current_ship)
+            skipped_days = 0
+            if attacked:
+                day = reached
+
         print(f"\n=== Day {day} ===")
         
-        # Move sea monster
-        sea_monster.move(world)
+        # Move sea monsters and trade ships, keeping the sea around the player and their home
+        if not attacked:
+            attacked, sunk = world.tick(
+                day,
+                current_ship.get_position() if current_ship else current_island.coordinates,
+                pinned_islands
+            )
+            destroyed_ships += sunk
         
         # Check for sea monster collision with current ship
-        if ((player.ship and sea_monster.position == player.ship.position) or
-            (current_ship and sea_monster.position == current_ship.get_position())):
+        if attacked:
             print("\nThe sea monster attacks your ship!")
-            print(f"{RED}=== GAME OVER ==={RESET}")
+            print(COLORS.colorize("=== GAME OVER ===", COLORS.RED))
             print(f"You survived for {day} days.")
             break
         
-        # Check for destroyed ships
-        destroyed_ships = sea_monster.check_collisions(trade_ships)
+        # Autosave each new day, snapshotting is quick and the file is written while the game goes on
+        if day != last_autosave and not JOURNAL.replaying:
+            autosaver.save(*prepare_save(player, world, current_island, current_town, day))
+            last_autosave = day
+        error = autosaver.take_error()
+        if error:
+            print(f"\nAutosave failed: {error}")
+        
         for ship in destroyed_ships:
-            trade_ships.remove(ship)
             if day % 3 == 0:  # Only show message when monster is visible
                 print(f"\n{COLORS.colorize('The sea monster has destroyed a ' + ship.type + '!', COLORS.GRAY)}")
+        trade_ships = world.registry.ships()
         
-        # Update trade ships
-        for island in world.islands.values():
-            if island.is_inhabited:
-                for town_name, town in island.towns.items():
-                    if 'port' in town.locations:
-                        port = town.locations['port']
-                        new_ship = port.spawn_trade_ship(day, island, town_name, world)
-                        if new_ship:
-                            trade_ships.append(new_ship)
-                        port.update_trade_ships(trade_ships)
-        
-        # Move existing trade ships and remove any that are stuck
-        active_trade_ships = []
-        for ship in trade_ships:
-            ship.move()
-            if ship.destination or ship.returning_home:
-                active_trade_ships.append(ship)
-        trade_ships = active_trade_ships
-        
-        # Create ship display info list with player ship information
-        ship_display_info = [(ship.current_position, ship.type, ship == current_ship) 
-                            for ship in trade_ships]
+        # Index ship positions once for the map and arrival checks
+        ship_positions = PositionIndex(trade_ships)
         
         # Display map with trade ships and sea monster
         world.map.display(
             None if current_ship else current_island.coordinates, 
-            ship_display_info,
-            sea_monster,
-            day
+            ship_positions,
+            sea_monsters,
+            day,
+            current_ship
         )
         
         # Check for ships arriving at player's location
         if current_island and not current_ship:  # Only check if player is on an island
-            for ship in trade_ships:
+            for ship in ship_positions.at(current_island.coordinates):
                 # Check if ship just arrived at player's location
-                if (ship.current_position == current_island.coordinates and 
-                    ship.last_position != current_island.coordinates):
+                if ship.last_position != current_island.coordinates:
                     dest_type = "home port" if ship.returning_home else "destination"
                     print(f"\nA {ship.type} has arrived at its {dest_type}!")
         
+        # Check if the ship the player is aboard just reached its destination or home port
+        if current_ship and current_ship.destination and \
+                current_ship.current_position != current_ship.last_position and \
+                current_ship.current_position in (current_ship.destination.coordinates,
+                                                  current_ship.home_island.coordinates):
+            print("\nThe ship has reached its destination!")
+            embark = ask("Would you like to disembark? (yes/no): ")
+            if embark.lower() == 'yes':
+                current_island = (current_ship.home_island
+                                  if current_ship.current_position == current_ship.home_island.coordinates
+                                  else current_ship.destination)
+                current_town = random.choice(list(current_island.towns.keys()))
+                print(f"\nYou disembark and step onto the docks of {current_island.name}!")
+                print(f"You find yourself in the town of {current_town}.")
+                current_ship = None
+
         # Different menu options when at sea
         if current_ship:
             print(f"\n=== Aboard {current_ship.type} ===")
             print("1. View Character Info")
             print("2. View Ship Info")
             print("3. Wait")
-            print("4. Save Game")
-            print("5. Quit")
+            print("4. Sail Until Arrival")
+            print("5. Save Game")
+            print("6. Quit")
             
-            choice = input("\nWhat would you like to do? ")
+            choice = ask("\nWhat would you like to do? ")
             
             if choice == "1":
                 player.display_info()
@@ -591,49 +1016,18 @@ def main():
                 else:
                     print(f"Destination: {current_ship.destination.name}")
             elif choice == "3":
-                print("You wait for a day...")
-                day += 1
-                
-                # Move sea monster and update ships
-                sea_monster.move(world)
-                for ship in trade_ships:
-                    ship.move()
-                
-                # Check if ship has reached destination
-                if (current_ship.current_position == 
-                    (current_ship.destination.coordinates if not current_ship.returning_home 
-                     else current_ship.home_island.coordinates)):
-                    print("\nThe ship has reached its destination!")
-                    embark = input("Would you like to disembark? (yes/no): ")
-                    if embark.lower() == 'yes':
-                        current_island = (current_ship.destination if not current_ship.returning_home 
-                                        else current_ship.home_island)
-                        if current_island.is_inhabited:
-                            current_town = random.choice(list(current_island.towns.keys()))
-                            print(f"\nYou disembark and step onto the docks of {current_island.name}!")
-                            print(f"You find yourself in the town of {current_town}.")
-                            # Display town menu immediately
-                            print(f"\n=== {current_town}, {current_island.name} ===")
-                            print("1. Shipyard")
-                            print("2. Pub")
-                            print("3. Smithy")
-                            print("4. Market")
-                            print("5. Port")
-                            print("6. View Character Info")
-                            print("7. View Island Info")
-                            print("8. Wait")
-                            print("9. Save Game")
-                            if 'home' in current_island.towns[current_town].locations:
-                                print("10. Home")
-                                print("11. Quit")
-                            else:
-                                print("10. Quit")
-                        else:
-                            print("The island appears to be uninhabited.")
-                        current_ship = None
+                days = ask_wait_days()
+                print("You wait for a day..." if days == 1 else f"You wait for {days} days...")
+                day += days
+                skipped_days = days - 1
             elif choice == "4":
-                save_game(player, world, current_island, current_town, day)
+                days = current_ship.days_to_arrival()
+                print("You sail on for a day..." if days == 1 else f"You sail on for {days} days...")
+                day += days
+                skipped_days = days - 1
             elif choice == "5":
+                save_game(player, world, current_island, current_town, day)
+            elif choice == "6":
                 print("Thanks for playing!")
                 break
             else:
@@ -672,7 +1066,7 @@ def main():
                     print("Available towns:")
                     for i, town_name in enumerate(current_island.towns.keys(), 1):
                         print(f"{i}. {town_name}")
-                    choice = input("\nWhich town would you like to enter? ")
+                    choice = ask("\nWhich town would you like to enter? ")
                     try:
                         town_name = list(current_island.towns.keys())[int(choice) - 1]
                         current_town = town_name
@@ -681,7 +1075,7 @@ def main():
                         print("Invalid choice! Please select a valid town number.")
                 continue  # Restart main loop with selected town
         
-        choice = input("\nWhat would you like to do? ")
+        choice = ask("\nWhat would you like to do? ")
         
         if current_island.is_inhabited:
             if choice == "1":
@@ -691,10 +1085,13 @@ def main():
             elif choice == "3":
                 current_island.towns[current_town].locations['smithy'].visit(player)
             elif choice == "4":
-                current_island.towns[current_town].locations['market'].visit(player)
+                current_island.towns[current_town].locations['market'].visit(
+                    player, world.economy.market(current_island, current_town))
             elif choice == "5":
                 new_island, new_town, new_ship, day = current_island.towns[current_town].locations['port'].visit(
-                    player, world, current_island, day)
+                    player, world, current_island, current_town, day)
+                if day is None:  # Sunk by a sea monster while sailing
+                    break
                 if new_ship is not None:
                     current_ship = new_ship
                 elif new_island is not None:
@@ -705,8 +1102,10 @@ def main():
             elif choice == "7":
                 current_island.display_info()
             elif choice == "8":
-                print("You wait for a day...")
-                day += 1
+                days = ask_wait_days()
+                print("You wait for a day..." if days == 1 else f"You wait for {days} days...")
+                day += days
+                skipped_days = days - 1
             elif choice == "9":
                 save_game(player, world, current_island, current_town, day)
             elif choice == "10" and 'home' in current_island.towns[current_town].locations:
@@ -724,20 +1123,27 @@ def main():
                 day = current_island.ruins.visit(player, day)  # Use return value from visit
             elif choice == "3":
                 # Return to nearest inhabited island
-                inhabited_islands = world.get_inhabited_islands()
-                if inhabited_islands:
-                    current_island = list(inhabited_islands.values())[0]
+                nearest = world.nearest_inhabited_island(current_island.coordinates)
+                if nearest:
+                    current_island = nearest
                     current_town = random.choice(list(current_island.towns.keys()))
                     print(f"\nReturned to {current_island.name}!")
                 day += 1  # Travel takes a day
             elif choice == "4":
-                print("You wait for a day...")
-                day += 1
+                days = ask_wait_days()
+                print("You wait for a day..." if days == 1 else f"You wait for {days} days...")
+                day += days
+                skipped_days = days - 1
             elif choice == "5":
                 print("Thanks for playing!")
                 break
             else:
                 print("Invalid choice!")
+    
+    # Show the end of a journal that ended the game while it was replayed
+    JOURNAL.finish_replay()
+    # Let the last autosave finish writing
+    autosaver.close()
 
 if __name__ == "__main__":
     main()
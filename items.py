@@ -19,8 +19,9 @@ sacred_artifact_abilities = [
         "name": "Ancient Warrior's Weapon",
         "description": "A perfectly preserved weapon of mysterious origin",
         "type": "weapon",
-        "damage": random.randint(3, 7),
-        "weapon_type": random.choice(['melee', 'ranged'])
+        # Rolled for every weapon found, see roll_artifact
+        "damage_range": (3, 7),
+        "weapon_types": ['melee', 'ranged']
     }
 ]
 
@@ -28,7 +29,7 @@ treasure_types = [
     {"name": "Golden Idol", "value": 2000},
     {"name": "Ancient Coins", "value": 1500},
     {"name": "Jeweled Crown", "value": 3000},
-    {"name": "Sacred Artifact", "value": 2500, "ability": random.choice(sacred_artifact_abilities)},
+    {"name": "Sacred Artifact", "value": 2500, "ability": None},  # Picked when found, see roll_treasure
     {"name": "Royal Scepter", "value": 1800}
 ]
 
@@ -137,4 +138,19 @@ ship_types = {
         'cargo': 24,
         'hull_max': 60
     }
-} 
\ No newline at end of file
+} 
+
+def roll_artifact(rng=random):
+    """Pick a sacred artifact and roll its random properties"""
+    artifact = dict(rng.choice(sacred_artifact_abilities))
+    if artifact['type'] == 'weapon':
+        artifact['damage'] = rng.randint(*artifact.pop('damage_range'))
+        artifact['weapon_type'] = rng.choice(artifact.pop('weapon_types'))
+    return artifact
+
+def roll_treasure(treasures=treasure_types, rng=random):
+    """Pick a treasure, with the sacred artifact it holds if any"""
+    treasure = rng.choice(treasures)
+    if 'ability' in treasure:
+        treasure = dict(treasure, ability=roll_artifact(rng))
+    return treasure
@@ -0,0 +1,204 @@
+import contextlib
+import json
+import os
+import random
+import struct
+import time
+import zlib
+from crystalquest.colors import FRAMES, NullBackend
+
+MAGIC = b'CQJN'
+JOURNAL_VERSION = 1
+HEADER = struct.Struct('<4sHII')  # Magic, format version, packed journal size, checkpoint size
+# A checkpoint is kept once this many days or player inputs have gone by since the last one,
+# loading replays at most that much of the game
+CHECKPOINT_DAYS = 30
+CHECKPOINT_INPUTS = 200
+
+class Journal:
+    """Records a game as its random seed and every answer the player typed.
+
+    Everything in the game follows from the random module and the player's
+    answers, so a seed and the list of answers are enough to play the whole
+    game again. A journaled game seeds random itself and generates its world
+    from that seed; its saves are the journal. Loading one replays the
+    answers without any output, until they run out and the game goes on live.
+
+    Every CHECKPOINT_DAYS days or CHECKPOINT_INPUTS answers the journal keeps
+    a compact save of the game (see savefile) along with the number of answers
+    given so far, and reseeds random from itself so that the checkpoint needs
+    only that seed to carry on. Loading starts from the last checkpoint, so
+    replaying never takes longer than the few answers after it.
+    """
+
+    def __init__(self):
+        self.seed = None  # Master seed, None while no journal is recorded
+        self.settings = {}  # World() arguments of the game
+        self.inputs = []
+        self.checkpoint = None  # {'inputs', 'day', 'seed'} of the last checkpoint
+        self.checkpoint_data = None  # Compact save of the game at the last checkpoint
+        self.replay_at = None  # Index of the next answer to replay, None when playing live
+        self.replay_from = 0
+        self.replay_started = None
+        self.muted = None  # Undoes the redirected output of a replay when closed
+
+    @property
+    def recording(self):
+        return self.seed is not None
+
+    @property
+    def replaying(self):
+        return self.replay_at is not None
+
+    @property
+    def position(self):
+        """Number of answers the game has been given so far"""
+        return self.replay_at if self.replay_at is not None else len(self.inputs)
+
+    def start(self, seed=None, **settings):
+        """Start recording a new game, seeding random with seed (or a fresh one)"""
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(8), 'little')
+        self.settings = settings
+        self.inputs = []
+        self.checkpoint = None
+        self.checkpoint_data = None
+        random.seed(self.seed)
+
+    def ask(self, prompt=''):
+        """input() that records the answer, or gives back the recorded one while replaying"""
+        if self.replay_at is not None:
+            if self.replay_at < len(self.inputs):
+                answer = self.inputs[self.replay_at]
+                self.replay_at += 1
+                return answer
+            self.finish_replay()  # Cut short mid-turn, ask the player from here on
+        answer = input(prompt)
+        if self.recording:
+            self.inputs.append(answer)
+        return answer
+
+    def replay(self, data):
+        """Load a journal and start replaying it.
+
+        Returns the compact save of its last checkpoint, to be loaded before
+        the game goes on, or None when it is replayed from the start.
+        """
+        self.load(data)
+        if self.checkpoint is None:
+            random.seed(self.seed)
+            self.replay_at = 0
+        else:
+            random.seed(self.checkpoint['seed'])
+            self.replay_at = self.checkpoint['inputs']
+        self.replay_from = self.replay_at
+        self.replay_started = time.perf_counter()
+        # Printed text goes nowhere and frames to the null backend until the replay is over
+        self.muted = contextlib.ExitStack()
+        devnull = self.muted.enter_context(open(os.devnull, 'w'))
+        self.muted.enter_context(contextlib.redirect_stdout(devnull))
+        self.muted.callback(FRAMES.set_backend, FRAMES.backend)
+        FRAMES.set_backend(NullBackend())
+        return self.checkpoint_data
+
+    def finish_replay(self):
+        """Stop replaying and give the output back to the player"""
+        if self.replay_at is None:
+            return
+        self.unmute()
+        replayed = self.replay_at - self.replay_from
+        elapsed = time.perf_counter() - self.replay_started
+        if self.replay_at < len(self.inputs):
+            # The game took another turn than when it was recorded
+            print(f"\nThe journal could only be replayed up to input {self.replay_at} of {len(self.inputs)}.")
+            del self.inputs[self.replay_at:]
+        print(f"\nReplayed {replayed} inputs in {elapsed:.2f}s.")
+        self.replay_at = None
+
+    def unmute(self):
+        """Give the output of a replay back to the player"""
+        if self.muted is not None:
+            self.muted.close()
+            self.muted = None
+
+    def discard(self):
+        """Drop a journal that couldn't be loaded, and stop replaying it"""
+        self.unmute()
+        self.replay_at = None
+        self.seed = None
+        self.inputs = []
+        self.checkpoint = None
+        self.checkpoint_data = None
+
+    def turn(self, player, world, current_island, current_town, day, resumable=True):
+        """Called at the top of every turn of the game loop.
+
+        Ends the replay once its answers run out, so the player sees the
+        whole turn, and keeps a checkpoint when one is due. resumable is
+        False while the game can't be picked up again from a save made now
+        (aboard a ship, or in the middle of a long wait).
+        """
+        if self.replay_at is not None and self.replay_at >= len(self.inputs):
+            self.finish_replay()
+        if not self.recording or not resumable:
+            return
+        last = self.checkpoint or {'inputs': 0, 'day': 1}
+        if day - last['day'] < CHECKPOINT_DAYS and self.position - last['inputs'] < CHECKPOINT_INPUTS:
+            return
+        # savefile imports the locations, which import this module
+        from crystalquest.savefile import snapshot_game, encode_snapshot
+        # A fresh seed makes the checkpoint independent of how random got here
+        seed = random.getrandbits(64)
+        random.seed(seed)
+        self.checkpoint = {'inputs': self.position, 'day': day, 'seed': seed}
+        self.checkpoint_data = encode_snapshot(snapshot_game(player, world, current_island, current_town, day))
+
+    def snapshot(self, summary=None):
+        """Capture the journal for saving, see encode_journal"""
+        return ({'seed': self.seed, 'settings': self.settings, 'inputs': list(self.inputs),
+                 'checkpoint': self.checkpoint, 'summary': summary}, self.checkpoint_data)
+
+    def load(self, data):
+        """Read a journal file into this journal"""
+        journal, self.checkpoint_data = decode_journal(data)
+        self.seed = journal['seed']
+        self.settings = journal['settings']
+        self.inputs = journal['inputs']
+        self.checkpoint = journal['checkpoint']
+
+def encode_journal(snapshot):
+    """Turn a snapshot from Journal.snapshot into the bytes of a journal file"""
+    journal, checkpoint_data = snapshot
+    packed = zlib.compress(json.dumps(journal, separators=(',', ':')).encode())
+    checkpoint_data = checkpoint_data or b''
+    return HEADER.pack(MAGIC, JOURNAL_VERSION, len(packed), len(checkpoint_data)) + packed + checkpoint_data
+
+def _read_header(data):
+    magic, version, size, checkpoint_size = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a Crystal Quest journal")
+    if version > JOURNAL_VERSION:
+        raise ValueError(f"Journal version {version} is newer than this game ({JOURNAL_VERSION})")
+    return version, size, checkpoint_size
+
+def decode_journal(data):
+    """Parse a journal file into (journal, compact save of its checkpoint or None)"""
+    version, size, checkpoint_size = _read_header(data)
+    end = HEADER.size + size
+    if len(data) < end + checkpoint_size:
+        raise ValueError("Journal is truncated")
+    journal = json.loads(zlib.decompress(data[HEADER.size:end]))
+    return journal, data[end:end + checkpoint_size] if checkpoint_size else None
+
+def read_journal_summary(path):
+    """Return (format version, summary) of a journal, without reading its checkpoint"""
+    with open(path, 'rb') as f:
+        version, size, _ = _read_header(f.read(HEADER.size))
+        journal = json.loads(zlib.decompress(f.read(size)))
+    return version, journal.get('summary')
+
+# Create a global instance
+JOURNAL = Journal()
+
+def ask(prompt=''):
+    """Ask the player something, through the journal"""
+    return JOURNAL.ask(prompt)
@@ -1,3 +1,5 @@
+from crystalquest.journal import ask
+
 class Home:
     def __init__(self):
         self.rest_heal = 10
@@ -7,7 +9,7 @@ class Home:
         print("1. Rest and heal")
         print("2. Leave")
         
-        choice = input("\nWhat would you like to do? ")
+        choice = ask("\nWhat would you like to do? ")
         if choice == "1":
             print(f"You rest for the day and heal {self.rest_heal} health")
             character.health = min(character.health + self.rest_heal, character.max_health)
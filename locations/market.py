@@ -1,33 +1,51 @@
 from crystalquest.items import trade_goods
+from crystalquest.journal import ask
+
+# Share of its selling price the market pays for goods brought to it
+MARKET_BID = 0.8
+
+def bid_price(price):
+    return max(1, int(price * MARKET_BID))
 
 class Market:
     def __init__(self):
         self.goods = trade_goods
 
-    def visit(self, character):
+    def visit(self, character, market):
+        """Trade at the town's market, market is the town's TownMarket in the world's economy"""
         print("\n=== Welcome to the Market ===")
         print("Available goods:")
-        
+
         # Create numbered list of goods
         goods_list = list(self.goods.items())
         for i, (item_name, item_data) in enumerate(goods_list, 1):
-            print(f"{i}. {item_data['description']} - {item_data['price']} gold")
+            price = market.price(item_name)
+            print(f"{i}. {item_data['description']} - {price} gold ({market.stock(item_name)} in stock, "
+                  f"buys for {bid_price(price)})")
 
-        choice = input("\nWhat would you like to buy? (number or 'cancel'): ")
+        choice = ask("\nWhat would you like to buy? (number, 'sell' or 'cancel'): ")
         if choice.lower() == 'cancel':
             return
-            
+        if choice.lower() == 'sell':
+            self.sell(character, market)
+            return
+
         try:
             index = int(choice) - 1
             if 0 <= index < len(goods_list):
                 item_name, item_data = goods_list[index]
-                amount = input("How many would you like to buy? ")
+                amount = ask("How many would you like to buy? ")
                 try:
                     amount = int(amount)
-                    total_cost = amount * item_data['price']
-                    if character.gold >= total_cost:
+                    total_cost = amount * market.price(item_name)
+                    if amount <= 0:
+                        print("Please enter a valid number!")
+                    elif amount > market.stock(item_name):
+                        print(f"The market only has {market.stock(item_name)} {item_name}!")
+                    elif character.gold >= total_cost:
                         character.gold -= total_cost
                         character.inventory[item_name] = character.inventory.get(item_name, 0) + amount
+                        market.trade(item_name, amount)
                         print(f"You bought {amount} {item_name}!")
                     else:
                         print("You can't afford that many!")
@@ -36,4 +54,33 @@ class Market:
             else:
                 print("Invalid choice!")
         except ValueError:
-            print("Please enter a valid number!") 
\ No newline at end of file
+            print("Please enter a valid number!")
+
+    def sell(self, character, market):
+        goods = [item for item in self.goods if character.inventory.get(item, 0) > 0]
+        if not goods:
+            print("You have no goods to sell!")
+            return
+        for i, item_name in enumerate(goods, 1):
+            print(f"{i}. {item_name} ({character.inventory[item_name]}) - "
+                  f"{bid_price(market.price(item_name))} gold each")
+        try:
+            index = int(ask("\nWhat would you like to sell? (number): ")) - 1
+            if not 0 <= index < len(goods):
+                print("Invalid choice!")
+                return
+            item_name = goods[index]
+            amount = int(ask("How many would you like to sell? "))
+        except ValueError:
+            print("Please enter a valid number!")
+            return
+        if not 0 < amount <= character.inventory[item_name]:
+            print(f"You don't have that many {item_name}!")
+            return
+        total_payment = amount * bid_price(market.price(item_name))
+        character.gold += total_payment
+        character.inventory[item_name] -= amount
+        if character.inventory[item_name] == 0:
+            del character.inventory[item_name]
+        market.trade(item_name, -amount)
+        print(f"You sold {amount} {item_name} for {total_payment} gold!")
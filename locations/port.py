@@ -1,82 +1,128 @@
-import random
+import math
 from crystalquest.ships import TradeShip
+from crystalquest.advisor import RouteAdvisor
+from crystalquest.journal import ask
+from crystalquest.colors import COLORS
+
+# Trade ships sell at the town's price with this markup, and buy at this share of it
+SHIP_MARKUP = 1.1
+SHIP_BID = 0.9
+
+def ship_sell_price(price):
+    """What a trade ship asks for a good the town sells at price"""
+    return math.ceil(price * SHIP_MARKUP)
+
+def ship_buy_price(price):
+    """What a trade ship pays for a good the town sells at price"""
+    return max(1, int(price * SHIP_BID))
 
 class Port:
     def __init__(self):
         self.travel_cost = 200
-        self.trade_ships = []  # List of trade ships currently in port
-        self.last_spawn = 0  # Days since last trade ship spawn
+        self.trade_ships = {}  # Ship id -> trade ship docked in port
+        self.last_spawn = 0  # Day of the last trade ship spawn
+        self.next_spawn = None  # Day of the next scheduled spawn check
+        self.spawn_priority = 0  # Older ports check first on days several are due
         self.home_island = None  # Will be set when port is created
 
+    @classmethod
+    def from_saved(cls, home_island, travel_cost, last_spawn, next_spawn, spawn_priority):
+        """Rebuild a saved port, its ships are docked again as they are rebuilt"""
+        port = cls()
+        port.home_island = home_island
+        port.travel_cost = travel_cost
+        port.last_spawn = last_spawn
+        port.next_spawn = next_spawn
+        port.spawn_priority = spawn_priority
+        return port
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        if isinstance(self.trade_ships, list):
+            # Older saves kept ships in a list, those ships no longer sail
+            self.trade_ships = {}
+        self.__dict__.setdefault('next_spawn', None)
+        self.__dict__.setdefault('spawn_priority', 0)
+
     def spawn_trade_ship(self, current_day, home_island, town_name, world):
-        """Spawn a new trade ship if conditions are met"""
+        """Scheduled spawn check, spawns a new trade ship if the world is below its ship limit"""
+        registry = world.registry
+        if current_day != self.next_spawn or registry.ports.get((home_island, town_name)) is not self:
+            return None  # The port was rescheduled or is no longer part of the world
+        self.next_spawn = None
+
         # Set home island if not already set
         if self.home_island is None:
             self.home_island = home_island
         
-        # Count total trade ships in the world
-        total_trade_ships = 0
-        for island in world.islands.values():
-            if island.is_inhabited:
-                for town in island.towns.values():
-                    if 'port' in town.locations:
-                        total_trade_ships += len(town.locations['port'].trade_ships)
+        total_trade_ships = registry.ship_count()
         
-        # Only spawn if below max limit and enough time has passed
-        if (total_trade_ships < world.max_trade_ships and 
-            current_day - self.last_spawn >= random.randint(3, 7)):
-            new_ship = TradeShip(self.home_island, world)
-            if new_ship.destination:  # Only add ship if it has a valid destination
-                self.trade_ships.append(new_ship)
-                self.last_spawn = current_day
+        # At the limit, wait for a ship to sink before checking again
+        if total_trade_ships >= world.max_trade_ships:
+            if not world.quiet:
+                print(f"Trade ship spawn check at {town_name}, {self.home_island.name} "
+                      f"({total_trade_ships}/{world.max_trade_ships} ships)")
+            registry.wait_for_ship(home_island, town_name, self)
+            return None
+
+        registry.schedule_spawn(home_island, town_name, self, current_day)
+        new_ship = TradeShip(self.home_island, world)
+        if new_ship.destination:  # Only add ship if it has a valid destination
+            registry.add_ship(self, new_ship)
+            self.last_spawn = current_day
+            if not world.quiet:
                 print(f"New {new_ship.type} spawned at {town_name}, {self.home_island.name}, "
                       f"headed to {new_ship.destination.name} "
                       f"({total_trade_ships + 1}/{world.max_trade_ships} ships)")
-                return new_ship
-        else:
-            print(f"Trade ship spawn check at {town_name}, {self.home_island.name} "
-                  f"({total_trade_ships}/{world.max_trade_ships} ships)")
+            return new_ship
+        new_ship.remove()
         return None
 
-    def update_trade_ships(self, trade_ships):
-        """Update port's trade ships list"""
-        # Remove ships that have left
-        self.trade_ships = [ship for ship in self.trade_ships if ship in trade_ships]
-        # Add ships that have arrived at this port
-        for ship in trade_ships:
-            if (ship.current_position == ship.home_island.coordinates and 
-                ship.home_island == self.home_island and 
-                ship not in self.trade_ships):
-                self.trade_ships.append(ship)
-
-    def handle_trade(self, character, day):
+    def ship_arrived(self, ship):
+        """A ship of this port docked at home"""
+        self.trade_ships[ship.id] = ship
+
+    def ship_departed(self, ship):
+        """A ship of this port set sail or sank"""
+        self.trade_ships.pop(ship.id, None)
+
+    def handle_trade(self, character, day, market):
+        """Trade with the ships in port, at the prices of the town's market"""
         if not self.trade_ships:
             print("No trade ships in port!")
             return None, None, None, day  # Return tuple instead of just day
             
         print("\n=== Trading Ships in Port ===")
-        for i, ship in enumerate(self.trade_ships, 1):
-            print(f"{i}. {ship.type} - Selling {ship.selling} for {ship.sell_price}, "
-                  f"Buying {ship.buying} for {ship.buy_price}")
+        docked_ships = list(self.trade_ships.values())
+        for i, ship in enumerate(docked_ships, 1):
+            print(f"{i}. {ship.type} - Selling {ship.selling} for {ship_sell_price(market.price(ship.selling))}, "
+                  f"Buying {ship.buying} for {ship_buy_price(market.price(ship.buying))}")
         
         try:
-            choice = int(input("\nWhich ship would you like to trade with? (number or 0 to cancel): "))
+            choice = int(ask("\nWhich ship would you like to trade with? (number or 0 to cancel): "))
             if choice == 0:
                 return None, None, None, day  # Return tuple
             
-            ship = self.trade_ships[choice - 1]
+            ship = docked_ships[choice - 1]
+            # Ships trade through the town, they load from and unload into its stock anyway
+            sell_price = ship_sell_price(market.price(ship.selling))
+            buy_price = ship_buy_price(market.price(ship.buying))
             print(f"\nTrading with {ship.type}")
-            print(f"1. Buy {ship.selling} for {ship.sell_price} gold")
-            print(f"2. Sell {ship.buying} for {ship.buy_price} gold")
+            print(f"1. Buy {ship.selling} for {sell_price} gold")
+            print(f"2. Sell {ship.buying} for {buy_price} gold")
             
-            trade_choice = input("What would you like to do? ")
+            trade_choice = ask("What would you like to do? ")
             
             if trade_choice == "1":
-                amount = int(input("How many would you like to buy? "))
-                total_cost = amount * ship.sell_price
-                if character.gold >= total_cost:
+                amount = int(ask("How many would you like to buy? "))
+                total_cost = amount * sell_price
+                if not 0 < amount <= min(ship.cargo_capacity, market.stock(ship.selling)):
+                    print(f"The ship only has {min(ship.cargo_capacity, market.stock(ship.selling))} "
+                          f"{ship.selling} to sell!")
+                elif character.gold >= total_cost:
                     character.gold -= total_cost
                     character.inventory[ship.selling] = character.inventory.get(ship.selling, 0) + amount
+                    market.trade(ship.selling, amount)
                     print(f"You bought {amount} {ship.selling}!")
                 else:
                     print("You can't afford that!")
@@ -86,13 +132,14 @@ class Port:
                     print(f"You don't have any {ship.buying} to sell!")
                     return None, None, None, day  # Return tuple
                     
-                amount = int(input("How many would you like to sell? "))
-                if amount <= character.inventory[ship.buying]:
-                    total_payment = amount * ship.buy_price
+                amount = int(ask("How many would you like to sell? "))
+                if 0 < amount <= character.inventory[ship.buying]:
+                    total_payment = amount * buy_price
                     character.gold += total_payment
                     character.inventory[ship.buying] -= amount
                     if character.inventory[ship.buying] == 0:
                         del character.inventory[ship.buying]
+                    market.trade(ship.buying, -amount)
                     print(f"You sold {amount} {ship.buying} for {total_payment} gold!")
                 else:
                     print(f"You don't have that many {ship.buying}!")
@@ -104,7 +151,7 @@ class Port:
 
     def handle_deckhand_travel(self, day):
         # Filter out ships with no destination
-        available_ships = [ship for ship in self.trade_ships if ship.destination is not None]
+        available_ships = [ship for ship in self.trade_ships.values() if ship.destination is not None]
         
         if not available_ships:
             print("No ships currently available for travel!")
@@ -115,7 +162,7 @@ class Port:
             dest = "returning home" if ship.returning_home else f"headed to {ship.destination.name}"
             print(f"{i}. {ship.type} ({dest})")
         
-        choice = input("\nWhich ship would you like to join? (number or 'cancel'): ")
+        choice = ask("\nWhich ship would you like to join? (number or 'cancel'): ")
         if choice.lower() == 'cancel':
             return None, None, None, day
             
@@ -133,7 +180,7 @@ class Port:
         print("7 8 9")
         print("4 5 6")
         print("1 2 3")
-        print("(5 to wait, 0 to quit sailing)")
+        print("(5 to wait, m for the minimap, 0 to quit sailing)")
         
         ship_pos = list(current_island.coordinates)
         moves_remaining = character.ship.speed
@@ -143,7 +190,7 @@ class Port:
             world.map.display(tuple(ship_pos))
             
             print(f"\nMoves remaining this day: {moves_remaining}")
-            move = input("Enter direction (0-9): ")
+            move = ask("Enter direction (0-9): ")
             
             # Movement mapping
             moves = {
@@ -159,6 +206,11 @@ class Port:
                 '0': None       # Quit
             }
             
+            if move.lower() == 'm':
+                world.map.display_minimap(tuple(ship_pos))
+                ask("Press enter to continue...")
+                continue
+            
             if move not in moves:
                 print("Invalid direction!")
                 continue
@@ -169,6 +221,17 @@ class Port:
             if move == '5':
                 print("Waiting...")
                 day += 1
+                # The world moves on around the ship, keeping the sea around it and the home island
+                attacked, destroyed_ships = world.tick(day, tuple(ship_pos),
+                                                       {world.islands.get(character.island), current_island})
+                if attacked:
+                    print("\nThe sea monster attacks your ship!")
+                    print(COLORS.colorize("=== GAME OVER ===", COLORS.RED))
+                    print(f"You survived for {day} days.")
+                    return None, None, None, None  # No day to go on with, the game is over
+                for ship in destroyed_ships:
+                    if day % 3 == 0:  # Only show message when monster is visible
+                        print(f"\n{COLORS.colorize('The sea monster has destroyed a ' + ship.type + '!', COLORS.GRAY)}")
                 moves_remaining = character.ship.speed
                 continue
                 
@@ -181,15 +244,15 @@ class Port:
             new_y = ship_pos[1] + dy
             
             # Check if new position is within bounds
-            if 0 <= new_x < world.map.size and 0 <= new_y < world.map.size:
+            if world.map.in_bounds(new_x, new_y):
                 ship_pos = [new_x, new_y]
                 moves_remaining -= 1
                 
                 # Check if we're on an island
-                island_here = world.map.grid[new_x][new_y]
+                island_here = world.map.island_at(new_x, new_y)
                 if island_here:
                     print(f"\nYou've reached {island_here.name}!")
-                    disembark = input("Would you like to disembark? (yes/no): ").lower()
+                    disembark = ask("Would you like to disembark? (yes/no): ").lower()
                     if disembark == 'yes':
                         return island_here, None, None, day
             else:
@@ -197,8 +260,12 @@ class Port:
 
         return current_island, None, None, day
 
-    def calculate_distance(self, start, end):
-        """Calculate distance between two points using Pythagorean theorem"""
+    def calculate_distance(self, start, end, world=None):
+        """Calculate the sailing distance between two islands, or the straight distance between two points"""
+        if world is not None:
+            distance = world.sailing_distance(world.map.island_at(*start), world.map.island_at(*end))
+            if distance is not None:
+                return distance
         dx = end[0] - start[0]
         dy = end[1] - start[1]
         return (dx**2 + dy**2)**0.5
@@ -207,24 +274,48 @@ class Port:
         """Calculate travel time based on distance and ship speed"""
         return max(1, int(distance / speed))
 
-    def visit(self, character, world, current_island, day):
+    def plan_trade_routes(self, character, world, current_island, current_town):
+        """Suggest the voyages from here that earn the most gold a day"""
+        advisor = RouteAdvisor(world, current_island, current_town, character.ship)
+        plans = advisor.best_plans(character.gold, character.inventory)
+        if not plans:
+            print("No voyage from here would turn a profit right now!")
+            return
+        print(f"\n=== Trade Routes from {current_town} ===")
+        print(f"(Today's prices, for your {character.ship.name} with {character.ship.cargo_capacity} barrels "
+              f"of cargo and {character.gold} gold)")
+        for i, plan in enumerate(plans, 1):
+            print(f"\n{i}. {plan.profit_per_day:.0f} gold a day: {plan.profit} gold in {plan.days} days")
+            for (island, town_name), load, days, next_stop in zip(plan.stops, plan.loads, plan.sailing_days,
+                                                                  plan.stops[1:]):
+                cargo = ", ".join(f"{amount} {good}" for good, amount in load.items()) or "nothing"
+                onward = f"sail {days} days to" if days else "walk over to"
+                print(f"   At {town_name}, {island.name}: buy {cargo}, {onward} {next_stop[1]}")
+            island, town_name = plan.stops[-1]
+            print(f"   At {town_name}, {island.name}: sell everything")
+
+    def visit(self, character, world, current_island, current_town, day):
+        market = world.economy.market(current_island, current_town)
         print("\n=== Welcome to the Port ===")
         if character.ship:
             print("1. Set Sail")
             print("2. Trade with Ships")
-            print("3. Back")
+            print("3. Plan Trade Routes")
+            print("4. Back")
         else:
             print("1. Travel as Deckhand")
             print("2. Trade with Ships")
             print("3. Back")
         
-        choice = input("What would you like to do? ")
+        choice = ask("What would you like to do? ")
         
         if character.ship and choice == "1":
             return self.handle_sailing(character, world, current_island, day)
         elif not character.ship and choice == "1":
             return self.handle_deckhand_travel(day)
         elif choice == "2":
-            return self.handle_trade(character, day)
+            return self.handle_trade(character, day, market)
+        elif character.ship and choice == "3":
+            self.plan_trade_routes(character, world, current_island, current_town)
         
         return current_island, None, None, day
\ No newline at end of file
@@ -1,3 +1,5 @@
+from crystalquest.journal import ask
+
 class Pub:
     def __init__(self):
         self.crew_cost = 100
@@ -12,7 +14,7 @@ class Pub:
         print(f"Your ship can hold {character.ship.crew_capacity} crew members")
         print(f"Current crew: {character.ship.current_crew}")
 
-        amount = input("How many crew members would you like to recruit? ")
+        amount = ask("How many crew members would you like to recruit? ")
         try:
             amount = int(amount)
             total_cost = amount * self.crew_cost
@@ -1,5 +1,5 @@
 import random
-from crystalquest.items import treasure_types
+from crystalquest.items import treasure_types, roll_treasure
 
 class Ruins:
     def __init__(self):
@@ -17,7 +17,7 @@ class Ruins:
         
         # 30% chance to find treasure
         if random.random() < 0.3:
-            treasure = random.choice(self.treasure_types)
+            treasure = roll_treasure(self.treasure_types)
             print(f"\nYou found a {treasure['name']}!")
             
             if 'ability' in treasure:
@@ -1,5 +1,6 @@
 from crystalquest.items import ship_types
 from crystalquest.ships import Ship
+from crystalquest.journal import ask
 
 class Shipyard:
     def __init__(self):
@@ -13,7 +14,7 @@ class Shipyard:
             print(f"2. Repair current ship (Hull: {character.ship.hull_current}/{character.ship.hull_max}, Cost: {self.repair_cost} gold)")
             print("3. Leave")
             
-            choice = input("\nWhat would you like to do? ")
+            choice = ask("\nWhat would you like to do? ")
             
             if choice == "2":
                 if character.ship.hull_current >= character.ship.hull_max:
@@ -35,7 +36,7 @@ class Shipyard:
                   f"Speed: {stats['speed']} squares/day, Hull: {stats['hull_max']}, "
                   f"Cargo: {stats['cargo']} barrels)")
         
-        choice = input("\nWhat would you like to buy? (Enter ship name or 'no'): ").title()
+        choice = ask("\nWhat would you like to buy? (Enter ship name or 'no'): ").title()
         if choice in self.ships:
             if character.gold >= self.ships[choice]['price']:
                 character.gold -= self.ships[choice]['price']
@@ -1,4 +1,5 @@
 from crystalquest.items import weapons
+from crystalquest.journal import ask
 
 class Smithy:
     def __init__(self):
@@ -26,7 +27,7 @@ class Smithy:
                 print(f"{weapon}: {stats['price']} gold (Damage: {stats['damage']}, "
                       f"Type: {stats['type']})")
 
-        choice = input("\nWhat would you like to buy? (Enter weapon name or 'no'): ").title()
+        choice = ask("\nWhat would you like to buy? (Enter weapon name or 'no'): ").title()
         if choice in available_weapons:
             weapon_stats = available_weapons[choice]
             
@@ -0,0 +1,119 @@
+import random
+import numpy as np
+from crystalquest.ascii_art import load_ascii_art, display_ascii_art
+from crystalquest.fleet import FREE
+
+# Map squares per sea monster, small maps still get one
+SQUARES_PER_MONSTER = 400
+# Random directions a monster tries each day before it stays put
+MOVE_TRIES = 4
+
+class SeaMonsters:
+    """Every sea monster in the world, positions kept in one NumPy array.
+
+    Each day all monsters take one random step at once, checked against the
+    map's water mask, and sink every trade ship on their square. Collisions
+    are found by marking the monsters on an occupancy grid and looking up
+    every ship of the fleet on it.
+    """
+
+    def __init__(self, world, count=None):
+        self.speed = 1
+        self.symbol = '∞'
+        self.rng = np.random.default_rng(random.getrandbits(64))
+        if count is None:
+            size = world.map.size
+            count = max(1, size * size // SQUARES_PER_MONSTER) if size is not None else 1
+        # Start on random water squares, all drawn from one list of them
+        cells = world.map.water_cells()
+        self.positions = cells[self.rng.integers(len(cells), size=count)].astype(np.int64).reshape(-1, 2)
+        self.occupancy = None  # Grid the monsters are marked on to find collisions
+
+    @classmethod
+    def from_saved(cls, rng, positions):
+        """Rebuild the monsters of a saved game, their positions an (n, 2) array"""
+        monsters = cls.__new__(cls)  # __init__ would draw new positions
+        monsters.speed = 1
+        monsters.symbol = '∞'
+        monsters.rng = rng
+        monsters.positions = positions
+        monsters.occupancy = None
+        return monsters
+
+    def __getstate__(self):
+        # The occupancy grid is scratch space, keep it out of saves
+        state = self.__dict__.copy()
+        state['occupancy'] = None
+        return state
+
+    def __len__(self):
+        return len(self.positions)
+
+    def position_list(self):
+        return [tuple(position) for position in self.positions.tolist()]
+
+    def at(self, position):
+        """Return True if a monster is on this square"""
+        if position is None:
+            return False
+        return bool(((self.positions[:, 0] == position[0]) & (self.positions[:, 1] == position[1])).any())
+
+    def _is_water(self, game_map, squares):
+        """Return a boolean array telling which squares are in bounds and water"""
+        inside = np.ones(len(squares), dtype=bool)
+        if game_map.size is not None:
+            inside = ((squares >= 0) & (squares < game_map.size)).all(axis=1)
+        water = game_map.water_mask()
+        if water is not None:
+            x = np.where(inside, squares[:, 0], 0)
+            y = np.where(inside, squares[:, 1], 0)
+            return inside & water[x, y]
+        # Maps without a fixed grid are asked square by square, about the sea they have loaded
+        return np.array([ok and game_map.is_water(x, y, generate=False) for ok, (x, y) in
+                         zip(inside, squares.tolist())], dtype=bool)
+
+    def relocate(self, rows, cells):
+        """Move some monsters to random squares of an (n, 2) array of water cells"""
+        if len(cells):
+            self.positions[rows] = cells[self.rng.integers(len(cells), size=len(rows))]
+
+    def move(self, world):
+        # Try up to MOVE_TRIES random directions, monsters that find no water stay put
+        pending = np.ones(len(self.positions), dtype=bool)
+        for _ in range(MOVE_TRIES):
+            rows = np.nonzero(pending)[0]
+            if not len(rows):
+                break
+            steps = self.rng.integers(-1, 2, size=(len(rows), 2)) * self.speed
+            new_positions = self.positions[rows] + steps
+            valid = self._is_water(world.map, new_positions)
+            self.positions[rows[valid]] = new_positions[valid]
+            pending[rows[valid]] = False
+
+    def check_collisions(self, world):
+        """Sink and return the trade ships that share a square with a monster"""
+        fleet = world.fleet
+        rows = np.nonzero(fleet.state[:fleet.size] != FREE)[0]
+        ships = fleet.position[rows]
+        size = world.map.size
+        if size is not None:
+            if self.occupancy is None or self.occupancy.shape != (size, size):
+                self.occupancy = np.zeros((size, size), dtype=bool)
+            self.occupancy[self.positions[:, 0], self.positions[:, 1]] = True
+            hit = self.occupancy[ships[:, 0], ships[:, 1]]
+            self.occupancy[self.positions[:, 0], self.positions[:, 1]] = False
+        else:
+            # An endless sea has no grid, match packed coordinates instead
+            keys = self.positions[:, 0] * 2**32 + self.positions[:, 1]
+            hit = np.isin(ships[:, 0].astype(np.int64) * 2**32 + ships[:, 1], keys)
+
+        destroyed = [fleet.views[row] for row in rows[hit]]
+        for ship in destroyed:
+            world.registry.remove_ship(ship)
+            if world.quiet:
+                continue
+            # Load and display monster art when destroying a ship
+            monster_art = load_ascii_art('crystalquest/art/monster.jpeg')
+            if monster_art:
+                display_ascii_art(monster_art)
+        return destroyed
@@ -0,0 +1,279 @@
+import random
+import numpy as np
+from crystalquest.game import Map, World, Island
+from crystalquest.placement import PlacementEngine, ISLAND_SIDES
+from crystalquest.spatial import IslandIndex
+from crystalquest.fleet import Fleet
+from crystalquest.registry import Registry
+from crystalquest.economy import Economy
+from crystalquest.scheduler import Scheduler
+from crystalquest.monsters import SeaMonsters, SQUARES_PER_MONSTER
+
+class Chunk:
+    """A square piece of the ocean, generated from its own seed"""
+
+    def __init__(self, cx, cy, chunk_size, seed, islands_per_chunk, map_size=None):
+        self.cx = cx
+        self.cy = cy
+        self.seed = seed
+        self.origin = (cx * chunk_size, cy * chunk_size)
+        self.grid = np.zeros((chunk_size, chunk_size), dtype=np.int32)  # 0 for water, otherwise index + 1 into islands
+        self.islands = []
+
+        rng = random.Random(seed)
+        # Islands keep one square away from the chunk edges so neighbouring chunks
+        # always leave a 2-square water gap between them
+        placement = PlacementEngine(chunk_size - 2)
+        for _ in range(rng.randint(0, islands_per_chunk)):
+            island = Island(rng=rng)
+            anchor = placement.find_anchor(island.size, rng)
+            if anchor is None:
+                break
+            x = self.origin[0] + anchor[0] + 1
+            y = self.origin[1] + anchor[1] + 1
+            side = ISLAND_SIDES[island.size]
+            if map_size is not None and (x + side > map_size or y + side > map_size):
+                continue
+            placement.mark(island.size, *anchor)
+            island.coordinates = (x, y)
+            self.islands.append(island)
+            self.grid[anchor[0] + 1:anchor[0] + 1 + side, anchor[1] + 1:anchor[1] + 1 + side] = len(self.islands)
+
+    def apply_deltas(self, deltas):
+        """Restore changes the player made before the chunk was evicted"""
+        for index, changes in deltas.items():
+            island = self.islands[index]
+            if changes.get('treasure_found') and island.has_ruins:
+                island.ruins.treasure_found = True
+
+    def deltas(self):
+        """Return the changes that have to survive eviction"""
+        deltas = {}
+        for index, island in enumerate(self.islands):
+            if island.has_ruins and island.ruins.treasure_found:
+                deltas[index] = {'treasure_found': True}
+        return deltas
+
+class ChunkedMap(Map):
+    """A Map whose squares are split into chunks that are generated on first use.
+
+    Leave size as None for a sea without edges.
+    """
+
+    def __init__(self, world, size=None, chunk_size=32, islands_per_chunk=4):
+        self.world = world
+        self.size = size
+        self.chunk_size = chunk_size
+        self.islands_per_chunk = islands_per_chunk
+        self.chunks = {}  # (cx, cy) -> Chunk
+        self.version = 0
+
+    def __getstate__(self):
+        return self.__dict__.copy()
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+    def chunk_key(self, x, y):
+        return (x // self.chunk_size, y // self.chunk_size)
+
+    def chunk_at(self, x, y):
+        """Return the chunk covering a square, generating it if needed"""
+        key = self.chunk_key(x, y)
+        chunk = self.chunks.get(key)
+        if chunk is None:
+            chunk = self.world.load_chunk(*key)
+        return chunk
+
+    def in_bounds(self, x, y):
+        if self.size is None:
+            return True
+        return 0 <= x < self.size and 0 <= y < self.size
+
+    def island_at(self, x, y):
+        chunk = self.chunk_at(x, y)
+        index = chunk.grid[x - chunk.origin[0], y - chunk.origin[1]]
+        return chunk.islands[index - 1] if index else None
+
+    def is_water(self, x, y, generate=True):
+        """Return True for a water square, squares of chunks not loaded are land unless generate is set"""
+        if not generate and self.chunk_key(x, y) not in self.chunks:
+            return False
+        chunk = self.chunk_at(x, y)
+        return chunk.grid[x - chunk.origin[0], y - chunk.origin[1]] == 0
+
+    def place_island(self, island, x, y):
+        raise TypeError("Islands in a chunked map come from the chunk seeds")
+
+    def water_cells(self):
+        """Return an (n, 2) array with the coordinates of every water square of the map in the loaded chunks"""
+        cells = [np.argwhere(chunk.grid == 0) + chunk.origin for chunk in self.chunks.values()]
+        cells = np.concatenate(cells) if cells else np.zeros((0, 2), dtype=np.int64)
+        if self.size is not None:
+            cells = cells[((cells >= 0) & (cells < self.size)).all(axis=1)]  # Chunks may reach past the edge
+        return cells
+
+    def water_mask(self):
+        """There is no grid of the whole sea, water is looked up square by square"""
+        return None
+
+    def island_cells(self, island):
+        chunk = self.chunk_at(*island.coordinates)
+        index = chunk.islands.index(island) + 1
+        return np.argwhere(chunk.grid == index) + chunk.origin
+
+    def cell_kinds(self, x0=0, y0=0, height=None, width=None):
+        height = self.view_height if height is None else height
+        width = self.view_width if width is None else width
+        kinds = np.zeros((height, width), dtype=np.int8)
+        size = self.chunk_size
+        for cx in range(x0 // size, (x0 + height - 1) // size + 1):
+            for cy in range(y0 // size, (y0 + width - 1) // size + 1):
+                if self.size is not None and not self.in_bounds(cx * size, cy * size):
+                    continue
+                chunk = self.chunk_at(cx * size, cy * size)
+                table = np.array([0] + [1 if island.is_inhabited else 2 for island in chunk.islands],
+                                 dtype=np.int8)
+                # Overlap between the window and this chunk
+                ax0, ax1 = max(x0, chunk.origin[0]), min(x0 + height, chunk.origin[0] + size)
+                ay0, ay1 = max(y0, chunk.origin[1]), min(y0 + width, chunk.origin[1] + size)
+                kinds[ax0 - x0:ax1 - x0, ay0 - y0:ay1 - y0] = table[
+                    chunk.grid[ax0 - chunk.origin[0]:ax1 - chunk.origin[0],
+                               ay0 - chunk.origin[1]:ay1 - chunk.origin[1]]]
+        return kinds
+
+    def minimap_kinds(self, max_size=None):
+        return None
+
+    def display_minimap(self, center=None, max_size=None):
+        print("The sea goes on forever, there's no minimap of it.")
+
+class ChunkedWorld(World):
+    """A World that only generates the chunks of sea near the player and the trade ships.
+
+    Chunks are generated from a seed derived from the world seed and the chunk
+    coordinates, so a chunk that was evicted comes back identical. Only the
+    changes made to it (explored ruins) are kept while it is unloaded. Sea
+    monsters roam only the loaded sea, see monster_count.
+    """
+
+    def __init__(self, seed=None, map_size=None, chunk_size=32, islands_per_chunk=4,
+                 load_radius=1, keep_radius=3):
+        self.seed = random.randrange(2**32) if seed is None else seed
+        self.map = ChunkedMap(self, map_size, chunk_size, islands_per_chunk)
+        self.islands = {}
+        self.inhabited_islands = {}
+        self.island_index = IslandIndex(chunk_size)
+        self.inhabited_index = IslandIndex(chunk_size)
+        self.scheduler = Scheduler()
+        self.fleet = Fleet(self)
+        self.registry = Registry(self)
+        self.economy = Economy()
+        self.load_radius = load_radius  # Chunks generated around everything that moves
+        self.keep_radius = keep_radius  # Chunks further away than this get evicted
+        self.chunk_deltas = {}  # (cx, cy) -> changes of evicted chunks
+        self.name_owners = {}  # Island name -> coordinates of the island that first used it
+        self.max_trade_ships = 0
+
+        # Search outward from the first chunk until there are at least two inhabited islands
+        radius = 0
+        while len(self.get_inhabited_islands()) < 2:
+            for cx in range(-radius, radius + 1):
+                for cy in range(-radius, radius + 1):
+                    if max(abs(cx), abs(cy)) == radius and self.chunk_in_bounds(cx, cy):
+                        self.map.chunk_at(cx * chunk_size, cy * chunk_size)
+            radius += 1
+            if map_size is not None and radius * chunk_size > map_size and \
+                    len(self.get_inhabited_islands()) < 2:
+                raise ValueError("Map is too small for two inhabited islands")
+        self.sea_monsters = SeaMonsters(self, self.monster_count())
+
+    def monster_count(self):
+        """Sea monsters roam the loaded sea around the player, as many as a fixed map that size would hold"""
+        side = (2 * self.load_radius + 1) * self.map.chunk_size
+        if self.map.size is not None:
+            side = min(side, self.map.size)
+        return max(1, side * side // SQUARES_PER_MONSTER)
+
+    def chunk_in_bounds(self, cx, cy):
+        size = self.map.chunk_size
+        if self.map.size is None:
+            return True
+        return 0 <= cx * size < self.map.size and 0 <= cy * size < self.map.size
+
+    def chunk_seed(self, cx, cy):
+        return f"{self.seed}:{cx}:{cy}"
+
+    def load_chunk(self, cx, cy):
+        """Generate a chunk from its seed and add its islands to the world"""
+        chunk = Chunk(cx, cy, self.map.chunk_size, self.chunk_seed(cx, cy),
+                      self.map.islands_per_chunk, self.map.size)
+        chunk.apply_deltas(self.chunk_deltas.pop((cx, cy), {}))
+        for island in chunk.islands:
+            # Island names repeat, so tell duplicates apart by where they are. The first
+            # island to use a name keeps it, so names stay the same after eviction.
+            owner = self.name_owners.setdefault(island.name, island.coordinates)
+            if owner != island.coordinates:
+                island.name = f"{island.name} ({island.coordinates[0]}, {island.coordinates[1]})"
+            self.add_island(island)
+        self.map.chunks[(cx, cy)] = chunk
+        self.map.version += 1
+        self.update_max_trade_ships()
+        return chunk
+
+    def evict_chunk(self, key):
+        """Drop a chunk, keeping only the changes made to it"""
+        chunk = self.map.chunks.pop(key)
+        deltas = chunk.deltas()
+        if deltas:
+            self.chunk_deltas[key] = deltas
+        for island in chunk.islands:
+            self.remove_island(island)
+        self.update_max_trade_ships()
+
+    def route_table(self, workers=None):
+        """The open sea has no fixed grid to plan over, so ships sail straight"""
+        return None
+
+    def update_max_trade_ships(self):
+        self.max_trade_ships = len(self.get_inhabited_islands()) * 2  # 2 ships per inhabited island
+        # Ports that were waiting at the old limit may spawn again
+        if self.registry.ship_count() < self.max_trade_ships:
+            self.registry.wake_ports()
+
+    def update_chunks(self, positions, pinned_islands=()):
+        """Generate chunks near the given positions and evict the ones far from all of them.
+
+        Chunks holding a pinned island (the player's home, where trade ships are
+        registered or headed) are never evicted. The sea around the trade ships
+        is always kept, as are their home and destination islands. Sea monsters
+        keep no sea loaded, those left on evicted chunks surface again in the
+        loaded sea.
+        """
+        centers = {self.map.chunk_key(*position) for position in positions if position is not None}
+        rows = self.fleet.active_rows()
+        ship_chunks = np.unique(self.fleet.position[rows] // self.map.chunk_size, axis=0)
+        centers.update(map(tuple, ship_chunks.tolist()))
+        island_ids = np.unique(np.concatenate([self.fleet.home_id[rows], self.fleet.destination_id[rows]]))
+        pinned_islands = set(pinned_islands)
+        pinned_islands.update(self.fleet.islands[i] for i in island_ids.tolist() if i >= 0)
+        for cx, cy in centers:
+            for dx in range(-self.load_radius, self.load_radius + 1):
+                for dy in range(-self.load_radius, self.load_radius + 1):
+                    key = (cx + dx, cy + dy)
+                    if key not in self.map.chunks and self.chunk_in_bounds(*key):
+                        self.load_chunk(*key)
+
+        pinned_chunks = {self.map.chunk_key(*island.coordinates)
+                         for island in pinned_islands if island is not None}
+        for key in list(self.map.chunks):
+            if key in pinned_chunks:
+                continue
+            if all(max(abs(key[0] - cx), abs(key[1] - cy)) > self.keep_radius for cx, cy in centers):
+                self.evict_chunk(key)
+
+        monsters = self.sea_monsters.positions
+        stray = np.array([self.map.chunk_key(x, y) not in self.map.chunks for x, y in monsters.tolist()],
+                         dtype=bool)
+        if stray.any():
+            self.sea_monsters.relocate(np.nonzero(stray)[0], self.map.water_cells())
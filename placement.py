@@ -0,0 +1,83 @@
+import random
+
+# Side length of each island size in grid squares
+ISLAND_SIDES = {
+    "Small": 1,   # 1 square
+    "Medium": 2,  # 4 squares
+    "Large": 3    # 9 squares
+}
+
+# Buffer zone checked around an anchor (including island size and 2-square water gap),
+# as a (start, stop) offset range applied to both axes
+ISLAND_BUFFERS = {
+    "Small": (-2, 2),
+    "Medium": (-2, 4),
+    "Large": (-2, 5)
+}
+
+class PlacementEngine:
+    """Tracks which anchor squares can still take an island of each size.
+
+    Every island size keeps a dilated occupancy bitmap: a bytearray with one byte
+    per grid square that is non-zero when an island anchored there would overlap
+    an existing island's buffer zone or run off the map. Placing an island only
+    marks the small rectangle of anchors it blocks, and finding a free anchor is
+    a byte lookup (or a C-level bytearray.find scan once the map fills up).
+    """
+
+    def __init__(self, size):
+        self.size = size
+        self.blocked = {}
+        for island_size, side in ISLAND_SIDES.items():
+            blocked = bytearray(size * size)
+            # Anchors too close to the bottom/right edge can't fit the island
+            if side > 1:
+                edge = b'\x01' * (side - 1)
+                for x in range(size):
+                    row = x * size
+                    if x > size - side:
+                        blocked[row:row + size] = b'\x01' * size
+                    else:
+                        blocked[row + size - side + 1:row + size] = edge
+            self.blocked[island_size] = blocked
+
+    def can_place(self, island_size, x, y):
+        """Check whether an island of this size can be anchored at (x, y)"""
+        if not (0 <= x < self.size and 0 <= y < self.size):
+            return False
+        return not self.blocked[island_size][x * self.size + y]
+
+    def mark(self, island_size, x, y):
+        """Block every anchor whose buffer zone overlaps a newly placed island"""
+        side = ISLAND_SIDES[island_size]
+        for other_size, (start, stop) in ISLAND_BUFFERS.items():
+            blocked = self.blocked[other_size]
+            x0 = max(0, x - stop + 1)
+            x1 = min(self.size, x + side - start)
+            y0 = max(0, y - stop + 1)
+            y1 = min(self.size, y + side - start)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            fill = b'\x01' * (y1 - y0)
+            for row in range(x0 * self.size, x1 * self.size, self.size):
+                blocked[row + y0:row + y1] = fill
+
+    def find_anchor(self, island_size, rng=random, probes=8):
+        """Return a random valid anchor for an island of this size, or None if the map is full"""
+        blocked = self.blocked[island_size]
+        cells = len(blocked)
+
+        # Cheap random probes first - almost always enough while the map is sparse
+        for _ in range(probes):
+            index = rng.randrange(cells)
+            if not blocked[index]:
+                return divmod(index, self.size)
+
+        # Fall back to scanning for the next free anchor from a random offset
+        start = rng.randrange(cells)
+        index = blocked.find(0, start)
+        if index == -1:
+            index = blocked.find(0, 0, start)
+        if index == -1:
+            return None
+        return divmod(index, self.size)
@@ -0,0 +1,136 @@
+import random
+
+class Registry:
+    """World-wide bookkeeping of town ports and the trade ships each of them owns.
+
+    Ports are registered as inhabited islands join the world, and ships as
+    ports spawn them, so ship counts per port and for the whole world are kept
+    up to date incrementally instead of walking every island and town.
+
+    Each port schedules its next spawn check with the world's scheduler. Ports
+    that find the world at its ship limit wait until a ship sinks instead of
+    checking again every day. Checks due the same day run in the order the
+    ports were registered, so free ship slots go to the oldest ports first.
+    """
+
+    def __init__(self, world):
+        self.world = world
+        self.ports = {}  # (island, town name) -> port
+        self.port_ships = {}  # port -> set of ships it spawned that are still afloat
+        self.ship_ports = {}  # ship -> port that spawned it, in spawn order
+        self.waiting = []  # (island, town name, port) waiting for a free ship slot
+        self.registered = 0  # Ports registered so far, gives each its spawn priority
+
+    @classmethod
+    def from_saved(cls, world, ports, ship_ports, waiting, registered):
+        """Rebuild the registry of a saved game without scheduling anything.
+
+        ports holds the registered ports by (island, town name), ship_ports the
+        port of every ship in spawn order, replaced ports included.
+        """
+        registry = cls(world)
+        registry.ports = ports
+        registry.port_ships = {port: set() for port in ports.values()}
+        for ship, port in ship_ports.items():
+            registry.port_ships.setdefault(port, set()).add(ship)
+        registry.ship_ports = ship_ports
+        registry.waiting = waiting
+        registry.registered = registered
+        return registry
+
+    def add_island(self, island):
+        """Register the ports of every town on an inhabited island"""
+        for town_name, town in island.towns.items():
+            self.add_town(island, town_name, town)
+
+    def remove_island(self, island):
+        """Forget the ports of an island, their ships stay afloat and counted"""
+        for town_name in island.towns:
+            port = self.ports.pop((island, town_name), None)
+            if port is not None and not self.port_ships.get(port):
+                self.port_ships.pop(port, None)
+
+    def add_town(self, island, town_name, town):
+        """Register (or replace) the port of a town"""
+        port = town.locations.get('port')
+        if port is None:
+            self.ports.pop((island, town_name), None)
+            return
+        port.home_island = island
+        if (island, town_name) not in self.ports:
+            self.registered += 1
+            port.spawn_priority = self.registered
+        self.ports[(island, town_name)] = port
+        self.port_ships.setdefault(port, set())
+        self.schedule_spawn(island, town_name, port)
+
+    def schedule_spawn(self, island, town_name, port, day=None, delay=None):
+        """Schedule a port's next spawn check, a few days from day unless delay is given"""
+        if port.next_spawn is not None:
+            return  # Already scheduled
+        scheduler = self.world.scheduler
+        if day is None:
+            day = scheduler.day
+        port.next_spawn = day + (random.randint(3, 7) if delay is None else delay)
+        scheduler.schedule(port.next_spawn, port.spawn_trade_ship, island, town_name, self.world,
+                           priority=port.spawn_priority)
+
+    def wait_for_ship(self, island, town_name, port):
+        """Park a port that is at the ship limit until a ship sinks"""
+        self.waiting.append((island, town_name, port))
+
+    def wake_ports(self, count=None):
+        """Give waiting ports a spawn check tomorrow, all of them unless count is given"""
+        if count is None:
+            count = len(self.waiting)
+        while self.waiting and count > 0:
+            island, town_name, port = self.waiting.pop(0)
+            if self.ports.get((island, town_name)) is port:  # Ports of evicted islands drop out
+                self.schedule_spawn(island, town_name, port, delay=1)
+                count -= 1
+
+    def iter_ports(self):
+        """Yield (island, town name, port) for every registered port"""
+        for (island, town_name), port in list(self.ports.items()):
+            yield island, town_name, port
+
+    def add_ship(self, port, ship):
+        """Register a new ship, it starts out docked at its home port"""
+        self.port_ships.setdefault(port, set()).add(ship)
+        self.ship_ports[ship] = port
+        port.ship_arrived(ship)
+
+    def remove_ship(self, ship):
+        """Take a sunk or stranded ship out of the registry and the fleet"""
+        port = self.ship_ports.pop(ship, None)
+        if port is not None:
+            self.port_ships[port].discard(ship)
+            port.ship_departed(ship)
+        ship.remove()
+        if self.waiting:
+            self.wake_ports(1)
+
+    def ship_arrived(self, ship):
+        """Tell a ship's port that it docked at home"""
+        port = self.ship_ports.get(ship)
+        if port is not None:
+            port.ship_arrived(ship)
+
+    def ship_departed(self, ship):
+        """Tell a ship's port that it set sail"""
+        port = self.ship_ports.get(ship)
+        if port is not None:
+            port.ship_departed(ship)
+
+    def ship_count(self, port=None):
+        """Return the number of ships owned by a port, or by every port"""
+        if port is None:
+            return len(self.ship_ports)
+        return len(self.port_ships.get(port, ()))
+
+    def ships(self):
+        """Return every registered ship, oldest first"""
+        return list(self.ship_ports)
+
+    def port_of(self, ship):
+        return self.ship_ports.get(ship)
@@ -0,0 +1,146 @@
+import atexit
+import shutil
+from crystalquest.colors import COLORS, FRAMES
+
+# Lines above the first map row: blank line, title and column numbers
+HEADER_LINES = 3
+# Lines below the last map row: blank line, "Legend:" and six entries
+LEGEND_LINES = 8
+# Lines that must stay free under the map for menus and messages
+MIN_TEXT_LINES = 10
+
+def terrain_glyphs():
+    return [
+        COLORS.glyph("~", COLORS.BLUE),    # Water
+        COLORS.glyph("I", COLORS.GREEN),   # Inhabited island
+        COLORS.glyph("o", COLORS.YELLOW)   # Uninhabited island
+    ]
+
+def legend_lines():
+    return [
+        "",
+        "Legend:",
+        COLORS.colorize("@", COLORS.WHITE) + " = You",
+        COLORS.colorize("I", COLORS.GREEN) + " = Inhabited Island",
+        COLORS.colorize("o", COLORS.YELLOW) + " = Uninhabited Island",
+        COLORS.colorize("~", COLORS.BLUE) + " = Water",
+        COLORS.colorize("S/B/G", COLORS.RED) + " = Sloop/Brigantine/Galleon",
+        COLORS.colorize("∞", COLORS.GRAY) + " = Sea Monster"
+    ]
+
+class MapRenderer:
+    """Draws the map, redrawing only the squares that changed since the last frame.
+
+    On an ANSI terminal tall enough for it, the map is pinned to the top of the
+    screen and everything else scrolls in the region below it. Each frame then
+    only rewrites the squares whose entity (ship, player, sea monster) changed,
+    using cursor addressing. A full redraw happens on the first frame, when the
+    visible window or the terrain changed, or when the terminal was resized.
+    Everywhere else (no colors, pipes, small terminals) every frame is printed
+    in full as before.
+    """
+
+    def __init__(self, frames=FRAMES):
+        self.frames = frames
+        self.frame_key = None  # (window, map version, terminal size) of the pinned frame
+        self.overlay = {}  # (x, y) -> glyph of the entities in the pinned frame
+        self.kinds = None  # Terrain of the pinned frame
+        self.scroll_region_set = False
+        atexit.register(self.reset)
+
+    def invalidate(self):
+        """Force a full redraw on the next frame"""
+        self.frame_key = None
+
+    def reset(self):
+        """Give the whole screen back to normal scrolling output"""
+        if self.scroll_region_set:
+            # Resetting the scroll region homes the cursor, so keep it where it was
+            self.frames.write("\0337\033[r\0338")
+            self.frames.flush()
+            self.scroll_region_set = False
+        self.frame_key = None
+
+    def draw(self, game_map, overlay, window):
+        """Draw a window of the map with entity glyphs laid over the terrain"""
+        x0, y0, height, width = window
+        frame_lines = HEADER_LINES + height + LEGEND_LINES
+        columns, lines = shutil.get_terminal_size()
+        pinned = (COLORS.use_colors and lines >= frame_lines + MIN_TEXT_LINES and
+                  columns >= 3 + 3 * width)
+        if not pinned:
+            self.reset()
+            self.frames.write(self.render_frame(game_map, overlay, window) + "\n")
+            self.frames.flush()
+            return
+
+        key = (window, getattr(game_map, 'version', 0), (columns, lines))
+        if key != self.frame_key:
+            self._redraw(game_map, overlay, window, frame_lines, lines)
+            self.frame_key = key
+        else:
+            self._update(overlay, window)
+        self.overlay = overlay
+        self.frames.flush()
+
+    def render_frame(self, game_map, overlay, window):
+        """Return the whole map and legend as text"""
+        x0, y0, height, width = window
+        terrain = terrain_glyphs()
+        kinds = game_map.cell_kinds(x0, y0, height, width).tolist()
+        self.kinds = kinds
+        title = "=== World Map ==="
+        if game_map.size is None or height < game_map.size or width < game_map.size:
+            title += f" (rows {x0}-{x0 + height - 1}, columns {y0}-{y0 + width - 1})"
+        lines = ["", title,
+                 "   " + " ".join(f"{j % 100:2}" for j in range(y0, y0 + width))]
+        for i in range(x0, x0 + height):
+            row_kinds = kinds[i - x0]
+            cells = []
+            for j in range(y0, y0 + width):
+                glyph = overlay.get((i, j))
+                cells.append(glyph if glyph is not None else terrain[row_kinds[j - y0]])
+            lines.append(f"{i % 100:2} " + "".join(f" {cell} " for cell in cells))
+        lines.extend(legend_lines())
+        return "\n".join(lines)
+
+    def render_minimap(self, kinds, block, center=None):
+        """Return a block summary of the map as text, one character per block"""
+        terrain = terrain_glyphs()
+        marker = None if center is None else (center[0] // block, center[1] // block)
+        lines = ["", f"=== Minimap (1 square = {block}x{block}) ==="]
+        for i, row in enumerate(kinds.tolist()):
+            cells = [terrain[kind] for kind in row]
+            if marker is not None and marker[0] == i:
+                cells[marker[1]] = COLORS.glyph("@", COLORS.WHITE)
+            lines.append("".join(cells))
+        return "\n".join(lines)
+
+    def _redraw(self, game_map, overlay, window, frame_lines, lines):
+        # Clear the screen, draw the map at the top and let text scroll below it
+        text = self.render_frame(game_map, overlay, window)
+        self.frames.write("\033[r\033[2J\033[H" + text + "\n" +
+                          f"\033[{frame_lines + 1};{lines}r\033[{frame_lines + 1};1H")
+        self.scroll_region_set = True
+
+    def _update(self, overlay, window):
+        x0, y0, height, width = window
+        terrain = terrain_glyphs()
+        changes = []
+        for position in self.overlay.keys() | overlay.keys():
+            glyph = overlay.get(position)
+            if glyph == self.overlay.get(position):
+                continue
+            i, j = position
+            if not (x0 <= i < x0 + height and y0 <= j < y0 + width):
+                continue
+            if glyph is None:
+                glyph = terrain[self.kinds[i - x0][j - y0]]
+            # Row and column of the square on screen (1-based)
+            changes.append(f"\033[{HEADER_LINES + 1 + i - x0};{5 + 3 * (j - y0)}H{glyph}")
+        if changes:
+            # Save the cursor, patch the squares, then put the cursor back
+            self.frames.write("\0337" + "".join(changes) + "\0338")
+
+# Create a global instance
+RENDERER = MapRenderer()
@@ -0,0 +1,322 @@
+import numpy as np
+from crystalquest.fleet import TRADE_DESTINATION_CHOICES
+from crystalquest.placement import ISLAND_SIDES
+
+# Squares a ship can move to in one step, like the numpad
+DIRECTIONS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0), (1, 1)]
+# Above this many ports the routes are planned in worker processes, unless a single worker is asked for
+PARALLEL_PORTS = 64
+# Sea lanes planned up front from each port, to the nearest ports trade ships pick their
+# destinations from. Lanes to ports further away are planned the first time they are asked for.
+NEAREST_ROUTES = TRADE_DESTINATION_CHOICES
+
+def island_squares(island):
+    """Return the (x, y) squares an island covers"""
+    x, y = island.coordinates
+    side = ISLAND_SIDES[island.size]
+    return [(x + i, y + j) for i in range(side) for j in range(side)]
+
+def simplify(path):
+    """Keep only the squares where a path changes course, and its ends"""
+    waypoints = []
+    heading = None
+    for a, b in zip(path, path[1:]):
+        step = (b[0] - a[0], b[1] - a[1])
+        if abs(step[0]) > 1 or abs(step[1]) > 1:
+            step = None  # Only runs of single steps get merged
+        if step is None or step != heading:
+            waypoints.append(a)
+        heading = step
+    waypoints.append(path[-1])
+    return waypoints
+
+def route_length(waypoints):
+    """Number of days at speed 1 to sail along the waypoints"""
+    return sum(max(abs(b[0] - a[0]), abs(b[1] - a[1])) for a, b in zip(waypoints, waypoints[1:]))
+
+class SeaChart:
+    """The water of a map and the squares of its ports, set up once to plan any number of routes over.
+
+    grid holds island ids (0 for water) and ports the (anchor, squares) of
+    each port island. The chart works on a flat copy of the grid with a
+    border of blocked squares around it.
+    """
+
+    def __init__(self, grid, ports):
+        self.ports = ports
+        self.width = grid.shape[0] + 2
+        width = self.width
+        port_of = np.full((width, width), -1, dtype=np.int32)
+        for port, (anchor, squares) in enumerate(ports):
+            for x, y in squares:
+                port_of[x + 1, y + 1] = port
+        water = np.zeros((width, width), dtype=bool)
+        water[1:-1, 1:-1] = grid == 0
+        self.port_of = port_of.ravel()
+        self.water = water.ravel()
+        self.reachable = self.water | (self.port_of >= 0)  # Other ports can be reached but not crossed
+        self.offsets = np.array([dx * width + dy for dx, dy in DIRECTIONS])
+        self.cells = [np.array([(x + 1) * width + y + 1 for x, y in squares], dtype=np.int64)
+                      for anchor, squares in ports]
+
+    def plan_from(self, source, targets=None):
+        """Breadth-first search over the water from one port to other ports.
+
+        Ships may cross the squares of the island they leave but no other
+        island. Returns, for every port in targets (all of them by default),
+        the waypoints of the shortest route from source (excluding the start)
+        or None if there is none. The search stops once it reached them all.
+        """
+        if targets is None:
+            targets = range(len(self.ports))
+        targets = list(targets)
+        wanted = np.zeros(len(self.ports), dtype=bool)
+        wanted[targets] = True
+        wanted[source] = False
+        left = int(wanted.sum())
+
+        port_of = self.port_of
+        distance = np.full(len(port_of), -1, dtype=np.int32)
+        parent = np.full(len(port_of), -1, dtype=np.int64)
+        frontier = self.cells[source]
+        distance[frontier] = 0
+        steps = 0
+        while len(frontier) and left:
+            steps += 1
+            candidates = (frontier[:, None] + self.offsets[None, :]).ravel()
+            origins = np.repeat(frontier, len(self.offsets))
+            new = (distance[candidates] < 0) & self.reachable[candidates]
+            candidates, first = np.unique(candidates[new], return_index=True)
+            distance[candidates] = steps
+            parent[candidates] = origins[new][first]
+            ports = port_of[candidates]
+            crossable = self.water[candidates] | (ports == source)
+            # Squares of the island reached first are all reached in the same step, so stopping is safe
+            reached = np.unique(ports[~crossable])
+            reached = reached[wanted[reached]]
+            wanted[reached] = False
+            left -= len(reached)
+            frontier = candidates[crossable]
+
+        routes = []
+        start = self.ports[source][0]
+        width = self.width
+        for port in targets:
+            if port == source:
+                routes.append(None)
+                continue
+            cells = self.cells[port]
+            reach = distance[cells]
+            if not (reach >= 0).any():
+                routes.append(None)
+                continue
+            # Walk back from the first square of the island the search reached
+            cell = int(cells[np.argmin(np.where(reach >= 0, reach, np.iinfo(np.int32).max))])
+            path = []
+            while cell >= 0:
+                path.append((cell // width - 1, cell % width - 1))
+                cell = int(parent[cell])
+            path.reverse()
+            path = [start] + path + [self.ports[port][0]]
+            path = [point for i, point in enumerate(path) if i == 0 or point != path[i - 1]]
+            routes.append(simplify(path)[1:])
+        return routes
+
+def plan_from(grid, ports, source, targets=None):
+    """Plan the routes from one port to others on a chart of its own, see SeaChart.plan_from"""
+    return SeaChart(grid, ports).plan_from(source, targets)
+
+_chart = None  # SeaChart of a planning worker process, set up once by its initializer
+
+def _start_planner(grid, ports):
+    global _chart
+    _chart = SeaChart(grid, ports)
+
+def _plan_in_worker(task):
+    source, targets = task
+    return _chart.plan_from(source, targets)
+
+def route_tails(waypoints, ends):
+    """Squares left to sail from each waypoint to the end of its route, ends are the sorted route ends"""
+    # Sum the legs after each waypoint, restarting at the end of every route. Routes are laid out
+    # one after another, so each waypoint's route end is its route's entry repeated over the route
+    steps = np.abs(np.diff(waypoints, axis=0))
+    legs = np.zeros(len(waypoints), dtype=np.int64)
+    legs[:-1] = np.maximum(steps[:, 0], steps[:, 1])
+    legs[ends] = 0
+    after = np.cumsum(legs[::-1])[::-1]
+    return (after - np.repeat(after[ends], np.diff(ends, prepend=-1))).astype(np.int32)
+
+class RouteTable:
+    """Sea lanes between the inhabited islands of a fixed-size map.
+
+    Lanes are planned up front from every port to its NEAREST_ROUTES nearest
+    ports, where trade ships sail, and between any other two ports the first
+    time they are asked for. Each pair of port indexes planned so far is a row
+    of the pair arrays, sorted by pair_keys (source * ports + target):
+    pair_distance is the length of its lane (-1 when no sea lane exists), and
+    pair_start and pair_end the first and last index of its waypoints (-1 for
+    none). Waypoints are squares where a ship changes course, all routes in
+    one flat array, and tail the squares left to sail from each waypoint to
+    the end of its route. The table remembers the map version it was planned
+    for, and is planned again rather than extended once the map changes.
+    """
+
+    def __init__(self, game_map, islands, workers=None):
+        self.version = game_map.version
+        self.map = game_map
+        self.islands = list(islands)
+        self.index = {island: i for i, island in enumerate(self.islands)}
+        self.chart = None  # Set up on first use, see sea_chart
+        count = len(self.islands)
+        self.pair_keys = np.arange(count, dtype=np.int64) * (count + 1)  # A port is no sail from itself
+        self.pair_distance = np.zeros(count, dtype=np.int32)
+        self.pair_start = np.full(count, -1, dtype=np.int32)
+        self.pair_end = np.full(count, -1, dtype=np.int32)
+        self.waypoints = np.zeros((0, 2), dtype=np.int32)
+        self.tail = np.zeros(0, dtype=np.int32)
+
+        # Ships sail to the nearest ports of their home and back, so lanes go both ways
+        nearest = self.nearest_ports()
+        targets = [set(ports) for ports in nearest]
+        for source, ports in enumerate(nearest):
+            for target in ports:
+                targets[target].add(source)
+        tasks = [(source, sorted(ports)) for source, ports in enumerate(targets) if ports]
+        if len(tasks) > PARALLEL_PORTS and workers != 1:
+            from concurrent.futures import ProcessPoolExecutor  # Big worlds only, keeps startup light
+            # Each worker sets up its chart of the map once, the tasks only carry port indexes
+            with ProcessPoolExecutor(max_workers=workers, initializer=_start_planner,
+                                     initargs=(game_map.grid, self.ports())) as executor:
+                plans = list(executor.map(_plan_in_worker, tasks, chunksize=16))
+        else:
+            chart = self.sea_chart()
+            plans = [chart.plan_from(source, targets) for source, targets in tasks]
+        self.add_routes([(source, targets, routes) for (source, targets), routes in zip(tasks, plans)])
+
+    @classmethod
+    def from_saved(cls, version, game_map, islands, pair_keys, pair_distance, pair_start, pair_end, waypoints,
+                   tail):
+        """Rebuild a route table from the arrays of a saved one, without planning anything"""
+        routes = cls.__new__(cls)
+        routes.version = version
+        routes.map = game_map
+        routes.islands = islands
+        routes.index = {island: i for i, island in enumerate(islands)}
+        routes.chart = None
+        routes.pair_keys = pair_keys
+        routes.pair_distance = pair_distance
+        routes.pair_start = pair_start
+        routes.pair_end = pair_end
+        routes.waypoints = waypoints
+        routes.tail = tail
+        return routes
+
+    def __getstate__(self):
+        # The chart is set up again from the map when it is needed, keep it out of saves
+        state = self.__dict__.copy()
+        state['chart'] = None
+        return state
+
+    def ports(self):
+        """Return the (anchor, squares) of every port island"""
+        return [(island.coordinates, island_squares(island)) for island in self.islands]
+
+    def sea_chart(self):
+        if self.chart is None:
+            self.chart = SeaChart(self.map.grid, self.ports())
+        return self.chart
+
+    def nearest_ports(self):
+        """Return the indexes of the NEAREST_ROUTES nearest ports of every port, as the crow flies"""
+        count = len(self.islands)
+        k = min(NEAREST_ROUTES, count - 1)
+        if k <= 0:
+            return [[] for _ in range(count)]
+        coordinates = np.array([island.coordinates for island in self.islands], dtype=np.int64)
+        nearest = []
+        for block in range(0, count, 256):  # Bounds the memory of the gaps on big maps
+            gaps = ((coordinates[block:block + 256, None, :] - coordinates[None, :, :]) ** 2).sum(axis=2)
+            gaps[np.arange(len(gaps)), np.arange(block, block + len(gaps))] = np.iinfo(np.int64).max
+            nearest.extend(np.argpartition(gaps, k - 1, axis=1)[:, :k].tolist())
+        return nearest
+
+    def add_routes(self, plans):
+        """Add the planned (source, targets, routes) of ports to the table"""
+        count = len(self.islands)
+        keys, distances, starts, ends = [], [], [], []
+        waypoints = []
+        offset = len(self.waypoints)
+        for source, targets, routes in plans:
+            anchor = self.islands[source].coordinates
+            for target, route in zip(targets, routes):
+                keys.append(source * count + target)
+                if route is None:
+                    distances.append(-1)
+                    starts.append(-1)
+                    ends.append(-1)
+                    continue
+                distances.append(route_length([anchor] + route))
+                starts.append(offset + len(waypoints))
+                waypoints.extend(route)
+                ends.append(offset + len(waypoints) - 1)
+        if not keys:
+            return
+        waypoints = np.array(waypoints, dtype=np.int32).reshape(-1, 2)
+        route_ends = np.array([end for end in ends if end >= 0], dtype=np.int64) - offset
+        self.tail = np.concatenate([self.tail, route_tails(waypoints, route_ends)]).astype(np.int32)
+        self.waypoints = np.concatenate([self.waypoints, waypoints])
+        pair_keys = np.concatenate([self.pair_keys, np.array(keys, dtype=np.int64)])
+        order = np.argsort(pair_keys, kind='stable')
+        self.pair_keys = pair_keys[order]
+        self.pair_distance = np.concatenate([self.pair_distance, np.array(distances, dtype=np.int32)])[order]
+        self.pair_start = np.concatenate([self.pair_start, np.array(starts, dtype=np.int32)])[order]
+        self.pair_end = np.concatenate([self.pair_end, np.array(ends, dtype=np.int32)])[order]
+
+    def pairs(self, a, b):
+        """Return the pair rows of the lanes between port indexes a and b, planning those not known yet"""
+        keys = np.asarray(a, dtype=np.int64) * len(self.islands) + np.asarray(b, dtype=np.int64)
+        rows = np.searchsorted(self.pair_keys, keys)
+        missing = rows >= len(self.pair_keys)
+        missing[~missing] = self.pair_keys[rows[~missing]] != keys[~missing]
+        if missing.any():
+            missing = np.unique(keys[missing])
+            sources = missing // len(self.islands)
+            chart = self.sea_chart()
+            plans = []
+            for source in np.unique(sources).tolist():
+                targets = (missing[sources == source] % len(self.islands)).tolist()
+                plans.append((source, targets, chart.plan_from(source, targets)))
+            self.add_routes(plans)
+            rows = np.searchsorted(self.pair_keys, keys)
+        return rows
+
+    def legs(self, a, b):
+        """Return the first and last waypoint index of the routes between port indexes a and b"""
+        rows = self.pairs(a, b)
+        return self.pair_start[rows], self.pair_end[rows]
+
+    def distances(self, a, b):
+        """Return the lengths of the sea lanes between port indexes a and b, -1 where there is none"""
+        rows = self.pairs(a, b)  # Planning replaces the pair arrays, look them up after
+        return self.pair_distance[rows]
+
+    def route(self, start_island, end_island):
+        """Return the waypoints from one island to another, or None"""
+        a = self.index.get(start_island)
+        b = self.index.get(end_island)
+        if a is None or b is None:
+            return None
+        start, end = self.legs([a], [b])
+        if start[0] < 0:
+            return None
+        return [tuple(point) for point in self.waypoints[start[0]:end[0] + 1].tolist()]
+
+    def sailing_distance(self, start_island, end_island):
+        """Return the length of the sea lane between two islands, or None"""
+        a = self.index.get(start_island)
+        b = self.index.get(end_island)
+        if a is None or b is None:
+            return None
+        distance = int(self.distances([a], [b])[0])
+        return distance if distance >= 0 else None
@@ -0,0 +1,709 @@
+import argparse
+import json
+import os
+import pickle
+import random
+import struct
+import tempfile
+import time
+import weakref
+import zlib
+import numpy as np
+from crystalquest.economy import Economy, GOODS
+from crystalquest.fleet import Fleet, TRADE_DESTINATION_CHOICES
+from crystalquest.locations.port import Port
+from crystalquest.monsters import SeaMonsters
+from crystalquest.registry import Registry
+from crystalquest.routes import RouteTable, route_tails
+from crystalquest.scheduler import Scheduler
+from crystalquest.ships import Ship, TradeShip
+
+# A save is a header followed by sections: a zlib-compressed JSON section with the
+# player, scalars and interned strings, then sections of column tables (islands,
+# towns, ships, events, sea lanes...) described by SCHEMA, stored raw or compressed. Saves of an older
+# format version are upgraded by the MIGRATIONS registered for it on load.
+MAGIC = b'CQSV'
+FORMAT_VERSION = 4
+HEADER = struct.Struct('<4sHH')  # Magic, format version, number of sections
+# Set in the packed size of sections stored as they are, without compression
+STORED = 1 << 31
+# zlib level of table sections, 0 stores them as they are. Compressing halves the size of a save
+# again, but on big worlds it doubles the time to read one back, so it is left to the caller.
+TABLE_COMPRESSION = 0
+ISLAND_SIZES = ['Small', 'Medium', 'Large']
+
+# Scheduled event kinds
+SPAWN_EVENT = 0
+SEND_HOME_EVENT = 1
+
+# Columns of every table: name and NumPy dtype. Strings are stored as indexes
+# into the string list of the metadata, island and town references as row
+# numbers of their tables (-1 for none).
+SCHEMA = {
+    'islands': [('name', '<i4'), ('size', 'u1'), ('climate', '<i4'), ('x', '<i4'), ('y', '<i4'),
+                ('inhabited', 'u1'), ('has_ruins', 'u1'), ('treasure_found', 'u1'), ('population', '<i4')],
+    'biotopes': [('island', '<i4'), ('name', '<i4')],
+    'towns': [('island', '<i4'), ('name', '<i4'), ('population', '<i4'), ('home', 'u1'),
+              ('registered', 'u1'), ('travel_cost', '<i4'), ('last_spawn', '<i4'), ('next_spawn', '<i4'),
+              ('spawn_priority', '<i4')],
+    'ships': [('row', '<i4'), ('id', '<i8'), ('port', '<i4'), ('docked', 'u1'), ('x', '<i4'), ('y', '<i4'),
+              ('last_x', '<i4'), ('last_y', '<i4'), ('home', '<i4'), ('destination', '<i4'),
+              ('leg', '<i4'), ('leg_end', '<i4'), ('speed', '<i4'), ('state', 'i1'), ('arrival_day', '<i4'),
+              ('type', 'i1'), ('crew', '<i2'), ('cargo', '<i2'), ('selling', 'i1'), ('buying', 'i1')],
+    'free_rows': [('row', '<i4')],
+    'inhabited': [('island', '<i4')],
+    'fleet_islands': [('island', '<i4'), ('choice_count', '<i4'), ('current', 'u1')],
+    'fleet_choices': [('island', '<i4')],
+    'waiting': [('town', '<i4')],
+    'events': [('day', '<i4'), ('priority', '<i8'), ('sequence', '<i8'), ('kind', 'u1'), ('town', '<i4'),
+               ('first_ship', '<i4'), ('ship_count', '<i4')],
+    'event_ships': [('row', '<i8'), ('id', '<i8')],
+    'monsters': [('x', '<i8'), ('y', '<i8')],
+    'route_islands': [('island', '<i4')],
+    'route_pairs': [('source', '<i4'), ('target', '<i4'), ('distance', '<i4'), ('length', '<i4')],
+    'waypoints': [('xy', '<i4')],  # x and y of every waypoint in turn
+    'waypoint_tails': [('tail', '<i4')],
+    'inventory': [('item', '<i4'), ('amount', '<i8')],
+    'markets': [('island', '<i4'), ('name', '<i4')],
+    'market_goods': [('stock', '<f8'), ('production', '<f8'), ('demand', '<f8')],  # Every good of every market
+}
+
+# The fleet keeps the route table its ships' legs refer to until it picks up a newer one
+for _name in ('route_islands', 'route_pairs', 'waypoints', 'waypoint_tails'):
+    SCHEMA['fleet_' + _name] = SCHEMA[_name]
+
+# Format version -> function(meta, tables) that upgrades a save of that version to the next
+MIGRATIONS = {}
+
+def migration(version):
+    """Register a function that upgrades saves of a format version to the next one"""
+    def register(function):
+        MIGRATIONS[version] = function
+        return function
+    return register
+
+@migration(1)
+def _price_by_town(meta, tables):
+    """Version 2 prices goods by town instead of by trade ship, the towns get new markets on load"""
+    for name in ('sell_price', 'buy_price'):
+        tables['ships'].pop(name)
+    meta['economy'] = None
+    return meta, tables
+
+@migration(2)
+def _absolute_waypoints(meta, tables):
+    """Version 3 stores waypoints as squares along with the sail left to their route's end, not as steps"""
+    for prefix in ('', 'fleet_'):
+        if prefix + 'waypoints' not in tables:
+            continue
+        steps = tables[prefix + 'waypoints']
+        waypoints = np.stack([np.cumsum(steps['dx'], dtype=np.int64), np.cumsum(steps['dy'], dtype=np.int64)], axis=1)
+        lengths = tables[prefix + 'route_pairs']['length']
+        ends = (np.cumsum(lengths, dtype=np.int64) - 1)[lengths > 0]
+        tables[prefix + 'waypoints'] = {'xy': waypoints.ravel()}
+        tables[prefix + 'waypoint_tails'] = {'tail': route_tails(waypoints, ends)}
+    return meta, tables
+
+@migration(3)
+def _sparse_route_pairs(meta, tables):
+    """Version 4 keeps the sea lanes planned so far by source and target port, not a lane for every pair"""
+    for prefix in ('', 'fleet_'):
+        if prefix + 'route_pairs' not in tables:
+            continue
+        count = len(tables[prefix + 'route_islands']['island'])
+        pairs = tables[prefix + 'route_pairs']
+        # Pairs without a lane hold no waypoints, dropping them leaves the routes where they were
+        known = pairs['distance'] >= 0
+        source, target = np.divmod(np.arange(count * count, dtype=np.int64), count)
+        tables[prefix + 'route_pairs'] = {'source': source[known], 'target': target[known],
+                                          'distance': pairs['distance'][known], 'length': pairs['length'][known]}
+    return meta, tables
+
+class Strings:
+    """Interned strings, stored once in the metadata and referred to by index"""
+
+    def __init__(self):
+        self.index = {}  # String -> index, in the order they were first seen
+
+    def __call__(self, value):
+        return self.index.setdefault(value, len(self.index))
+
+    @property
+    def values(self):
+        return list(self.index)
+
+def _table(name, rows):
+    """Pack a list of row tuples into the columns of a schema table"""
+    columns = SCHEMA[name]
+    if not rows:
+        return {column: np.zeros(0, dtype=dtype) for column, dtype in columns}
+    values = list(zip(*rows))
+    return {column: np.array(values[i], dtype=dtype) for i, (column, dtype) in enumerate(columns)}
+
+# Integer types columns are narrowed to, with the values they hold
+NARROW_TYPES = [(-2**7, 2**7 - 1, np.dtype('i1')), (0, 2**8 - 1, np.dtype('u1')),
+                (-2**15, 2**15 - 1, np.dtype('<i2')), (0, 2**16 - 1, np.dtype('<u2')),
+                (-2**31, 2**31 - 1, np.dtype('<i4'))]
+# Columns shorter than this are stored as they are, narrowing them takes longer than it saves
+NARROW_ROWS = 64
+
+def _narrow(values):
+    """Store integer columns in the smallest type that holds them, they are widened again on load"""
+    if values.dtype.kind not in 'iu' or len(values) < NARROW_ROWS:
+        return values
+    low, high = int(values.min()), int(values.max())
+    for type_min, type_max, dtype in NARROW_TYPES:
+        if type_min <= low and high <= type_max:
+            return values.astype(dtype, copy=False)
+    return values.astype('<i8', copy=False)
+
+def _section(data, level=1):
+    """Compress one section of a save (level 0 stores it as it is), prefixed with its sizes"""
+    if not level:
+        return struct.pack('<II', len(data), STORED | len(data)) + data
+    packed = zlib.compress(data, level)
+    return struct.pack('<II', len(data), len(packed)) + packed
+
+def pack_tables(tables, level=TABLE_COMPRESSION):
+    """Serialize tables into one section.
+
+    The section opens with a JSON directory of the tables, their row counts
+    and the name and type of each column, followed by the raw values of every
+    column. Columns are laid out type by type, in directory order within a
+    type, so a load reads each type with one frombuffer and slices it up.
+    The section is compressed with zlib at level, or stored as it is at 0.
+    """
+    directory = []
+    runs = {}  # Column type -> values of the columns of that type
+    for name, columns in tables.items():
+        rows = len(next(iter(columns.values()))) if columns else 0
+        layout = []
+        for column, values in columns.items():
+            values = _narrow(values)
+            layout.append((column, values.dtype.str))
+            runs.setdefault(values.dtype.str, []).append(values.tobytes())
+        directory.append((name, rows, layout))
+    header = json.dumps(directory, separators=(',', ':')).encode()
+    data = b''.join(b''.join(run) for run in runs.values())
+    return _section(struct.pack('<I', len(header)) + header + data, level)
+
+def _unpack_tables(payload, tables, by_type=True):
+    """Read the tables of a section into tables, sections before format 3 hold their columns one after another"""
+    length, = struct.unpack_from('<I', payload)
+    offset = 4 + length
+    directory = json.loads(payload[4:offset])
+    if not by_type:
+        for name, rows, layout in directory:
+            columns = {}
+            for column, dtype in layout:
+                dtype = np.dtype(dtype)
+                columns[column] = np.frombuffer(payload, dtype, rows, offset)
+                offset += rows * dtype.itemsize
+            tables[name] = columns
+        return
+    runs = {}  # Column type -> rows of all the columns of that type, in the order the types come up
+    for _, rows, layout in directory:
+        for _, dtype in layout:
+            runs[dtype] = runs.get(dtype, 0) + rows
+    starts = {}
+    for dtype, rows in runs.items():
+        values = np.frombuffer(payload, dtype, rows, offset)
+        offset += values.nbytes
+        runs[dtype] = values
+        starts[dtype] = 0
+    for name, rows, layout in directory:
+        columns = {}
+        for column, dtype in layout:
+            start = starts[dtype]
+            columns[column] = runs[dtype][start:start + rows]
+            starts[dtype] = start + rows
+        tables[name] = columns
+
+def encode(meta, sections):
+    """Put a save together from its metadata and already packed table sections"""
+    meta_section = _section(json.dumps(meta, separators=(',', ':')).encode())
+    return HEADER.pack(MAGIC, FORMAT_VERSION, len(sections) + 1) + meta_section + b''.join(sections)
+
+def decode(data):
+    """Parse a save into (format version, metadata, tables) without building any game objects"""
+    magic, version, section_count = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError("Not a Crystal Quest save file")
+    offset = HEADER.size
+    sections = []
+    for _ in range(section_count):
+        size, packed_size = struct.unpack_from('<II', data, offset)
+        offset += 8
+        if packed_size & STORED:
+            packed_size ^= STORED
+            payload = data[offset:offset + packed_size]
+        else:
+            payload = zlib.decompress(data[offset:offset + packed_size])
+        if len(payload) != size:
+            raise ValueError("Save file is truncated")
+        sections.append(payload)
+        offset += packed_size
+    meta = json.loads(sections[0])
+    tables = {}
+    for payload in sections[1:]:
+        _unpack_tables(payload, tables, version >= 3)
+    return version, meta, tables
+
+def read_summary(path):
+    """Return (format version, summary) of a save file, reading only its metadata section"""
+    with open(path, 'rb') as f:
+        magic, version, _ = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC:
+            raise ValueError("Not a Crystal Quest save file")
+        size, packed_size = struct.unpack('<II', f.read(8))
+        payload = zlib.decompress(f.read(packed_size))
+    if len(payload) != size:
+        raise ValueError("Save file is truncated")
+    return version, json.loads(payload).get('summary')
+
+def _rng_state(rng):
+    return rng.bit_generator.state
+
+# Seeds the generators a load puts the saved states into, seeding from it is cheaper than from a number
+_LOAD_SEED = np.random.SeedSequence(0)
+
+def _make_rng(state):
+    bit_generator = np.random.PCG64(_LOAD_SEED)
+    bit_generator.state = state
+    return np.random.Generator(bit_generator)
+
+def _plain(value):
+    """Turn tuples (and NumPy scalars) into JSON values"""
+    if isinstance(value, dict):
+        return {key: _plain(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_plain(item) for item in value]
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
+
+# Route table -> its packed sections by table prefix and compression level, with the number of lanes
+# they hold. Route tables only grow as lanes are planned on demand, and are by far the biggest part of
+# a save, so saving the same world again only packs the rest of it.
+_route_sections = weakref.WeakKeyDictionary()
+
+def _route_section(routes, prefix='', level=TABLE_COMPRESSION):
+    sections = _route_sections.setdefault(routes, {})
+    planned = len(routes.pair_keys)
+    if sections.get((prefix, level), (None,))[0] != planned:
+        # Pairs go in the order of their routes, so the lengths give the starts and ends back
+        order = np.argsort(routes.pair_start, kind='stable')
+        source, target = np.divmod(routes.pair_keys[order], len(routes.islands))
+        start, end = routes.pair_start[order], routes.pair_end[order]
+        sections[prefix, level] = planned, pack_tables({
+            prefix + 'route_islands': {'island': np.array([island.id - 1 for island in routes.islands],
+                                                          dtype='<i4')},
+            prefix + 'route_pairs': {'source': source, 'target': target, 'distance': routes.pair_distance[order],
+                                     'length': np.where(start >= 0, end - start + 1, 0)},
+            prefix + 'waypoints': {'xy': routes.waypoints.ravel()},
+            prefix + 'waypoint_tails': {'tail': routes.tail},
+        }, level)
+    return sections[prefix, level][1]
+
+def _load_routes(tables, prefix, version, game_map, islands):
+    """Rebuild a route table from its saved tables"""
+    route_islands = [islands[i] for i in tables[prefix + 'route_islands']['island'].tolist()]
+    pairs = tables[prefix + 'route_pairs']
+    lengths = pairs['length']
+    ends = np.cumsum(lengths, dtype=np.int32) - 1
+    keys = pairs['source'].astype(np.int64) * len(route_islands) + pairs['target']
+    order = np.argsort(keys, kind='stable')
+    return RouteTable.from_saved(version, game_map, route_islands, keys[order],
+                                 pairs['distance'][order].astype(np.int32),
+                                 np.where(lengths > 0, ends - lengths + 1, -1)[order].astype(np.int32),
+                                 np.where(lengths > 0, ends, -1)[order].astype(np.int32),
+                                 tables[prefix + 'waypoints']['xy'].reshape(-1, 2),
+                                 tables[prefix + 'waypoint_tails']['tail'])
+
+def snapshot_game(player, world, current_island, current_town, day, summary=None):
+    """Copy out what a save holds, returns a snapshot for encode_snapshot.
+
+    The snapshot shares nothing the game changes later (route tables are
+    never changed once planned), so it can be encoded and written while the
+    game goes on. summary is a small dict describing the save for the load
+    menu, read_summary gets it back without loading the rest.
+    """
+    if type(world).__name__ != 'World':  # Endless oceans generate chunks the tables don't cover
+        raise TypeError(f"The compact save format only holds fixed-map worlds, not {type(world).__name__}")
+    strings = Strings()
+    fleet = world.fleet
+    registry = world.registry
+
+    # Islands in map order, so placing them again hands out the same island ids
+    islands = world.map.island_table[1:]
+    island_rows = {island: i for i, island in enumerate(islands)}
+    island_table, town_table = [], []
+    biotope_counts, biotope_names = [], []  # Island by island
+    town_rows = {}  # port -> town row
+    registered = set(registry.ports.values())
+    for i, island in enumerate(islands):
+        ruins = getattr(island, 'ruins', None) if island.has_ruins else None
+        island_table.append((strings(island.name), ISLAND_SIZES.index(island.size), strings(island.climate),
+                             island.coordinates[0], island.coordinates[1], island.is_inhabited,
+                             island.has_ruins, bool(ruins and ruins.treasure_found), island.population))
+        biotope_counts.append(len(island.biotopes))
+        biotope_names += map(strings, island.biotopes)
+        for town_name, town in island.towns.items():
+            port = town.locations.get('port')
+            town_rows[port] = len(town_table)
+            town_table.append((i, strings(town_name), town.population, 'home' in town.locations,
+                               port in registered, port.travel_cost, port.last_spawn,
+                               -1 if port.next_spawn is None else port.next_spawn, port.spawn_priority))
+    # Ports replaced by a new town keep the ships they spawned, they are saved without a town
+    for port, owned in registry.port_ships.items():
+        if port not in town_rows and owned:
+            town_rows[port] = len(town_table)
+            town_table.append((island_rows.get(port.home_island, -1), -1, 0, False, False, port.travel_cost,
+                               port.last_spawn, -1, port.spawn_priority))
+
+    # Trade ships in the registry's spawn order, then any the registry doesn't know
+    ships = registry.ships()
+    known = set(ships)
+    ships += [ship for ship in fleet.ships() if ship not in known]
+    ports = [registry.ship_ports.get(ship) for ship in ships]
+    rows = np.array([ship.row for ship in ships], dtype=np.intp)
+    ship_table = {
+        'row': rows,
+        'id': fleet.ids[rows],
+        'port': np.array([town_rows.get(port, -1) for port in ports], dtype='<i4'),
+        'docked': np.array([port is not None and ship.id in port.trade_ships for ship, port in zip(ships, ports)],
+                           dtype='u1'),
+        'x': fleet.position[rows, 0],
+        'y': fleet.position[rows, 1],
+        'last_x': fleet.last_position[rows, 0],
+        'last_y': fleet.last_position[rows, 1],
+        'home': fleet.home_id[rows],
+        'destination': fleet.destination_id[rows],
+    }
+    for name in ('leg', 'leg_end', 'speed', 'state', 'arrival_day', 'type', 'crew', 'cargo', 'selling', 'buying'):
+        ship_table[name] = getattr(fleet, name)[rows]
+
+    # Fleet islands and the destination choices cached for each (ties between equally near islands
+    # were broken when they were cached, looking them up again could reorder them)
+    count = len(fleet.islands)
+    choice_counts = fleet.choice_counts[:count].copy()
+    fleet_islands = {
+        'island': np.array([island_rows.get(island, -1) for island in fleet.islands], dtype='<i4'),
+        'choice_count': choice_counts,
+        'current': (fleet.choice_versions[:count] == world.inhabited_index.version).astype('u1'),
+    }
+    cached = np.arange(TRADE_DESTINATION_CHOICES) < choice_counts[:, None]
+    fleet_choices = {'island': fleet.choices[:count][cached]}  # Island by island
+
+    # Markets, island by island, and the stock, production and demand of each of their goods
+    economy = world.economy
+    market_table, market_rows = [], []
+    for island in islands:
+        for town_name, row in economy.towns.get(island, {}).items():
+            market_table.append((island_rows[island], strings(town_name)))
+            market_rows.append(row)
+    market_rows = np.array(market_rows, dtype=np.intp)
+    market_goods = {name: getattr(economy, name)[market_rows].ravel()
+                    for name in ('stock', 'production', 'demand')}
+
+    # Scheduled events, by kind
+    event_table, event_ships = [], []
+    for event_day, priority, sequence, callback, args in world.scheduler.queue:
+        owner = getattr(callback, '__self__', None)
+        if isinstance(owner, Port) and callback.__func__ is Port.spawn_trade_ship:
+            event_table.append((event_day, priority, sequence, SPAWN_EVENT, town_rows.get(owner, -1), 0, 0))
+        elif owner is fleet and callback.__func__ is Fleet.send_home:
+            rows, ids = args
+            event_table.append((event_day, priority, sequence, SEND_HOME_EVENT, -1, len(event_ships), len(rows)))
+            event_ships.extend(zip(rows.tolist(), ids.tolist()))
+        else:
+            raise TypeError(f"Don't know how to save the scheduled event {callback!r}")
+
+    tables = {
+        'islands': _table('islands', island_table),
+        'biotopes': {'island': np.repeat(np.arange(len(islands), dtype='<i4'), biotope_counts),
+                     'name': np.array(biotope_names, dtype='<i4')},
+        'towns': _table('towns', town_table),
+        'ships': ship_table,
+        'free_rows': _table('free_rows', [(row,) for row in fleet.free_rows]),
+        'inhabited': _table('inhabited', [(island_rows[island],) for island in world.inhabited_islands.values()]),
+        'fleet_islands': fleet_islands,
+        'fleet_choices': fleet_choices,
+        'waiting': _table('waiting', [(town_rows.get(port, -1),) for _, _, port in registry.waiting]),
+        'events': _table('events', event_table),
+        'event_ships': _table('event_ships', event_ships),
+        'monsters': {'x': world.sea_monsters.positions[:, 0].copy(), 'y': world.sea_monsters.positions[:, 1].copy()},
+        'inventory': _table('inventory', [(strings(item), amount) for item, amount in player.inventory.items()]),
+        'markets': _table('markets', market_table),
+        'market_goods': market_goods,
+    }
+
+    route_tables = []  # (route table, table prefix)
+    routes = world.routes
+    if routes is not None:
+        route_tables.append((routes, ''))
+    fleet_routes = None if fleet.routes is None else 'world' if fleet.routes is routes else 'own'
+    if fleet_routes == 'own':
+        route_tables.append((fleet.routes, 'fleet_'))
+
+    player_state = {key: value for key, value in player.__dict__.items()
+                    if key not in ('inventory', 'nemesis', 'ship')}
+    meta = {
+        'summary': summary,
+        'day': day,
+        'current_island': island_rows.get(current_island, -1),
+        'current_town': current_town,
+        'player': _plain(player_state),
+        'nemesis': _plain(player.nemesis.__dict__),
+        'ship': _plain(player.ship.__dict__) if player.ship else None,
+        'world': {
+            'map_size': world.map.size,
+            'map_version': world.map.version,
+            'max_trade_ships': world.max_trade_ships,
+            'routes_version': routes.version if routes is not None else None,
+        },
+        'scheduler': {'day': world.scheduler.day, 'sequence': world.scheduler.sequence},
+        'registry': {'registered': registry.registered},
+        'fleet': {
+            'size': fleet.size,
+            'next_id': fleet.next_id,
+            'rng': _rng_state(fleet.rng),
+            'routes': fleet_routes,
+            'routes_version': fleet.routes.version if fleet.routes is not None else None,
+        },
+        'monsters': {'rng': _rng_state(world.sea_monsters.rng)},
+        'economy': {'rng': _rng_state(economy.rng)},
+        'strings': strings.values,
+    }
+    return meta, tables, route_tables
+
+def encode_snapshot(snapshot, level=TABLE_COMPRESSION):
+    """Pack a snapshot into the compact save format and return the bytes, tables compressed at level"""
+    meta, tables, route_tables = snapshot
+    sections = [pack_tables(tables, level)] + [_route_section(routes, prefix, level)
+                                               for routes, prefix in route_tables]
+    return encode(meta, sections)
+
+def dump_game(player, world, current_island, current_town, day, level=TABLE_COMPRESSION):
+    """Pack a game into the compact save format and return the bytes"""
+    return encode_snapshot(snapshot_game(player, world, current_island, current_town, day), level)
+
+def load_game_data(data):
+    """Build a game from the bytes of a compact save, returns the same dict pickled saves held"""
+    from crystalquest.game import World, Map, Island, Town, Character, Nemesis  # game.py imports this module
+
+    version, meta, tables = decode(data)
+    if version > FORMAT_VERSION:
+        raise ValueError(f"Save format {version} is newer than this game understands ({FORMAT_VERSION})")
+    while version < FORMAT_VERSION:
+        if version not in MIGRATIONS:
+            raise ValueError(f"Save format {version} can no longer be loaded")
+        meta, tables = MIGRATIONS[version](meta, tables)
+        version += 1
+    for name, columns in SCHEMA.items():
+        if name in tables:
+            # Columns already stored in their own type are used as they are, read-only over the save
+            tables[name] = {column: tables[name][column].astype(dtype, copy=False) for column, dtype in columns}
+    strings = meta['strings']
+    world_meta = meta['world']
+
+    # Islands, in map order so they get the same ids
+    columns = tables['islands']
+    count = len(columns['name'])
+    # Biotopes are saved island by island
+    biotope_names = [strings[name] for name in tables['biotopes']['name'].tolist()]
+    biotope_ends = np.cumsum(np.bincount(tables['biotopes']['island'], minlength=count)).tolist()
+    biotopes = [biotope_names[start:end] for start, end in zip([0] + biotope_ends, biotope_ends)]
+    islands = [Island.from_saved(strings[name], ISLAND_SIZES[size], strings[climate], (x, y), island_biotopes,
+                                 bool(inhabited), bool(has_ruins), bool(treasure_found), population)
+               for (name, size, climate, x, y, inhabited, has_ruins, treasure_found, population), island_biotopes
+               in zip(zip(*(columns[column].tolist() for column, _ in SCHEMA['islands'])), biotopes)]
+    game_map = Map.from_saved(world_meta['map_size'], world_meta['map_version'], islands)
+    # Inhabited islands in the order they were settled, nearest-island ties resolve the same way
+    inhabited = [islands[island_row] for island_row in tables['inhabited']['island'].tolist()]
+    world = World.from_saved(game_map, inhabited, world_meta['max_trade_ships'])
+
+    # Towns and their ports
+    ports = {}  # Registered ports by (island, town name)
+    towns = []  # (island, town name, port) by town row
+    columns = tables['towns']
+    for (island_row, name, population, home, registered, travel_cost, last_spawn, next_spawn,
+         spawn_priority) in zip(*(columns[column].tolist() for column, _ in SCHEMA['towns'])):
+        island = islands[island_row] if island_row >= 0 else None
+        port = Port.from_saved(island, travel_cost, last_spawn, None if next_spawn < 0 else next_spawn,
+                               spawn_priority)
+        if name < 0:
+            towns.append((island, None, port))  # A replaced port, only its ships are left
+            continue
+        town = Town.from_saved(strings[name], population, port, home)
+        island.towns[town.name] = town
+        if registered:
+            ports[(island, town.name)] = port
+        towns.append((island, town.name, port))
+
+    # Sea lanes
+    world.routes = None
+    if 'route_islands' in tables:
+        world.routes = _load_routes(tables, '', world_meta['routes_version'], game_map, islands)
+
+    # The fleet, every ship back in its own row
+    fleet_meta = meta['fleet']
+    fleet_routes = world.routes
+    if fleet_meta['routes'] == 'own':
+        fleet_routes = _load_routes(tables, 'fleet_', fleet_meta['routes_version'], game_map, islands)
+    elif fleet_meta['routes'] is None:
+        fleet_routes = None
+    columns = tables['ships']
+    rows = columns['row'].astype(np.intp)
+    ship_columns = {
+        'position': np.stack([columns['x'], columns['y']], axis=1),
+        'last_position': np.stack([columns['last_x'], columns['last_y']], axis=1),
+        'home_id': columns['home'],
+        'destination_id': columns['destination'],
+        'ids': columns['id'],
+    }
+    for name in ('leg', 'leg_end', 'speed', 'state', 'arrival_day', 'type', 'crew', 'cargo', 'selling', 'buying'):
+        ship_columns[name] = columns[name]
+    fleet_islands = tables['fleet_islands']
+    fleet = Fleet.from_columns(
+        world, _make_rng(fleet_meta['rng']), fleet_meta['size'], fleet_meta['next_id'],
+        tables['free_rows']['row'].tolist(), [islands[island_row] for island_row in fleet_islands['island'].tolist()],
+        (fleet_islands['choice_count'], fleet_islands['current'] > 0, tables['fleet_choices']['island']),
+        fleet_routes, rows, ship_columns)
+    world.fleet = fleet
+    ship_ports = {}  # Ship -> port that spawned it, in spawn order
+    for row, ship_id, town, docked in zip(rows.tolist(), columns['id'].tolist(), columns['port'].tolist(),
+                                          columns['docked'].tolist()):
+        ship = TradeShip.view(fleet, row, ship_id)
+        if town < 0:
+            continue
+        port = towns[town][2]
+        ship_ports[ship] = port
+        if docked:
+            port.trade_ships[ship_id] = ship
+    waiting = [towns[town] for town in tables['waiting']['town'].tolist() if town >= 0]
+    world.registry = Registry.from_saved(world, ports, ship_ports, waiting, meta['registry']['registered'])
+
+    # Scheduled events
+    columns = tables['events']
+    event_ships = tables['event_ships']
+    queue = []
+    for event_day, priority, sequence, kind, town, first, count in zip(
+            *(columns[column].tolist() for column, _ in SCHEMA['events'])):
+        if kind == SPAWN_EVENT:
+            if town < 0:
+                continue
+            island, town_name, port = towns[town]
+            queue.append((event_day, priority, sequence, port.spawn_trade_ship, (island, town_name, world)))
+        elif kind == SEND_HOME_EVENT:
+            queue.append((event_day, priority, sequence, fleet.send_home,
+                          (event_ships['row'][first:first + count].astype(np.intp),
+                           event_ships['id'][first:first + count].astype(np.int64))))
+    world.scheduler = Scheduler.from_saved(meta['scheduler']['day'], meta['scheduler']['sequence'], queue)
+
+    # Markets, town by town in the rows they were saved in
+    if meta['economy'] is None:
+        economy = Economy()
+        for island in world.inhabited_islands.values():
+            economy.add_island(island)
+    else:
+        columns = tables['markets']
+        market_towns = {}  # island -> {town name: row}
+        for row, (island_row, name) in enumerate(zip(columns['island'].tolist(), columns['name'].tolist())):
+            market_towns.setdefault(islands[island_row], {})[strings[name]] = row
+        shape = (len(columns['name']), len(GOODS))
+        goods = tables['market_goods']
+        economy = Economy.from_tables(_make_rng(meta['economy']['rng']), market_towns, goods['stock'].reshape(shape),
+                                      goods['production'].reshape(shape), goods['demand'].reshape(shape))
+    world.economy = economy
+
+    # Sea monsters
+    positions = np.stack([tables['monsters']['x'], tables['monsters']['y']], axis=1).astype(np.int64)
+    world.sea_monsters = SeaMonsters.from_saved(_make_rng(meta['monsters']['rng']), positions)
+
+    # The player
+    inventory = {strings[item]: amount for item, amount in
+                 zip(tables['inventory']['item'].tolist(), tables['inventory']['amount'].tolist())}
+    player = Character.from_saved(meta['player'], inventory, Nemesis.from_saved(meta['nemesis']),
+                                  None if meta['ship'] is None else Ship.from_saved(meta['ship']))
+
+    return {
+        'player': player,
+        'world': world,
+        'current_island': islands[meta['current_island']] if meta['current_island'] >= 0 else None,
+        'current_town': meta['current_town'],
+        'day': meta['day'],
+    }
+
+def _best_time(function, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the compact save format with pickling the whole game")
+    parser.add_argument('--islands', type=int, default=40, help="islands per world")
+    parser.add_argument('--size', type=int, default=80, help="map width and height")
+    parser.add_argument('--days', type=int, default=200, help="days to simulate before saving")
+    parser.add_argument('--seed', type=int, default=1, help="random seed")
+    parser.add_argument('--repeat', type=int, default=5, help="best of this many runs")
+    parser.add_argument('--level', type=int, default=TABLE_COMPRESSION,
+                        help="zlib level of the table sections, 0 stores them as they are")
+    args = parser.parse_args()
+
+    from crystalquest.game import World, Character, Nemesis
+
+    random.seed(args.seed)
+    world = World(num_islands=args.islands, map_size=args.size)
+    world.quiet = True
+    world.simulate(args.days)
+    world.route_table()
+    player = Character.from_saved(dict(species='Otter', name='Bench', island=None, gold=1000, crew=[],
+                                       weapon_stats={}, stats={'Health': 7}),
+                                  {'Spyglass': 1, 'Silent Seas Map': 1}, Nemesis())
+    current_island = next(iter(world.inhabited_islands.values()))
+    game = {'player': player, 'world': world, 'current_island': current_island,
+            'current_town': None, 'day': args.days}
+
+    print(f"{len(world.islands)} islands, {world.fleet.count} trade ships, day {args.days}")
+    def first_save():
+        _route_sections.clear()
+        return dump_game(player, world, current_island, None, args.days, args.level)
+
+    pickle_write, pickled = _best_time(lambda: pickle.dumps(game), args.repeat)
+    pickle_read, _ = _best_time(lambda: pickle.loads(pickled), args.repeat)
+    first_write, packed = _best_time(first_save, args.repeat)
+    compact_write, packed = _best_time(
+        lambda: dump_game(player, world, current_island, None, args.days, args.level), args.repeat)
+    compact_read, _ = _best_time(lambda: load_game_data(packed), args.repeat)
+    print(f"pickle:  {len(pickled):>9} bytes, write {pickle_write * 1000:7.2f}ms, read {pickle_read * 1000:7.2f}ms")
+    print(f"compact: {len(packed):>9} bytes, write {compact_write * 1000:7.2f}ms "
+          f"({first_write * 1000:.2f}ms packing the routes), read {compact_read * 1000:7.2f}ms")
+    print(f"{len(pickled) / len(packed):.1f}x smaller, writes {pickle_write / compact_write:.1f}x "
+          f"({pickle_write / first_write:.1f}x the first time) and reads {pickle_read / compact_read:.1f}x as fast")
+
+    # What a save costs the game: the file written out to disk and read back in
+    with tempfile.TemporaryDirectory() as folder:
+        path = os.path.join(folder, 'save')
+        def write(data):
+            with open(path, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+        def read():
+            with open(path, 'rb') as f:
+                return f.read()
+        pickle_write, _ = _best_time(lambda: write(pickle.dumps(game)), args.repeat)
+        pickle_read, _ = _best_time(lambda: pickle.loads(read()), args.repeat)
+        compact_write, _ = _best_time(
+            lambda: write(dump_game(player, world, current_island, None, args.days, args.level)), args.repeat)
+        compact_read, _ = _best_time(lambda: load_game_data(read()), args.repeat)
+    print(f"on disk: pickle write {pickle_write * 1000:.2f}ms, read {pickle_read * 1000:.2f}ms; "
+          f"compact write {compact_write * 1000:.2f}ms, read {compact_read * 1000:.2f}ms")
+
+if __name__ == "__main__":
+    main()
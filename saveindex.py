@@ -0,0 +1,97 @@
+import json
+import os
+import struct
+import threading
+import zlib
+from crystalquest.autosave import SAVE_FOLDER, save_time, write_atomic
+from crystalquest.savefile import read_summary
+from crystalquest.journal import read_journal_summary
+
+INDEX_FILE = 'index.json'
+INDEX_VERSION = 1
+SAVE_EXTENSIONS = ('.sav', '.jnl', '.dat')
+
+# Saves are written from the game thread and the autosave thread alike
+_lock = threading.Lock()
+
+class SaveIndex:
+    """Sidecar index of the saves in a folder, so listing them never loads one.
+
+    Every save writes a summary (day, player, location, gold, world size,
+    format) into index.json next to it, along with its size in bytes. Saves
+    the index doesn't know yet (written before it existed, or by a game that
+    crashed before updating it) are added when the folder is listed: compact
+    saves and journals carry the same summary in their metadata section,
+    which is read on its own; pickled saves are listed with what their name
+    tells.
+    """
+
+    def __init__(self, folder=SAVE_FOLDER):
+        self.folder = folder
+        self.path = os.path.join(folder, INDEX_FILE)
+
+    def _read(self):
+        try:
+            with open(self.path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if index.get('version') != INDEX_VERSION:
+            return {}  # Rebuilt from the saves themselves
+        return index.get('saves', {})
+
+    def _write(self, saves):
+        data = json.dumps({'version': INDEX_VERSION, 'saves': saves}, indent=1, sort_keys=True)
+        write_atomic(self.path, data.encode())
+
+    def record(self, path, summary):
+        """Add a newly written save to the index"""
+        name = os.path.basename(path)
+        entry = dict(summary or {}, bytes=os.path.getsize(path))
+        with _lock:
+            saves = self._read()
+            saves[name] = entry
+            self._write(saves)
+
+    def forget(self, names):
+        """Take deleted saves out of the index"""
+        with _lock:
+            saves = self._read()
+            if any(saves.pop(name, None) is not None for name in list(names)):
+                self._write(saves)
+
+    def _summarize(self, name):
+        """Build the index entry of a save the index doesn't know"""
+        path = os.path.join(self.folder, name)
+        entry = {'bytes': os.path.getsize(path)}
+        if name.endswith(('.sav', '.jnl')):
+            compact = name.endswith('.sav')
+            try:
+                version, summary = (read_summary if compact else read_journal_summary)(path)
+            except (OSError, ValueError, struct.error, zlib.error) as e:  # Truncated or corrupt
+                return dict(entry, error=str(e))
+            entry.update(summary or {}, format=f"{'compact' if compact else 'journal'} v{version}")
+        else:
+            entry['format'] = 'pickle'
+        return entry
+
+    def entries(self):
+        """Return (file name, summary) of every save in the folder, newest first"""
+        if not os.path.isdir(self.folder):
+            return []
+        names = [name for name in os.listdir(self.folder)
+                 if name.endswith(SAVE_EXTENSIONS) and save_time(name) is not None]
+        with _lock:
+            saves = self._read()
+            changed = False
+            for name in names:
+                if name not in saves:
+                    saves[name] = self._summarize(name)
+                    changed = True
+            for name in set(saves) - set(names):
+                del saves[name]  # Deleted by hand
+                changed = True
+            if changed:
+                self._write(saves)
+        names.sort(key=lambda name: (save_time(name), name), reverse=True)
+        return [(name, saves[name]) for name in names]
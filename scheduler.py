@@ -0,0 +1,51 @@
+import heapq
+
+class Scheduler:
+    """Priority queue of game events keyed on the day they are due.
+
+    An event is a callback and its arguments, called with the day it was due
+    first: ports schedule their next trade ship spawn, ships their departure
+    from a destination, and anything else that happens after a number of days
+    (crop growth, timers) can do the same. Advancing time pops the due events
+    in order, so days on which nothing is due cost nothing. Events due the
+    same day run by priority (lowest first), then in the order they were
+    scheduled.
+    """
+
+    def __init__(self, day=0):
+        self.day = day  # Day the events have been run up to
+        self.queue = []  # Heap of (day, priority, sequence, callback, args)
+        self.sequence = 0  # Keeps events of the same day and priority in the order they were scheduled
+
+    @classmethod
+    def from_saved(cls, day, sequence, events):
+        """Rebuild a saved scheduler from its pending (day, priority, sequence, callback, args) events"""
+        scheduler = cls(day)
+        scheduler.queue = list(events)
+        heapq.heapify(scheduler.queue)
+        scheduler.sequence = sequence
+        return scheduler
+
+    def __len__(self):
+        return len(self.queue)
+
+    def schedule(self, day, callback, *args, priority=0):
+        """Call callback(day, *args) once the world reaches day"""
+        heapq.heappush(self.queue, (day, priority, self.sequence, callback, args))
+        self.sequence += 1
+
+    def schedule_in(self, days, callback, *args, priority=0):
+        """Call callback a number of days from now"""
+        self.schedule(self.day + days, callback, *args, priority=priority)
+
+    def next_day(self):
+        """Return the day of the earliest pending event, or None"""
+        return self.queue[0][0] if self.queue else None
+
+    def run_until(self, day):
+        """Run every event due up to and including day, events they schedule included"""
+        while self.queue and self.queue[0][0] <= day:
+            due, _, _, callback, args = heapq.heappop(self.queue)
+            self.day = max(self.day, due)
+            callback(due, *args)
+        self.day = max(self.day, day)
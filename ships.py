@@ -1,5 +1,6 @@
-import random
-from crystalquest.items import ship_types, trade_goods
+import numpy as np
+from crystalquest.items import ship_types
+from crystalquest.fleet import SHIP_TYPES, GOODS, RETURNING
 
 class Ship:
     def __init__(self, name, price, crew_capacity, speed):
@@ -15,6 +16,20 @@ class Ship:
         self.hull_max = ship_types[name]['hull_max']
         self.hull_current = self.hull_max
 
+    @classmethod
+    def from_saved(cls, state):
+        """Rebuild a saved ship from its attributes, squares saved as lists become tuples again"""
+        ship = cls.__new__(cls)
+        ship.__dict__.update(state)
+        for name in ('position', 'destination'):
+            if isinstance(getattr(ship, name), list):
+                setattr(ship, name, tuple(getattr(ship, name)))
+        return ship
+
+    @property
+    def cargo_capacity(self):
+        return ship_types[self.name]['cargo']
+
     def is_mobile(self):
         return self.hull_current >= 10
 
@@ -37,77 +52,90 @@ class Ship:
         return True
 
 class TradeShip:
+    """A trade ship, a thin view over its row in the world's fleet arrays"""
+
     def __init__(self, home_island, world):
-        # Ship type
-        ship_type = random.choice(list(ship_types.keys()))
-        stats = ship_types[ship_type]
-        
-        self.type = ship_type
-        self.crew = random.randint(5, stats['crew_max'])
-        self.speed = stats['speed']
-        self.cargo_capacity = stats['cargo']
-        
-        # Location and movement
-        self.home_island = home_island
-        self.current_position = home_island.coordinates
-        self.destination = None
-        self.days_at_destination = 0
-        self.returning_home = False
-        
-        # Trade goods
-        self.selling = random.choice(list(trade_goods.keys()))
-        self.buying = random.choice([g for g in trade_goods.keys() if g != self.selling])
-        self.sell_price = random.randint(50, 200)
-        self.buy_price = random.randint(50, 200)
-        
-        # Set random destination (not home island)
-        self.set_new_destination(world)
-        
-        self.last_position = self.current_position
+        self.fleet = world.fleet
+        self.row = self.fleet.add(self, home_island)
+
+    @classmethod
+    def view(cls, fleet, row, ship_id):
+        """Wrap a fleet row that already holds a ship, like the ships of a loaded game"""
+        ship = cls.__new__(cls)
+        ship.fleet = fleet
+        ship.row = row
+        ship.id = ship_id
+        fleet.views[row] = ship
+        return ship
+
+    @property
+    def type(self):
+        return SHIP_TYPES[self.fleet.type[self.row]]
+
+    @property
+    def crew(self):
+        return int(self.fleet.crew[self.row])
+
+    @property
+    def speed(self):
+        return int(self.fleet.speed[self.row])
+
+    @property
+    def cargo_capacity(self):
+        return int(self.fleet.cargo[self.row])
 
-    def set_new_destination(self, world):
-        """Set a new random destination for the trade ship"""
-        available_islands = [island for island in world.islands.values() 
-                           if island.is_inhabited and island != self.home_island]
-        if available_islands:
-            self.destination = random.choice(available_islands)
-            self.returning_home = False
-            self.days_at_destination = 0
+    @property
+    def home_island(self):
+        return self.fleet.islands[self.fleet.home_id[self.row]]
+
+    @property
+    def destination(self):
+        destination_id = self.fleet.destination_id[self.row]
+        return None if destination_id < 0 else self.fleet.islands[destination_id]
+
+    @property
+    def current_position(self):
+        x, y = self.fleet.position[self.row].tolist()
+        return (x, y)
+
+    @property
+    def last_position(self):
+        x, y = self.fleet.last_position[self.row].tolist()
+        return (x, y)
+
+    @property
+    def returning_home(self):
+        return self.fleet.state[self.row] == RETURNING
+
+    @property
+    def days_at_destination(self):
+        return self.fleet.days_at_destination(self.row)
+
+    @property
+    def selling(self):
+        return GOODS[self.fleet.selling[self.row]]
+
+    @property
+    def buying(self):
+        return GOODS[self.fleet.buying[self.row]]
+
+    def set_new_destination(self, world=None):
+        """Set a new random destination among the inhabited islands nearest to home"""
+        self.fleet.set_new_destinations(np.array([self.row]))
+
+    def days_to_arrival(self):
+        """Days until the ship reaches its destination, or home if it is heading there next"""
+        return self.fleet.days_to_arrival(self.row)
 
     def get_position(self):
         """Return current position as tuple for map display"""
-        return tuple(self.current_position)
+        return self.current_position
 
     def move(self):
-        if not self.destination and not self.returning_home:
-            self.set_new_destination(self.home_island.world)  # Need to pass world reference
-            return
-            
-        self.last_position = self.current_position
-        
-        target = (self.home_island.coordinates if self.returning_home 
-                 else self.destination.coordinates)
-        
-        # Calculate direction vector
-        dx = target[0] - self.current_position[0]
-        dy = target[1] - self.current_position[1]
-        distance = (dx**2 + dy**2)**0.5
-        
-        if distance <= self.speed:
-            # Reached destination
-            self.current_position = target
-            if self.returning_home and target == self.home_island.coordinates:
-                # Reset for next journey
-                self.set_new_destination(self.home_island.world)
-            elif not self.returning_home:
-                self.days_at_destination += 1
-                if self.days_at_destination >= 3:
-                    self.returning_home = True
-        else:
-            # Move toward destination
-            move_x = int(dx / distance * self.speed)
-            move_y = int(dy / distance * self.speed)
-            self.current_position = (
-                self.current_position[0] + move_x,
-                self.current_position[1] + move_y
-            ) 
\ No newline at end of file
+        """Move just this ship by one day, the main loop moves the whole fleet with Fleet.step"""
+        self.fleet.step([self.row])
+
+    def remove(self):
+        """Take this ship out of the fleet"""
+        if self.fleet.views[self.row] is self:  # The row may already belong to a newer ship
+            self.fleet.remove(self.row)
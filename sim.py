@@ -0,0 +1,65 @@
+import argparse
+import math
+import random
+import time
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the world without the game to soak-test and profile it")
+    parser.add_argument('--days', type=int, default=1000, help="days to simulate")
+    parser.add_argument('--seed', type=int, default=None, help="random seed (default: random)")
+    parser.add_argument('--islands', type=int, default=5, help="islands per world")
+    parser.add_argument('--size', type=int, default=20, help="map width and height")
+    parser.add_argument('--chunked', action='store_true', help="simulate an endless chunked ocean instead")
+    parser.add_argument('--report', type=int, default=0, help="print progress every this many days")
+    parser.add_argument('--frames', type=int, default=0, help="draw the map every this many days")
+    parser.add_argument('--headless', action='store_true', help="draw the frames without showing them")
+    parser.add_argument('--record', metavar='PATH', help="append the frames drawn to a file")
+    args = parser.parse_args()
+
+    from crystalquest.colors import FRAMES, NullBackend, RecordingBackend
+    from crystalquest.game import World
+    from crystalquest.ocean import ChunkedWorld
+    from crystalquest.spatial import PositionIndex
+
+    # Frames go to the terminal unless they are dropped or recorded, the count tells what drawing cost
+    if args.record:
+        FRAMES.set_backend(RecordingBackend(args.record, None if args.headless else FRAMES.backend))
+    elif args.headless:
+        FRAMES.set_backend(NullBackend())
+
+    seed = random.randrange(2**32) if args.seed is None else args.seed
+    random.seed(seed)
+    start = time.perf_counter()
+    if args.chunked:
+        world = ChunkedWorld(seed=seed)
+    else:
+        world = World(num_islands=args.islands, map_size=args.size)
+    world.quiet = True
+    print(f"Generated world with seed {seed} in {time.perf_counter() - start:.2f}s "
+          f"({len(world.islands)} islands, {len(world.inhabited_islands)} inhabited)")
+
+    # An endless ocean keeps the sea around a home island loaded, as it does for a player
+    pinned_islands = [next(iter(world.inhabited_islands.values()))] if args.chunked else ()
+    step = math.gcd(args.report, args.frames) or args.days
+    day = 1
+    sunk = 0
+    start = time.perf_counter()
+    while day <= args.days:
+        days = min(step, args.days - day + 1)
+        sunk += world.simulate(days, start_day=day, pinned_islands=pinned_islands)
+        day += days
+        if args.frames and (day - 1) % args.frames == 0:
+            world.map.display(None, PositionIndex(world.registry.ships()), world.sea_monsters, day - 1)
+        if args.report and ((day - 1) % args.report == 0 or day > args.days):
+            elapsed = time.perf_counter() - start
+            print(f"Day {day - 1}: {world.fleet.count} ships afloat, {sunk} sunk, "
+                  f"{(day - 1) / elapsed:.0f} days/s")
+    elapsed = time.perf_counter() - start
+
+    print(f"Simulated {args.days} days in {elapsed:.2f}s ({args.days / elapsed:.0f} days/s)")
+    print(f"Ships afloat: {world.fleet.count}, sunk by sea monsters: {sunk}")
+    if args.frames:
+        print(f"Frames drawn: {FRAMES.backend.frames}, {FRAMES.backend.bytes} characters")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+import heapq
+
+class IslandIndex:
+    """Grid bucket index over island coordinates for nearest and radius queries.
+
+    Islands are hashed into square buckets of bucket_size squares. Nearest
+    neighbour queries walk rings of buckets outward from the query position and
+    stop as soon as no unvisited bucket can hold anything closer.
+    """
+
+    version = 0  # Indexes saved before versioning start at 0
+
+    def __init__(self, bucket_size=16):
+        self.bucket_size = bucket_size
+        self.buckets = {}  # (bx, by) -> list of islands
+        self.count = 0
+        self.bounds = None  # (min_bx, min_by, max_bx, max_by) of buckets ever used
+        self.version = 0  # Bumped whenever an island is added or removed
+
+    def __len__(self):
+        return self.count
+
+    def _bucket(self, position):
+        return (position[0] // self.bucket_size, position[1] // self.bucket_size)
+
+    def add(self, island):
+        key = self._bucket(island.coordinates)
+        self.buckets.setdefault(key, []).append(island)
+        self.count += 1
+        self.version += 1
+        if self.bounds is None:
+            self.bounds = (key[0], key[1], key[0], key[1])
+        else:
+            min_bx, min_by, max_bx, max_by = self.bounds
+            self.bounds = (min(min_bx, key[0]), min(min_by, key[1]),
+                           max(max_bx, key[0]), max(max_by, key[1]))
+
+    def extend(self, islands):
+        """Add many islands at once, like add does one by one"""
+        buckets = self.buckets
+        size = self.bucket_size
+        keys = []
+        for island in islands:
+            x, y = island.coordinates
+            key = (x // size, y // size)
+            bucket = buckets.get(key)
+            if bucket is None:
+                buckets[key] = [island]
+                keys.append(key)
+            else:
+                bucket.append(island)
+        self.count += len(islands)
+        self.version += len(islands)
+        if keys:
+            if self.bounds is not None:
+                keys.append(self.bounds[:2])
+                keys.append(self.bounds[2:])
+            xs = [key[0] for key in keys]
+            ys = [key[1] for key in keys]
+            self.bounds = (min(xs), min(ys), max(xs), max(ys))
+
+    def remove(self, island):
+        key = self._bucket(island.coordinates)
+        bucket = self.buckets.get(key)
+        if bucket and island in bucket:
+            bucket.remove(island)
+            self.count -= 1
+            self.version += 1
+            if not bucket:
+                del self.buckets[key]
+
+    def _distance(self, position, island):
+        dx = island.coordinates[0] - position[0]
+        dy = island.coordinates[1] - position[1]
+        return (dx**2 + dy**2)**0.5
+
+    def k_nearest(self, position, k, exclude=None):
+        """Return up to k islands closest to position, nearest first"""
+        if not self.count or k <= 0:
+            return []
+        center = self._bucket(position)
+        min_bx, min_by, max_bx, max_by = self.bounds
+        # Rings beyond this one can't contain any islands
+        max_ring = max(abs(center[0] - min_bx), abs(center[0] - max_bx),
+                       abs(center[1] - min_by), abs(center[1] - max_by))
+
+        best = []  # Max-heap of (-distance, tiebreak, island) holding the k closest so far
+        visited = 0  # Equally near islands rank in the order they are found, the same every run
+        ring = 0
+        while ring <= max_ring:
+            for key in self._ring(center, ring):
+                for island in self.buckets.get(key, ()):
+                    if island is exclude:
+                        continue
+                    visited += 1
+                    entry = (-self._distance(position, island), -visited, island)
+                    if len(best) < k:
+                        heapq.heappush(best, entry)
+                    elif entry > best[0]:
+                        heapq.heapreplace(best, entry)
+            # Anything in the next ring is at least this far away
+            if len(best) == k and -best[0][0] <= ring * self.bucket_size:
+                break
+            ring += 1
+        return [island for _, _, island in sorted(best, reverse=True)]
+
+    def nearest(self, position, exclude=None):
+        """Return the island closest to position, or None if the index is empty"""
+        found = self.k_nearest(position, 1, exclude)
+        return found[0] if found else None
+
+    def within_radius(self, position, radius):
+        """Return every island within radius of position"""
+        x0, y0 = self._bucket((position[0] - radius, position[1] - radius))
+        x1, y1 = self._bucket((position[0] + radius, position[1] + radius))
+        found = []
+        for bx in range(x0, x1 + 1):
+            for by in range(y0, y1 + 1):
+                for island in self.buckets.get((bx, by), ()):
+                    if self._distance(position, island) <= radius:
+                        found.append(island)
+        return found
+
+    def _ring(self, center, ring):
+        """Yield the bucket keys at exactly this Chebyshev distance from center"""
+        cx, cy = center
+        if ring == 0:
+            yield center
+            return
+        for bx in range(cx - ring, cx + ring + 1):
+            yield (bx, cy - ring)
+            yield (bx, cy + ring)
+        for by in range(cy - ring + 1, cy + ring):
+            yield (cx - ring, by)
+            yield (cx + ring, by)
+
+class PositionIndex:
+    """Position -> entities lookup, rebuilt once per tick from the moving entities"""
+
+    def __init__(self, entities=(), position=lambda entity: entity.get_position()):
+        self.position = position
+        self.cells = {}  # (x, y) -> list of entities, in the order they were added
+        for entity in entities:
+            self.add(entity)
+
+    def __len__(self):
+        return len(self.cells)
+
+    def add(self, entity):
+        self.cells.setdefault(tuple(self.position(entity)), []).append(entity)
+
+    def at(self, position):
+        """Return the entities at a position"""
+        return self.cells.get(tuple(position), [])
+
+    def items(self):
+        return self.cells.items()
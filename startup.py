@@ -0,0 +1,53 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Seconds from launching the game to its first question, the benchmark fails above it
+STARTUP_BUDGET = 0.5
+FIRST_PROMPT = b"What would you like to do?"
+
+def time_to_first_prompt(root):
+    """Launch the game from root and return the seconds until it asks its first question"""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-m', 'crystalquest.game'], cwd=root,
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+    try:
+        output = b''
+        while FIRST_PROMPT not in output:
+            chunk = process.stdout.read1(4096)
+            if not chunk:
+                raise RuntimeError("The game exited before asking anything")
+            output += chunk
+        return time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+def time_imports(root):
+    """Return the seconds importing the game takes in a fresh interpreter"""
+    script = ("import time; start = time.perf_counter(); import crystalquest.game; "
+              "print(time.perf_counter() - start)")
+    return float(subprocess.check_output([sys.executable, '-c', script], cwd=root))
+
+def main():
+    parser = argparse.ArgumentParser(description="Time how long the game takes to ask its first question")
+    parser.add_argument('--repeat', type=int, default=5, help="launches to time")
+    parser.add_argument('--budget', type=float, default=STARTUP_BUDGET, help="seconds allowed to the first prompt")
+    args = parser.parse_args()
+
+    # The game finds its art relative to the folder holding the package
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    time_to_first_prompt(root)  # Warm the disk caches and the art cache
+    times = [time_to_first_prompt(root) for _ in range(args.repeat)]
+    imports = min(time_imports(root) for _ in range(args.repeat))
+    median = statistics.median(times)
+    print(f"First prompt after {median * 1000:.0f}ms (best {min(times) * 1000:.0f}ms) "
+          f"of which {imports * 1000:.0f}ms importing the game, budget {args.budget * 1000:.0f}ms")
+    if median > args.budget:
+        sys.exit(f"Startup is over budget by {(median - args.budget) * 1000:.0f}ms")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import numpy as np
+from crystalquest.economy import Economy, GOODS, BASE_PRICES, COVER_DAYS, ELASTICITY, MIN_PRICE, MAX_PRICE
+
+def make_economy(towns=3, seed=0):
+    """An economy of a few towns, on stand-in islands (it only uses them as keys)"""
+    economy = Economy(capacity=2, rng=np.random.default_rng(seed))
+    islands = [object() for _ in range(towns)]
+    for island in islands:
+        economy.add_town(island, 'Town', 500)
+    return economy, islands
+
+def expected_prices(stock, demand):
+    return np.clip(((demand + 1) / (stock + 1)) ** ELASTICITY, MIN_PRICE, MAX_PRICE) * BASE_PRICES
+
+def test_prices_follow_scarcity():
+    economy, islands = make_economy()
+    n = economy.size
+    assert n == 3 and economy.capacity == 4
+    assert np.allclose(economy.price[:n], expected_prices(economy.stock[:n], economy.demand[:n]))
+
+    market = economy.market(islands[0], 'Town')
+    good = GOODS[0]
+    before = market.price(good)
+    market.trade(good, market.stock(good))  # Buy the town out
+    assert market.stock(good) == 0
+    assert market.price(good) > before
+    assert market.price(good) == max(1, round(min((economy.demand[0, 0] + 1) ** ELASTICITY, MAX_PRICE)
+                                              * BASE_PRICES[0]))
+
+def test_prices_stay_within_bounds():
+    economy, islands = make_economy()
+    economy.stock[0] = 0
+    economy.stock[1] = 1e9
+    economy._update_prices(slice(0, 2))
+    assert np.allclose(economy.price[0], MAX_PRICE * BASE_PRICES)
+    assert np.allclose(economy.price[1], MIN_PRICE * BASE_PRICES)
+
+def test_step_in_one_go_matches_day_by_day():
+    stepped, _ = make_economy(seed=1)
+    jumped, _ = make_economy(seed=1)
+    stepped.stock[:3] *= 0.1  # Away from where production and use balance out
+    jumped.stock[:3] *= 0.1
+    for _ in range(30):
+        stepped.step()
+    jumped.step(30)
+    assert np.allclose(stepped.stock[:3], jumped.stock[:3])
+    assert np.allclose(stepped.price[:3], jumped.price[:3])
+
+def test_stock_settles_where_production_meets_use():
+    economy, _ = make_economy(seed=2)
+    balanced = economy.stock[:3].copy()
+    economy.step(50)
+    assert np.allclose(economy.stock[:3], balanced)
+    assert np.allclose(economy.stock[:3], economy.production[:3] * COVER_DAYS)
+
+def test_deliveries_are_shared_between_towns_and_never_go_negative():
+    economy, islands = make_economy(towns=2)
+    economy.add_town(islands[0], 'Harbour', 500)
+    rows = sorted(economy.towns[islands[0]].values())
+    before = economy.stock[:3, 1].copy()
+    economy.deliver([islands[0], islands[1], object()], [1, 1, 1], [10.0, -1e9, 5.0])
+    assert np.allclose(economy.stock[rows, 1], before[rows] + 5)
+    assert economy.stock[1, 1] == 0
+    assert np.allclose(economy.price[:3], expected_prices(economy.stock[:3], economy.demand[:3]))
+
+def test_removed_towns_free_their_rows():
+    economy, islands = make_economy()
+    economy.remove_island(islands[1])
+    assert economy.market(islands[1], 'Town') is None
+    island = object()
+    assert economy.add_town(island, 'Town', 200) == 1
+    assert economy.add_town(island, 'Town', 900) == 1  # Registered already, keeps its market
+    assert economy.size == 3
@@ -0,0 +1,102 @@
+import random
+import numpy as np
+from crystalquest.game import World
+from crystalquest.ships import TradeShip
+from crystalquest.fleet import OUTBOUND, RETURNING, IDLE, DAYS_AT_DESTINATION
+
+def make_world(seed):
+    """A small world with no port spawns, so the fleet only holds the ships a test adds"""
+    random.seed(seed)
+    world = World(num_islands=6, map_size=30)
+    world.quiet = True
+    world.scheduler.queue.clear()
+    return world
+
+def record_trades(world):
+    """Log the islands the economy gets deliveries for, one list per day"""
+    trades = []
+    deliver = world.economy.deliver
+    def logged(islands, goods, amounts):
+        trades.append(list(islands))
+        deliver(islands, goods, amounts)
+    world.economy.deliver = logged
+    return trades
+
+def run_day(world, day):
+    world.scheduler.run_until(day)
+    world.fleet.step()
+
+def sail_until(world, day, done, limit=200):
+    """Run days until done() holds, return the day it did"""
+    while not done():
+        day += 1
+        assert day < limit
+        run_day(world, day)
+    return day
+
+def test_new_ship_sets_out_for_another_inhabited_island():
+    world = make_world(1)
+    home = next(iter(world.inhabited_islands.values()))
+    ship = TradeShip(home, world)
+    fleet, row = world.fleet, ship.row
+    assert fleet.state[row] == OUTBOUND
+    destination = fleet.islands[fleet.destination_id[row]]
+    assert destination is not home and destination.is_inhabited
+    assert tuple(fleet.position[row]) == home.coordinates
+    assert fleet.arrival_day[row] == -1
+
+def test_ship_trades_on_arrival_and_waits_before_heading_home():
+    world = make_world(2)
+    home = next(iter(world.inhabited_islands.values()))
+    ship = TradeShip(home, world)
+    fleet, row = world.fleet, ship.row
+    destination = fleet.islands[fleet.destination_id[row]]
+    trades = record_trades(world)
+
+    day = sail_until(world, 0, lambda: fleet.arrival_day[row] >= 0)
+    assert tuple(fleet.position[row]) == destination.coordinates
+    assert fleet.arrival_day[row] == day
+    assert trades == [[destination, destination]]  # Unloads one good and loads another
+
+    # It stays put until its days are up, then the scheduler sends it home
+    for wait in range(1, DAYS_AT_DESTINATION):
+        run_day(world, day + wait)
+        assert fleet.state[row] == OUTBOUND
+        assert tuple(fleet.position[row]) == destination.coordinates
+    run_day(world, day + DAYS_AT_DESTINATION)
+    assert fleet.state[row] == RETURNING
+    assert len(trades) == 1
+
+def test_ship_back_home_trades_and_picks_a_new_destination():
+    world = make_world(3)
+    home = next(iter(world.inhabited_islands.values()))
+    ship = TradeShip(home, world)
+    fleet, row = world.fleet, ship.row
+    trades = record_trades(world)
+
+    day = sail_until(world, 0, lambda: fleet.state[row] == RETURNING)
+    sail_until(world, day, lambda: fleet.state[row] != RETURNING)
+    assert tuple(fleet.position[row]) == home.coordinates
+    assert trades[-1] == [home, home]
+    assert len(trades) == 2
+    assert fleet.state[row] == OUTBOUND
+    assert fleet.arrival_day[row] == -1
+    assert fleet.islands[fleet.destination_id[row]] is not home
+
+def test_ship_with_nowhere_to_go_idles_and_is_retired():
+    world = make_world(4)
+    home = next(iter(world.inhabited_islands.values()))
+    ship = TradeShip(home, world)
+    fleet = world.fleet
+    # No other inhabited island in reach any more
+    world.nearest_inhabited_islands = lambda position, k, exclude=None: []
+    world.inhabited_index.version += 1
+    fleet.set_new_destinations(np.array([ship.row]))
+    assert fleet.state[ship.row] == IDLE
+    assert fleet.destination_id[ship.row] == -1
+    assert fleet.stranded_ships() == [ship]
+    assert fleet.days_to_next_arrival() == 1
+
+    world.tick(1)
+    assert fleet.count == 0
+    assert fleet.stranded_ships() == []
@@ -0,0 +1,33 @@
+import os
+import pickle
+from crystalquest.game import World
+
+DATA = os.path.join(os.path.dirname(__file__), 'data')
+
+def load_baseline():
+    # Written by the game before it had island indexes, a registry, a scheduler, a fleet or an economy
+    with open(os.path.join(DATA, 'baseline_save.dat'), 'rb') as f:
+        return pickle.load(f)
+
+def test_baseline_save_loads():
+    save = load_baseline()
+    world = save['world']
+    assert isinstance(world, World)
+    assert save['player'].name == 'Tester'
+    assert save['current_island'] is world.islands[save['current_island'].name]
+    assert world.island_index.count == len(world.islands) == 5
+    assert world.inhabited_index.count == len(world.inhabited_islands) >= 2
+
+def test_baseline_save_registers_ports_and_markets():
+    world = load_baseline()['world']
+    towns = [(island, name) for island in world.inhabited_islands.values() for name in island.towns]
+    assert set(world.registry.ports) == set(towns)
+    assert all(world.economy.market(island, name) is not None for island, name in towns)
+    assert len(world.scheduler.queue) == len(towns)  # One spawn check per port
+
+def test_baseline_save_plays_on():
+    world = load_baseline()['world']
+    world.quiet = True
+    world.simulate(60)
+    assert world.fleet.count > 0
+    assert world.map.grid[tuple(world.sea_monsters.positions.T)].max() == 0  # Monsters on water
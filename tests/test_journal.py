@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from crystalquest import journal
+from crystalquest.colors import FRAMES, NullBackend
+from crystalquest.game import World, start_game
+from crystalquest.journal import Journal, encode_journal, decode_journal, CHECKPOINT_DAYS
+from crystalquest.savefile import load_game_data
+
+DAYS = CHECKPOINT_DAYS + 15
+
+@pytest.fixture
+def use_journal(monkeypatch):
+    """Put a fresh journal in place of the game's, returns a function that swaps in another"""
+    journals = []
+    def use(new=None):
+        new = new or Journal()
+        journals.append(new)
+        monkeypatch.setattr(journal, 'JOURNAL', new)
+        return new
+    yield use
+    for used in journals:
+        used.unmute()  # A failed replay leaves its output muted
+
+def world_state(world):
+    fleet = world.fleet
+    rows = fleet.active_rows()
+    return (fleet.ids[rows].tolist(), fleet.position[rows].tolist(), world.sea_monsters.positions.tolist(),
+            np.round(world.economy.stock[:world.economy.size], 6).tolist())
+
+def play(recorder, player, world, island, town, first_day):
+    """Run the days up to DAYS, checking in with the journal at every turn"""
+    for day in range(first_day, DAYS + 1):
+        world.tick(day)
+        recorder.turn(player, world, island, town, day)
+    return world_state(world), player.stats
+
+def record(use_journal, monkeypatch):
+    monkeypatch.setattr('builtins.input', lambda prompt='': 'Tester')
+    recorder = use_journal()
+    recorder.start(seed=7, num_islands=10, map_size=30)
+    world = World(**recorder.settings)
+    world.quiet = True
+    player, island, town, day = start_game(world)
+    result = play(recorder, player, world, island, town, day + 1)
+    return recorder, result
+
+def refuse_input(monkeypatch):
+    def refuse(prompt=''):
+        raise AssertionError("A replay asked the player")
+    monkeypatch.setattr('builtins.input', refuse)
+
+def test_journal_files_round_trip():
+    recorder = Journal()
+    recorder.seed = 5
+    recorder.settings = {'num_islands': 3}
+    recorder.inputs = ['Ann', '2', 'yes']
+    recorder.checkpoint = {'inputs': 2, 'day': 31, 'seed': 9}
+    recorder.checkpoint_data = b'save'
+    data = encode_journal(recorder.snapshot({'day': 31}))
+    loaded, checkpoint = decode_journal(data)
+    assert loaded == {'seed': 5, 'settings': {'num_islands': 3}, 'inputs': ['Ann', '2', 'yes'],
+                      'checkpoint': {'inputs': 2, 'day': 31, 'seed': 9}, 'summary': {'day': 31}}
+    assert checkpoint == b'save'
+    with pytest.raises(ValueError):
+        decode_journal(data[:-1])
+
+def test_replay_from_the_seed_plays_the_same_game(use_journal, monkeypatch):
+    recorder, expected = record(use_journal, monkeypatch)
+    assert recorder.inputs == ['Tester']
+    journal_data, _ = recorder.snapshot()
+    journal_data['checkpoint'] = None  # Replay the whole game from its seed
+    data = encode_journal((journal_data, None))
+
+    refuse_input(monkeypatch)
+    player = use_journal()
+    assert player.replay(data) is None
+    world = World(**player.settings)
+    world.quiet = True
+    game_player, island, town, day = start_game(world)
+    assert play(player, game_player, world, island, town, day + 1) == expected
+    assert not player.replaying
+
+def test_replay_from_the_checkpoint_plays_the_same_game(use_journal, monkeypatch):
+    recorder, expected = record(use_journal, monkeypatch)
+    assert recorder.checkpoint['day'] == CHECKPOINT_DAYS + 1
+    data = encode_journal(recorder.snapshot())
+
+    refuse_input(monkeypatch)
+    player = use_journal()
+    checkpoint = player.replay(data)
+    game = load_game_data(checkpoint)
+    world = game['world']
+    world.quiet = True
+    assert play(player, game['player'], world, game['current_island'], game['current_town'],
+                game['day'] + 1) == expected
+
+def test_replay_is_muted_until_it_finishes(use_journal, monkeypatch, capsys):
+    recorder = use_journal()
+    recorder.start(seed=1)
+    monkeypatch.setattr('builtins.input', lambda prompt='': 'yes')
+    journal.ask('Sure? ')
+    data = encode_journal(recorder.snapshot())
+
+    backend = FRAMES.backend
+    player = use_journal()
+    player.replay(data)
+    assert isinstance(FRAMES.backend, NullBackend)
+    print("replayed")
+    assert journal.ask('Sure? ') == 'yes'
+    player.finish_replay()
+    assert FRAMES.backend is backend
+    print("live")
+    output = capsys.readouterr().out
+    assert "replayed" not in output and "live" in output
+    assert "Replayed 1 inputs" in output
@@ -0,0 +1,70 @@
+import itertools
+import random
+import numpy as np
+from crystalquest.game import Map, Island
+from crystalquest.placement import PlacementEngine, ISLAND_SIDES
+
+def fill_map(size, seed):
+    """Place islands on a map until no spot is left"""
+    random.seed(seed)
+    game_map = Map(size)
+    islands = []
+    while True:
+        island = Island()
+        if not game_map.place_island_randomly(island):
+            return game_map, islands
+        islands.append(island)
+
+def water_between(a, b):
+    """Squares of water between two islands, along the axis they are furthest apart on"""
+    (ax, ay), (bx, by) = a.coordinates, b.coordinates
+    side_a, side_b = ISLAND_SIDES[a.size], ISLAND_SIDES[b.size]
+    dx = max(bx - (ax + side_a - 1), ax - (bx + side_b - 1))
+    dy = max(by - (ay + side_a - 1), ay - (by + side_b - 1))
+    return max(dx, dy) - 1
+
+def test_islands_never_overlap_or_touch():
+    for seed in range(3):
+        game_map, islands = fill_map(40, seed)
+        assert len(islands) > 20
+        assert min(water_between(a, b) for a, b in itertools.combinations(islands, 2)) >= 1
+
+def test_islands_fit_on_the_map_and_in_the_grid():
+    game_map, islands = fill_map(30, 7)
+    covered = np.zeros_like(game_map.grid)
+    for island in islands:
+        x, y = island.coordinates
+        side = ISLAND_SIDES[island.size]
+        assert 0 <= x and x + side <= game_map.size and 0 <= y and y + side <= game_map.size
+        assert (game_map.grid[x:x + side, y:y + side] == island.id).all()
+        covered[x:x + side, y:y + side] += 1
+    assert covered.max() == 1
+    assert ((game_map.grid > 0) == (covered > 0)).all()
+
+def test_marked_islands_block_nearby_anchors():
+    engine = PlacementEngine(20)
+    assert engine.can_place("Large", 5, 5)
+    engine.mark("Large", 5, 5)
+    for size in ISLAND_SIDES:
+        assert not engine.can_place(size, 5, 5)
+        assert not engine.can_place(size, 8, 8)  # Right next to the island
+    assert engine.can_place("Small", 10, 10)
+
+def test_anchors_off_the_edge_are_blocked():
+    engine = PlacementEngine(10)
+    assert engine.can_place("Large", 7, 7)
+    assert not engine.can_place("Large", 8, 7)
+    assert not engine.can_place("Medium", 7, 9)
+    assert engine.can_place("Small", 9, 9)
+    assert not engine.can_place("Small", 10, 0)
+
+def test_full_map_has_no_anchor():
+    engine = PlacementEngine(6)
+    rng = random.Random(1)
+    while True:
+        anchor = engine.find_anchor("Small", rng)
+        if anchor is None:
+            break
+        assert engine.can_place("Small", *anchor)
+        engine.mark("Small", *anchor)
+    assert not any(engine.can_place("Small", x, y) for x in range(6) for y in range(6))
@@ -0,0 +1,99 @@
+import pickle
+import random
+import numpy as np
+from crystalquest.game import World
+from crystalquest.placement import ISLAND_SIDES
+from crystalquest.routes import RouteTable, NEAREST_ROUTES, island_squares, plan_from, route_length
+
+def make_world(seed=1):
+    random.seed(seed)
+    world = World(num_islands=40, map_size=60)
+    world.quiet = True
+    return world
+
+def make_routes(world):
+    return RouteTable(world.map, world.inhabited_islands.values(), workers=1)
+
+def full_plans(routes):
+    """Routes from every port to every other one, each port searched all the way"""
+    ports = routes.ports()
+    return [plan_from(routes.map.grid, ports, source) for source in range(len(ports))]
+
+def test_lanes_to_the_nearest_ports_are_planned_both_ways():
+    routes = make_routes(make_world())
+    count = len(routes.islands)
+    assert count > NEAREST_ROUTES + 1
+    keys = set(routes.pair_keys.tolist())
+    for source, nearest in enumerate(routes.nearest_ports()):
+        assert len(nearest) == NEAREST_ROUTES
+        for target in nearest:
+            assert source * count + target in keys
+            assert target * count + source in keys
+    assert len(keys) < count * count  # The rest is planned when asked for
+
+def test_routes_match_a_full_search():
+    routes = make_routes(make_world(2))
+    plans = full_plans(routes)
+    planned = len(routes.pair_keys)
+    for a, start_island in enumerate(routes.islands):
+        for b, end_island in enumerate(routes.islands):
+            if a == b:
+                assert routes.sailing_distance(start_island, end_island) == 0
+                continue
+            expected = plans[a][b]
+            assert routes.route(start_island, end_island) == (None if expected is None else
+                                                             [tuple(point) for point in expected])
+            distance = None if expected is None else route_length([start_island.coordinates] + expected)
+            assert routes.sailing_distance(start_island, end_island) == distance
+    count = len(routes.islands)
+    assert planned < len(routes.pair_keys) == count * count
+    assert (np.diff(routes.pair_keys) > 0).all()
+
+def test_routes_cross_only_water_and_end_at_the_port():
+    world = make_world(3)
+    routes = make_routes(world)
+    grid = world.map.grid
+    for a, b in zip(routes.pair_keys // len(routes.islands), routes.pair_keys % len(routes.islands)):
+        if a == b:
+            continue
+        start_island, end_island = routes.islands[a], routes.islands[b]
+        route = routes.route(start_island, end_island)
+        if route is None:
+            continue
+        assert route[-1] == end_island.coordinates
+        # The last two waypoints are where the lane reaches the island and its anchor
+        squares = set(island_squares(start_island))
+        assert all(grid[x, y] == 0 or (x, y) in squares for x, y in route[:-2])
+
+def test_tails_count_down_to_the_end_of_each_route():
+    routes = make_routes(make_world(4))
+    for row in np.nonzero(routes.pair_start >= 0)[0]:
+        start, end = routes.pair_start[row], routes.pair_end[row]
+        waypoints = routes.waypoints[start:end + 1].tolist()
+        assert routes.tail[end] == 0
+        for i in range(start, end + 1):
+            assert routes.tail[i] == route_length(waypoints[i - start:])
+
+def test_walled_in_ports_have_no_lane():
+    world = make_world(5)
+    island = next(iter(world.inhabited_islands.values()))
+    # Block the water around the island with squares of an island that isn't a port
+    x, y = island.coordinates
+    side = ISLAND_SIDES[island.size]
+    grid = world.map.grid
+    ring = grid[max(x - 1, 0):x + side + 1, max(y - 1, 0):y + side + 1]
+    ring[ring == 0] = grid.max() + 1
+    routes = make_routes(world)
+    assert routes.islands[0] is island
+    for other in routes.islands[1:]:
+        assert routes.sailing_distance(island, other) is None
+        assert routes.route(other, island) is None
+    assert routes.sailing_distance(routes.islands[1], routes.islands[2]) is not None
+
+def test_pickled_tables_plan_again_without_their_chart():
+    routes = make_routes(make_world(6))
+    routes.sea_chart()
+    loaded = pickle.loads(pickle.dumps(routes))
+    assert loaded.chart is None
+    first, last = routes.islands[0], routes.islands[-1]
+    assert loaded.route(loaded.islands[0], loaded.islands[-1]) == routes.route(first, last)
@@ -0,0 +1,101 @@
+import os
+import random
+import numpy as np
+import pytest
+from crystalquest import savefile
+from crystalquest.game import World, start_game
+
+DATA = os.path.join(os.path.dirname(__file__), 'data')
+
+def load_fixture(name):
+    # Written by the game in older save formats, version 1 and version 2
+    with open(os.path.join(DATA, name), 'rb') as f:
+        return f.read()
+
+def play(monkeypatch, seed=1):
+    """Start a game on a small world and let it run for a while, returns dump_game's arguments"""
+    monkeypatch.setattr('builtins.input', lambda prompt='': 'Tester')
+    random.seed(seed)
+    world = World(num_islands=12, map_size=40)
+    world.quiet = True
+    player, island, town, _ = start_game(world)
+    world.simulate(40, start_day=2)
+    return player, world, island, town, 41
+
+def world_state(world):
+    """What the fleet, markets and monsters look like"""
+    fleet = world.fleet
+    ships = sorted((int(fleet.ids[row]), tuple(fleet.position[row].tolist()), int(fleet.state[row]),
+                    int(fleet.leg[row]), int(fleet.arrival_day[row])) for row in fleet.active_rows())
+    return (ships, np.round(world.economy.stock[:world.economy.size], 6).tolist(),
+            world.sea_monsters.positions.tolist(), world.scheduler.day)
+
+def play_on(world, day, days=60):
+    for next_day in range(day + 1, day + days + 1):
+        world.tick(next_day)
+    return world_state(world)
+
+def test_loaded_game_plays_on_like_the_saved_one(monkeypatch):
+    player, world, island, town, day = play(monkeypatch)
+    game = savefile.load_game_data(savefile.dump_game(player, world, island, town, day))
+    loaded = game['world']
+    loaded.quiet = True
+    assert game['player'].name == 'Tester'
+    assert game['current_island'].name == island.name and game['current_town'] == town
+    assert game['day'] == day
+
+    # Loading draws nothing from random, so both games see the same numbers from here on
+    state = random.getstate()
+    expected = play_on(world, day)
+    assert expected[0]  # Ships at sea
+    random.setstate(state)
+    assert play_on(loaded, day) == expected
+
+def test_saving_a_loaded_game_gives_the_same_bytes(monkeypatch):
+    data = savefile.dump_game(*play(monkeypatch, seed=2))
+    game = savefile.load_game_data(data)
+    assert savefile.dump_game(game['player'], game['world'], game['current_island'], game['current_town'],
+                              game['day']) == data
+
+def test_compressed_saves_load_the_same(monkeypatch):
+    game = play(monkeypatch, seed=3)
+    stored = savefile.dump_game(*game)
+    compressed = savefile.dump_game(*game, level=6)
+    assert len(compressed) < len(stored)
+    assert world_state(savefile.load_game_data(compressed)['world']) == \
+        world_state(savefile.load_game_data(stored)['world'])
+
+def test_newer_formats_are_refused(monkeypatch):
+    data = bytearray(savefile.dump_game(*play(monkeypatch)))
+    savefile.HEADER.pack_into(data, 0, savefile.MAGIC, savefile.FORMAT_VERSION + 1, 1)
+    with pytest.raises(ValueError):
+        savefile.load_game_data(bytes(data))
+    with pytest.raises(ValueError):
+        savefile.load_game_data(b'XXXX' + bytes(data[4:]))
+
+@pytest.mark.parametrize('name, version', [('save_v1.sav', 1), ('save_v2.sav', 2)])
+def test_old_formats_are_migrated(name, version):
+    data = load_fixture(name)
+    assert savefile.decode(data)[0] == version
+    game = savefile.load_game_data(data)
+    world = game['world']
+    world.quiet = True
+
+    # Every town has a market, and the sea lanes are kept by source and target port
+    towns = [(island, town) for island in world.inhabited_islands.values() for town in island.towns]
+    assert all(world.economy.market(island, town) is not None for island, town in towns)
+    routes = world.routes
+    assert routes is not None and world.route_table() is routes
+    count = len(routes.islands)
+    assert (np.diff(routes.pair_keys) > 0).all() and routes.pair_keys.max() < count * count
+    assert (routes.pair_distance >= 0).all()
+
+    # Saved again in the current format, it loads the same
+    data = savefile.dump_game(game['player'], world, game['current_island'], game['current_town'], game['day'])
+    assert savefile.decode(data)[0] == savefile.FORMAT_VERSION
+    assert world_state(savefile.load_game_data(data)['world']) == world_state(world)
+
+    fleet = world.fleet.count
+    world.simulate(60, start_day=game['day'] + 1)
+    assert world.fleet.count >= fleet // 2
+    assert world.map.grid[tuple(world.sea_monsters.positions.T)].max() == 0  # Monsters on water
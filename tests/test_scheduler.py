@@ -0,0 +1,51 @@
+from crystalquest.scheduler import Scheduler
+
+def test_events_run_by_day_priority_then_order():
+    scheduler = Scheduler()
+    ran = []
+    scheduler.schedule(3, lambda day, name: ran.append(name), 'late')
+    scheduler.schedule(2, lambda day, name: ran.append(name), 'second', priority=1)
+    scheduler.schedule(2, lambda day, name: ran.append(name), 'first', priority=0)
+    scheduler.schedule(2, lambda day, name: ran.append(name), 'third', priority=1)
+    scheduler.run_until(3)
+    assert ran == ['first', 'second', 'third', 'late']
+
+def test_run_until_stops_at_the_day():
+    scheduler = Scheduler()
+    ran = []
+    for day in (1, 5, 9):
+        scheduler.schedule(day, lambda due: ran.append(due))
+    scheduler.run_until(5)
+    assert ran == [1, 5]
+    assert scheduler.day == 5
+    assert scheduler.next_day() == 9
+    assert len(scheduler) == 1
+
+def test_events_scheduled_while_running_run_the_same_call():
+    scheduler = Scheduler()
+    ran = []
+    def repeat(day):
+        ran.append(day)
+        scheduler.schedule_in(2, repeat)
+    scheduler.schedule(0, repeat)
+    scheduler.run_until(6)
+    assert ran == [0, 2, 4, 6]
+    assert scheduler.next_day() == 8
+
+def test_callbacks_get_the_day_they_were_due():
+    scheduler = Scheduler()
+    ran = []
+    scheduler.schedule(2, lambda day, *args: ran.append((day, args)), 'a', 1)
+    scheduler.run_until(10)
+    assert ran == [(2, ('a', 1))]
+    assert scheduler.day == 10
+
+def test_from_saved_keeps_the_order():
+    scheduler = Scheduler()
+    ran = []
+    for day, name in ((4, 'c'), (1, 'a'), (4, 'd'), (2, 'b')):
+        scheduler.schedule(day, lambda due, name=name: ran.append(name))
+    saved = Scheduler.from_saved(scheduler.day, scheduler.sequence, reversed(scheduler.queue))
+    saved.run_until(4)
+    assert ran == ['a', 'b', 'c', 'd']
+    assert saved.sequence == 4
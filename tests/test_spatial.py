@@ -0,0 +1,67 @@
+import math
+import random
+from crystalquest.spatial import IslandIndex, PositionIndex
+
+class Spot:
+    """Stands in for an island, the index only looks at its coordinates"""
+
+    def __init__(self, x, y):
+        self.coordinates = (x, y)
+
+    def get_position(self):
+        return self.coordinates
+
+def distance(position, spot):
+    return math.dist(position, spot.coordinates)
+
+def random_spots(count, size, seed):
+    rng = random.Random(seed)
+    return [Spot(rng.randrange(size), rng.randrange(size)) for _ in range(count)]
+
+def test_k_nearest_matches_a_full_scan():
+    spots = random_spots(300, 500, 1)
+    index = IslandIndex(bucket_size=16)
+    index.extend(spots)
+    rng = random.Random(2)
+    for _ in range(50):
+        position = (rng.randrange(-50, 550), rng.randrange(-50, 550))
+        found = index.k_nearest(position, 8)
+        expected = sorted(distance(position, spot) for spot in spots)[:8]
+        assert [distance(position, spot) for spot in found] == expected
+
+def test_k_nearest_leaves_out_excluded_and_runs_short():
+    spots = random_spots(5, 100, 3)
+    index = IslandIndex()
+    for spot in spots:
+        index.add(spot)
+    found = index.k_nearest(spots[0].coordinates, 10, exclude=spots[0])
+    assert len(found) == 4 and spots[0] not in found
+    assert index.nearest(spots[0].coordinates) is spots[0]
+    assert IslandIndex().k_nearest((0, 0), 3) == []
+
+def test_within_radius_matches_a_full_scan():
+    spots = random_spots(200, 300, 4)
+    index = IslandIndex(bucket_size=10)
+    index.extend(spots)
+    for position, radius in (((150, 150), 40), ((0, 0), 25), ((299, 10), 60)):
+        found = index.within_radius(position, radius)
+        assert set(found) == {spot for spot in spots if distance(position, spot) <= radius}
+
+def test_remove_takes_islands_out_of_queries():
+    spots = random_spots(50, 100, 5)
+    index = IslandIndex()
+    index.extend(spots)
+    version = index.version
+    for spot in spots[:25]:
+        index.remove(spot)
+    assert len(index) == 25
+    assert index.version == version + 25
+    assert set(index.k_nearest((50, 50), 50)) == set(spots[25:])
+
+def test_position_index_groups_entities_by_square():
+    a, b, c = Spot(1, 2), Spot(1, 2), Spot(3, 4)
+    positions = PositionIndex([a, b, c])
+    assert positions.at((1, 2)) == [a, b]
+    assert positions.at([3, 4]) == [c]
+    assert positions.at((0, 0)) == []
+    assert len(positions) == 2
@@ -0,0 +1,99 @@
+import argparse
+import os
+import pickle
+import random
+import time
+import zlib
+
+POOL_DIR = 'worlds'
+
+def generate_world(seed, num_islands=5, map_size=20):
+    """Generate a world from an explicit seed and return it compressed"""
+    from crystalquest.game import World  # game.py imports this module
+    random.seed(seed)
+    world = World(num_islands=num_islands, map_size=map_size)
+    world.seed = seed
+    # Plan the sea lanes now rather than when the game starts. This already runs in a worker
+    # of the pool, so big maps are planned here rather than in a process pool of their own.
+    world.route_table(workers=1)
+    return seed, zlib.compress(pickle.dumps(world, protocol=pickle.HIGHEST_PROTOCOL))
+
+class WorldPool:
+    """A cache of pre-generated worlds on disk, so a new game doesn't wait for generation"""
+
+    def __init__(self, directory=POOL_DIR):
+        self.directory = directory
+
+    def _prefix(self, num_islands, map_size):
+        return f"world_{map_size}x{map_size}_{num_islands}_"
+
+    def available(self, num_islands=5, map_size=20):
+        """Return the filenames of the cached worlds of this size"""
+        if not os.path.exists(self.directory):
+            return []
+        prefix = self._prefix(num_islands, map_size)
+        return sorted(f for f in os.listdir(self.directory)
+                      if f.startswith(prefix) and f.endswith('.dat'))
+
+    def fill(self, count, num_islands=5, map_size=20, seed=None, workers=None):
+        """Generate count worlds in parallel across all cores and store them in the pool"""
+        # Only needed to fill the pool, not to take a world from it when a game starts
+        from concurrent.futures import ProcessPoolExecutor
+        if not os.path.exists(self.directory):
+            os.makedirs(self.directory)
+
+        base_seed = random.randrange(2**32) if seed is None else seed
+        seeds = [base_seed + i for i in range(count)]
+        prefix = self._prefix(num_islands, map_size)
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = executor.map(generate_world, seeds,
+                                   [num_islands] * count, [map_size] * count)
+            for world_seed, data in results:
+                filename = os.path.join(self.directory, f"{prefix}{world_seed}.dat")
+                # Write to a temp file first so a half written world never gets handed out
+                with open(filename + '.tmp', 'wb') as f:
+                    f.write(data)
+                os.replace(filename + '.tmp', filename)
+        return seeds
+
+    def take(self, num_islands=5, map_size=20):
+        """Remove a world from the pool and return it, or None if the pool is empty"""
+        for filename in self.available(num_islands, map_size):
+            path = os.path.join(self.directory, filename)
+            try:
+                with open(path, 'rb') as f:
+                    world = pickle.loads(zlib.decompress(f.read()))
+            except Exception as e:
+                print(f"Could not load pre-generated world {filename}: {e}")
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass  # Already gone, the next world is tried all the same
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                continue  # Taken by another game meanwhile, worlds are handed out once
+            return world
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-generate worlds so new games start instantly")
+    parser.add_argument('--count', type=int, default=10, help="number of worlds to generate")
+    parser.add_argument('--islands', type=int, default=5, help="islands per world")
+    parser.add_argument('--size', type=int, default=20, help="map width and height")
+    parser.add_argument('--seed', type=int, default=None, help="seed of the first world")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--dir', default=POOL_DIR, help="pool directory")
+    args = parser.parse_args()
+
+    pool = WorldPool(args.dir)
+    start = time.perf_counter()
+    pool.fill(args.count, args.islands, args.size, args.seed, args.workers)
+    elapsed = time.perf_counter() - start
+    print(f"Generated {args.count} worlds ({args.size}x{args.size}, {args.islands} islands) "
+          f"in {elapsed:.2f}s, {len(pool.available(args.islands, args.size))} in the pool")
+
+if __name__ == "__main__":
+    main()